@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -52,6 +53,9 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    'amms_common.metrics.MetricsMiddleware',  # first, so it times the whole stack
+    'amms_common.profiling.ProfilingMiddleware',  # off unless PROFILING_ENABLED
+    'amms_common.tracing.TracingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,6 +63,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'amms_common.tracing.ViewTracingMiddleware',  # last, so it spans just the view
 ]
 
 ROOT_URLCONF = 'api_gateway.urls'
@@ -89,6 +94,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -133,3 +140,32 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Upstream services, by the name used in /api/<name>/<path>
+GATEWAY_SERVICES = {
+    'user': os.environ.get('USER_SERVICE_URL', 'http://user-service:8000'),
+    'inventory': os.environ.get('INVENTORY_SERVICE_URL', 'http://inventory-service:8000'),
+    'requisition': os.environ.get('REQUISITION_SERVICE_URL', 'http://requisition-service:8000'),
+    'reporting': os.environ.get('REPORTING_SERVICE_URL', 'http://reporting-service:8000'),
+}
+
+# Tracing (see amms_common.tracing)
+TRACE_SERVICE_NAME = os.environ.get('TRACE_SERVICE_NAME', 'api-gateway')
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '0.1'))  # share of new traces recorded
+TRACE_EXPORTER = os.environ.get('TRACE_EXPORTER', 'otlp')  # otlp, file or none
+TRACE_OTLP_ENDPOINT = os.environ.get('TRACE_OTLP_ENDPOINT', 'http://jaeger:4318/v1/traces')
+TRACE_FILE = os.environ.get('TRACE_FILE', str(BASE_DIR / 'traces.jsonl'))
+TRACE_EXPORT_INTERVAL = float(os.environ.get('TRACE_EXPORT_INTERVAL', '1'))  # seconds
+TRACE_QUEUE_SIZE = int(os.environ.get('TRACE_QUEUE_SIZE', '10000'))  # spans buffered per process
+
+# Tests run without span export; --update-baselines records perf baselines (amms_common.testing)
+TEST_RUNNER = 'amms_common.testing.TestRunner'
+
+# Request profiling (see amms_common.profiling)
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False').lower() in ('1', 'true', 'yes', 'on')
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0.01'))  # share of requests kept
+PROFILING_SLOW_MS = float(os.environ.get('PROFILING_SLOW_MS', '1000'))  # always keep slower requests
+PROFILING_INTERVAL_MS = float(os.environ.get('PROFILING_INTERVAL_MS', '5'))  # between stack samples
+PROFILING_DIR = os.environ.get('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+PROFILING_MAX_PROFILES = int(os.environ.get('PROFILING_MAX_PROFILES', '200'))  # kept on disk
+PROFILING_MAX_QUERIES = int(os.environ.get('PROFILING_MAX_QUERIES', '500'))  # listed per profile
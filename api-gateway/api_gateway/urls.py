@@ -17,8 +17,15 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from amms_common import profiling
+from amms_common.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view),
+    path('profiles/', profiling.profile_list),
+    path('profiles/<slug:profile_id>/', profiling.profile_detail),
+    path('profiles/<slug:profile_id>/collapsed/', profiling.profile_collapsed),
     path('', include('gateway.urls')),
 ]
 
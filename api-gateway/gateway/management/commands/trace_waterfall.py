@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from amms_common.tracing import read_traces, render_waterfall
+
+
+class Command(BaseCommand):
+    help = "Draw the waterfall of a trace from TRACE_EXPORTER=file span files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'trace_id', nargs='?',
+            help="Trace id, as in a traceresponse header (default: the slowest trace).",
+        )
+        parser.add_argument(
+            '--file', action='append', dest='files',
+            help="Span file to read; repeat for each service (default: TRACE_FILE).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            traces = read_traces(options['files'] or [settings.TRACE_FILE])
+        except OSError as exc:
+            raise CommandError(str(exc))
+        trace_id = options['trace_id']
+        if trace_id and '-' in trace_id:
+            trace_id = trace_id.split('-')[1]  # a whole traceparent/traceresponse value
+        if not trace_id:
+            if not traces:
+                raise CommandError("No spans found.")
+            trace_id = max(traces, key=lambda key: _duration(traces[key]))
+        if trace_id not in traces:
+            raise CommandError(f"Trace {trace_id} not found.")
+        self.stdout.write(f"trace {trace_id}")
+        self.stdout.write(render_waterfall(traces[trace_id]))
+
+
+def _duration(spans):
+    return (
+        max(int(span['endTimeUnixNano']) for span in spans)
+        - min(int(span['startTimeUnixNano']) for span in spans)
+    )
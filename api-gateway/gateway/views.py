@@ -3,12 +3,11 @@ from django.http import JsonResponse
 from rest_framework.views import APIView
 from django.conf import settings
 
-SERVICES = {
-    "user": "http://user-service:8000",
-    "inventory": "http://inventory-service:8000",
-    "requisition": "http://requisition-service:8000",
-    "reporting": "http://reporting-service:8000",
-}
+from amms_common import tracing
+from amms_common.metrics import observe_upstream
+
+# Request headers passed on to the upstream service
+FORWARDED_HEADERS = ("Authorization",)
 
 class ProxyView(APIView):
     def get(self, request, service_name, path=''):
@@ -18,16 +17,19 @@ class ProxyView(APIView):
         return self.proxy_request(request, service_name, path, method="post")
 
     def proxy_request(self, request, service_name, path, method="get"):
-        base_url = SERVICES.get(service_name)
+        base_url = settings.GATEWAY_SERVICES.get(service_name)
         if not base_url:
             return JsonResponse({"error": "Unknown service"}, status=404)
 
         url = f"{base_url}/{path}"
+        forwarded = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
         try:
-            if method == "get":
-                resp = requests.get(url, params=request.GET)
-            elif method == "post":
-                resp = requests.post(url, json=request.data)
+            with observe_upstream(service_name), tracing.outbound(method.upper(), url, forwarded) as headers:
+                if method == "get":
+                    resp = requests.get(url, params=request.GET, headers=headers)
+                elif method == "post":
+                    resp = requests.post(url, json=request.data, headers=headers)
+                tracing.annotate({'http.status_code': resp.status_code})
 
             return JsonResponse(resp.json(), status=resp.status_code, safe=False)
         except requests.ConnectionError:
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class InventoryServiceConfig(AppConfig):
+    name = 'inventory_service'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,14 @@
+import django_filters
+from .models import Arm
+
+
+class ArmFilter(django_filters.FilterSet):
+    """
+    Query parameters for listing firearms. ``updated_after`` lets downstream
+    read models pull only the rows changed since their last sync.
+    """
+    updated_after = django_filters.IsoDateTimeFilter(field_name='updated_at', lookup_expr='gte')
+
+    class Meta:
+        model = Arm
+        fields = ['type', 'manufacturer', 'calibre']
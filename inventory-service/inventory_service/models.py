@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 class Arm(models.Model):
@@ -34,6 +35,11 @@ class Arm(models.Model):
         max_length=100,
         verbose_name="Manufacturer"
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Updated At"
+    )
 
     class Meta:
         ordering = ['serial_number']
@@ -41,4 +47,22 @@ class Arm(models.Model):
         verbose_name_plural = "Firearms"
 
     def __str__(self):
-        return f"{self.manufacturer} {self.model} ({self.serial_number})"
\ No newline at end of file
+        return f"{self.manufacturer} {self.model} ({self.serial_number})"
+
+
+class OutboxEvent(models.Model):
+    """A domain event waiting to be relayed to Redis Streams (see ``outbox``)."""
+    aggregate = models.CharField(max_length=50)
+    event_type = models.CharField(max_length=100)
+    key = models.CharField(max_length=100)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['published_at', 'id'], name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.key} ({self.pk})"
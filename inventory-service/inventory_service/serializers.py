@@ -15,8 +15,10 @@ class ArmSerializer(serializers.ModelSerializer):
             'calibre',
             'type',
             'type_display',
-            'manufacturer'
+            'manufacturer',
+            'updated_at'
         ]
+        read_only_fields = ['updated_at']
 
     def validate_serial_number(self, value):
         """Ensure serial number is unique"""
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from amms_common.invalidation import publish_on_commit
+from amms_common.outbox import emit
+
+from .models import Arm
+from .serializers import ArmSerializer
+
+
+@receiver(post_save, sender=Arm)
+def arm_changed(sender, instance, **kwargs):
+    emit('arms', 'arm.changed', instance.pk, ArmSerializer(instance).data)
+    publish_on_commit([instance])
+
+
+@receiver(post_delete, sender=Arm)
+def arm_deleted(sender, instance, **kwargs):
+    emit('arms', 'arm.deleted', instance.pk, {'id': instance.pk, 'serial_number': instance.serial_number})
+    publish_on_commit([instance])
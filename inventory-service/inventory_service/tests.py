@@ -0,0 +1,141 @@
+"""
+Tests for the firearm endpoints: behaviour, then performance (query budgets
+and p95 latency). Data volume and timing runs for the latter come from the
+PERF_* environment variables, see ``amms_common.perftest``.
+"""
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth import get_user_model
+from django.db.transaction import TransactionManagementError
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+from amms_common.perftest import PerfTestCase, bulk_seed, scaled
+
+from .models import Arm, OutboxEvent
+
+ARMS = scaled(1_000_000)
+
+TYPES = [choice for choice, _ in Arm.TYPE_CHOICES]
+MANUFACTURERS = ['Glock', 'Beretta', 'Heckler & Koch', 'Kalashnikov', 'Remington', 'Sig Sauer', 'FN Herstal']
+MODELS = ['G17', '92FS', 'MP5', 'AK-47', '870', 'P226', 'FAL', 'G19', 'UMP45']
+CALIBRES = ['9mm', '7.62x39mm', '5.56mm', '12 gauge', '.45 ACP', None]
+
+
+def new_arm(serial_number):
+    return {'serial_number': serial_number, 'model': 'G17', 'type': 'pistol', 'manufacturer': 'Glock'}
+
+
+def synthetic_arms(count):
+    for index in range(count):
+        yield Arm(
+            serial_number=f'PERF-{index:08d}',
+            model=MODELS[index % len(MODELS)],
+            calibre=CALIBRES[index % len(CALIBRES)],
+            type=TYPES[index % len(TYPES)],
+            manufacturer=MANUFACTURERS[index % len(MANUFACTURERS)],
+        )
+
+
+class OutboxTests(TransactionTestCase):
+    def test_api_write_commits_with_its_event(self):
+        api = APIClient()
+        api.force_authenticate(get_user_model().objects.create_user('officer'))
+        response = api.post('/api/arms/', new_arm('SN-1'), format='json')
+        self.assertEqual(response.status_code, 201, response.content[:500])
+        event = OutboxEvent.objects.get(key=str(response.data['id']))
+        self.assertEqual(event.event_type, 'arm.changed')
+
+    def test_emit_outside_a_transaction_is_refused(self):
+        with self.assertRaises(TransactionManagementError):
+            Arm.objects.create(**new_arm('SN-2'))
+
+class ChangeFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('officer')
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        cls.arms = [Arm.objects.create(serial_number=f'SN-{index}', model='G17', type='pistol',
+                                       manufacturer='Glock') for index in range(5)]
+        for index, arm in enumerate(cls.arms):
+            Arm.objects.filter(pk=arm.pk).update(updated_at=start + timedelta(minutes=index))
+        cls.start = start
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_walk_survives_updates_mid_walk(self):
+        response = self.api.get('/api/arms/changes/', {'page_size': 2})
+        seen = [row['id'] for row in response.data['results']]
+        # An arm already read changes: it is read again at the end, and
+        # the unread arms do not shift onto the page already read.
+        self.arms[0].save()
+        while response.data['next']:
+            response = self.api.get(response.data['next'])
+            seen += [row['id'] for row in response.data['results']]
+        ids = [arm.pk for arm in self.arms]
+        self.assertEqual(seen, ids + ids[:1])
+
+    def test_updated_after(self):
+        response = self.api.get('/api/arms/changes/', {
+            'updated_after': (self.start + timedelta(minutes=3)).isoformat(),
+        })
+        self.assertEqual([row['id'] for row in response.data['results']], [arm.pk for arm in self.arms[3:]])
+        self.assertIsNone(response.data['next'])
+
+    def test_invalid_cursor(self):
+        response = self.api.get('/api/arms/changes/', {'after': 'yesterday', 'after_id': 1})
+        self.assertEqual(response.status_code, 400)
+
+
+class ArmEndpointPerformanceTests(PerfTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        bulk_seed(Arm, synthetic_arms(ARMS))
+        cls.user = get_user_model().objects.create_user('perf-officer')
+
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def get(self, path, params=None):
+        response = self.api.get(path, params or {})
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        return response
+
+    def list_page(self, page_size):
+        return self.get('/api/arms/', {'page_size': page_size})
+
+    def search(self, page_size=20):
+        return self.get('/api/arms/search/', {'q': 'glock', 'page_size': page_size})
+
+    def dashboard(self):
+        return self.get('/api/arms/dashboard/')
+
+    # Query budgets: the count and the page for lists, or one query per
+    # statistic for the dashboard.
+
+    def test_list_queries(self):
+        self.assertNumQueries(2, self.list_page, 20)
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        self.assertQueriesIndependentOf('page_size', self.list_page, [10, 100])
+
+    def test_search_queries(self):
+        self.assertNumQueries(2, self.search)
+
+    def test_search_queries_do_not_grow_with_page_size(self):
+        self.assertQueriesIndependentOf('page_size', self.search, [10, 100])
+
+    def test_dashboard_queries(self):
+        self.assertNumQueries(4, self.dashboard)
+
+    def test_list_latency(self):
+        self.assertLatency('arms.list', self.list_page, 20)
+
+    def test_search_latency(self):
+        self.assertLatency('arms.search', self.search)
+
+    def test_dashboard_latency(self):
+        self.assertLatency('arms.dashboard', self.dashboard)
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from amms_common import dbpool, metrics, profiling
 from .views import ArmViewSet
 from django.http import JsonResponse
 from django.conf import settings
@@ -16,6 +17,11 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include(router.urls)),
     path('api/health/', health_check),
+    path('metrics/db/', dbpool.metrics_view),
+    path('metrics', metrics.metrics_view),
+    path('profiles/', profiling.profile_list),
+    path('profiles/<slug:profile_id>/', profiling.profile_detail),
+    path('profiles/<slug:profile_id>/collapsed/', profiling.profile_collapsed),
 ] 
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
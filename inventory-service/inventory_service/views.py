@@ -1,18 +1,28 @@
+from django.db import transaction
 from django.db.models import Count
+from django.utils.decorators import method_decorator
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
+from .filters import ArmFilter
 from .models import Arm
+from .pagination import ChangeFeedPagination
 from .serializers import ArmSerializer
 from django.db.models import Q
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Writes emit outbox events, which must commit with the change.
+@method_decorator(transaction.atomic, name='create')
+@method_decorator(transaction.atomic, name='update')
+@method_decorator(transaction.atomic, name='destroy')
 class ArmViewSet(ModelViewSet):
     queryset = Arm.objects.all().order_by('serial_number')
     serializer_class = ArmSerializer
+    filterset_class = ArmFilter
+    ordering_fields = ['serial_number', 'updated_at', 'id']
 
     @action(detail=False, methods=['get'])
     def dashboard(self, request):
@@ -70,4 +80,13 @@ class ArmViewSet(ModelViewSet):
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK) 
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_200_OK) 
+
+    @action(detail=False, methods=['get'], pagination_class=ChangeFeedPagination)
+    def changes(self, request):
+        """
+        Every firearm changed since ``updated_after``, oldest change first,
+        for incremental copies; see ``ChangeFeedPagination``.
+        """
+        page = self.paginate_queryset(Arm.objects.all())
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
@@ -0,0 +1,15 @@
+"""
+Code shared by the AMMS Django services. Each module is configured through
+the service's settings; the services keep only that and their wiring
+(middleware, URLs, models, signal handlers).
+
+* ``tracing``: request and span tracing with OTLP/file export.
+* ``metrics``: Prometheus request, DB and upstream metrics.
+* ``profiling``: sampled request profiles.
+* ``dbpool``: pooled MySQL database backend and pool stats.
+* ``outbox``: transactional outbox for domain events.
+* ``invalidation``: cross-service cache invalidation over Redis pub/sub.
+* ``jwks``: access tokens verified against user-service's JWKS.
+* ``perftest``: query budgets and latency baselines for tests.
+* ``testing``: the test runner (no span export, ``--update-baselines``).
+"""
@@ -0,0 +1,183 @@
+"""
+Database connection reuse.
+
+By default each worker thread keeps its MySQL connection for
+DB_CONN_MAX_AGE seconds (CONN_MAX_AGE) and health-checks it before reusing
+it after an error (CONN_HEALTH_CHECKS), so a request no longer pays for a
+TCP connect, the MySQL handshake and authentication.
+
+Persistent connections belong to a thread, which does not suit ASGI or
+async workers: each request may run on a different thread and would open
+its own connection. With DB_POOL set, the ENGINE is this package's backend
+(``amms_common.dbpool``) instead. It checks a connection out of a per-process ``Pool`` when a
+request first queries and returns it when Django closes the connection
+at the end of the request. At most DB_POOL_MAX_SIZE connections are open
+per process. A request that finds them all in use waits up to
+DB_POOL_TIMEOUT seconds for one.
+
+``stats()`` reports how many connections this process opened, and, per
+pooled database, the pool's size, use, saturation and time spent waiting.
+``metrics_view`` serves it as JSON.
+"""
+import collections
+import os
+import threading
+import time
+
+from django.db.backends.signals import connection_created
+from django.http import JsonResponse
+
+_opened = collections.Counter()
+
+
+def _count_opened(sender, connection, **kwargs):
+    _opened[connection.alias] += 1
+
+
+connection_created.connect(_count_opened)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class Pool:
+    """
+    Thread-safe pool of raw DB-API connections for one database alias.
+
+    Idle connections are handed out most recently used first, so a quiet
+    process keeps using a small hot set. A connection idle longer than
+    ``check_after`` is pinged before it is handed out, and one older than
+    ``max_lifetime`` is replaced.
+    """
+
+    def __init__(self, max_size=10, timeout=10, max_lifetime=1800, check_after=30):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self._idle = collections.deque()  # (connection, created, last used)
+        self._created = {}  # id(connection) -> created
+        self._size = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+    def get(self, connect, ping):
+        """A ``(connection, fresh)`` pair; ``connect()`` opens a new connection."""
+        started = time.monotonic()
+        while True:
+            connection, created, last_used = self._checkout(started)
+            if connection is None:
+                try:
+                    connection = connect()
+                except BaseException:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created[id(connection)] = time.monotonic()
+                return connection, True
+            now = time.monotonic()
+            if now - created > self.max_lifetime or (now - last_used > self.check_after and not ping(connection)):
+                self.discard(connection)
+                continue
+            return connection, False
+
+    def _checkout(self, started):
+        with self._cond:
+            waited = False
+            try:
+                while True:
+                    if self._idle:
+                        self.checkouts += 1
+                        return self._idle.pop()
+                    if self._size < self.max_size:
+                        self._size += 1
+                        self.checkouts += 1
+                        return None, None, None
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(
+                            f"No database connection became free within {self.timeout}s "
+                            f"({self.max_size} in use)"
+                        )
+                    waited = True
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+            finally:
+                if waited:
+                    waited_for = time.monotonic() - started
+                    self.waits += 1
+                    self.wait_seconds += waited_for
+                    self.max_wait_seconds = max(self.max_wait_seconds, waited_for)
+
+    def put(self, connection):
+        with self._cond:
+            self._idle.append((connection, self._created[id(connection)], time.monotonic()))
+            self._cond.notify()
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._created.pop(id(connection), None)
+            self._size -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._size - len(self._idle),
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'saturation': (self._size - len(self._idle)) / self.max_size,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_seconds': self.wait_seconds,
+                'max_wait_seconds': self.max_wait_seconds,
+                'timeouts': self.timeouts,
+            }
+
+
+_pools = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, options):
+    """The pool for ``key`` in this process; forked children start their own."""
+    global _pools, _pools_pid
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            _pools, _pools_pid = {}, os.getpid()
+        if key not in _pools:
+            _pools[key] = Pool(**options)
+        return _pools[key]
+
+
+def stats():
+    with _pools_lock:
+        pools = dict(_pools) if _pools_pid == os.getpid() else {}
+    return {
+        'pid': os.getpid(),
+        'connections_opened': dict(_opened),
+        'pools': {key: pool.stats() for key, pool in pools.items()},
+    }
+
+
+def metrics_view(request):
+    return JsonResponse(stats())
@@ -0,0 +1,64 @@
+"""
+MySQL backend that checks connections out of a ``dbpool.Pool``.
+
+Configure with ``OPTIONS['pool']`` (the ``Pool`` keyword arguments) and
+CONN_MAX_AGE 0: Django then "closes" the connection at the end of every
+request, which returns it to the pool.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.mysql import base as mysql
+
+from . import PoolTimeout, get_pool
+
+
+class DatabaseWrapper(mysql.DatabaseWrapper):
+    def check_settings(self):
+        super().check_settings()
+        if self.settings_dict['CONN_MAX_AGE'] != 0:
+            raise ImproperlyConfigured("Pooled connections require CONN_MAX_AGE = 0.")
+
+    @property
+    def pool(self):
+        # Keyed by database name too, so switching to a test database does not
+        # hand out connections to the old one.
+        return get_pool(f"{self.alias}:{self.settings_dict['NAME']}", self.settings_dict['OPTIONS'].get('pool', {}))
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        def ping(connection):
+            try:
+                connection.ping()
+            except mysql.Database.Error:
+                return False
+            return True
+
+        self._pool = self.pool
+        try:
+            connection, self._fresh_connection = self._pool.get(
+                lambda: super(DatabaseWrapper, self).get_new_connection(conn_params), ping,
+            )
+        except PoolTimeout as exc:
+            raise mysql.Database.OperationalError(str(exc)) from exc
+        return connection
+
+    def init_connection_state(self):
+        # Session settings outlive a checkout; only new connections need them.
+        if self._fresh_connection:
+            super().init_connection_state()
+
+    def _close(self):
+        connection = self.connection
+        if self.in_atomic_block or (self.errors_occurred and not self.is_usable()):
+            self._pool.discard(connection)
+            return
+        try:
+            if not connection.get_autocommit():
+                connection.rollback()
+        except mysql.Database.Error:
+            self._pool.discard(connection)
+            return
+        self._pool.put(connection)
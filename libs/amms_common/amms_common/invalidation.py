@@ -0,0 +1,152 @@
+"""
+Cross-service cache invalidation over Redis pub/sub.
+
+When a cached model changes, ``publish_on_commit()`` sends a compact
+``{"model", "pk", "version"}`` message on ``<CACHE_INVALIDATION_CHANNEL_PREFIX><model label>``
+once the change commits. The version is the row's ``updated_at`` in
+microseconds, so receivers can tell an old message from a new one.
+
+Every process that keeps an in-process cache registers a handler with
+``subscriber``. The first ``subscriber.start()`` in a process, typically on
+the cache's first use, starts a daemon thread that listens for messages and
+calls the handlers for the model. Forked workers start their own thread.
+Pub/sub does not queue messages for a disconnected listener, so when the
+thread reconnects it calls every ``reset`` handler and the caches start
+empty instead of possibly stale.
+
+Redis cache entries are evicted by the publisher rather than by every
+listener: ``tag()`` records a Django cache key under a model row, and
+publishing deletes the keys tagged under it.
+
+With both in place, caches can use long TTLs. The TTL only bounds how long
+an entry can outlive a change made while no one was listening.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY = 1
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.CACHE_INVALIDATION_REDIS_URL)
+    return _client
+
+
+def channel(label):
+    return f'{settings.CACHE_INVALIDATION_CHANNEL_PREFIX}{label}'
+
+
+def _tag_key(label, pk):
+    return f'{settings.CACHE_INVALIDATION_CHANNEL_PREFIX}tag:{label}:{pk}'
+
+
+def version_of(instance):
+    updated_at = getattr(instance, 'updated_at', None)
+    return int((updated_at.timestamp() if updated_at else time.time()) * 1_000_000)
+
+
+def tag(label, pk, key, timeout):
+    """Delete the Django cache ``key`` when ``label``/``pk`` is next published."""
+    try:
+        pipe = get_client().pipeline(transaction=False)
+        pipe.sadd(_tag_key(label, pk), key)
+        pipe.expire(_tag_key(label, pk), timeout)
+        pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning("Tagging cache key %s failed: %s", key, exc)
+
+
+def publish(messages):
+    """Evict the tagged keys of, and announce, each ``(label, pk, version)``."""
+    if not messages:
+        return
+    client = get_client()
+    try:
+        pipe = client.pipeline(transaction=False)
+        for label, pk, _ in messages:
+            pipe.smembers(_tag_key(label, pk))
+            pipe.delete(_tag_key(label, pk))
+        tagged = pipe.execute()[::2]
+        keys = [key.decode() for members in tagged for key in members]
+        if keys:
+            cache.delete_many(keys)
+
+        pipe = client.pipeline(transaction=False)
+        for label, pk, version in messages:
+            pipe.publish(channel(label), json.dumps({'model': label, 'pk': pk, 'version': version}))
+        pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning("Publishing %d cache invalidations failed: %s", len(messages), exc)
+
+
+def publish_on_commit(instances):
+    """``publish()`` ``instances`` once the current transaction commits."""
+    messages = [(instance._meta.label_lower, instance.pk, version_of(instance)) for instance in instances]
+    transaction.on_commit(lambda: publish(messages))
+
+
+class Subscriber:
+    def __init__(self):
+        self._handlers = defaultdict(list)
+        self._resets = []
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def register(self, label, evict, reset=None):
+        """
+        Call ``evict(pk, version)`` for every invalidation of ``label``, and
+        ``reset()``, if given, whenever messages may have been missed.
+        """
+        with self._lock:
+            self._handlers[label].append(evict)
+            if reset is not None:
+                self._resets.append(reset)
+
+    def start(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._listen, daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = get_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(channel('*'))
+                for reset in list(self._resets):
+                    reset()
+                for message in pubsub.listen():
+                    self._dispatch(message)
+            except redis.RedisError as exc:
+                logger.warning("Cache invalidation listener disconnected: %s", exc)
+                time.sleep(RECONNECT_DELAY)
+
+    def _dispatch(self, message):
+        try:
+            data = json.loads(message['data'])
+            handlers = list(self._handlers.get(data['model'], ()))
+            for evict in handlers:
+                evict(data['pk'], data['version'])
+        except Exception:
+            logger.exception("Handling cache invalidation %r failed", message.get('data'))
+
+
+subscriber = Subscriber()
@@ -0,0 +1,171 @@
+"""
+Offline verification of user-service tokens.
+
+user-service signs tokens with rotating asymmetric keys and publishes the
+public halves as a JWKS (JWT_JWKS_URL). This process keeps the JWKS in
+memory and verifies every token locally against the key its ``kid`` names,
+so authenticating a request never calls user-service and no secret is
+shared.
+
+A daemon thread refreshes the set every JWT_JWKS_REFRESH_INTERVAL seconds.
+A token naming an unknown ``kid`` triggers one background refresh, and
+requests wait at most JWT_JWKS_UNKNOWN_KID_WAIT seconds for it. Concurrent
+unknown kids share that refresh, and refreshes are at least
+JWT_JWKS_REFRESH_COOLDOWN seconds apart, so tokens with made-up kids cannot
+flood user-service. With JWT_JWKS_CACHE_FILE set, the last good set is
+written to disk and used at start-up if user-service is unreachable.
+"""
+import json
+import logging
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+import jwt
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+logger = logging.getLogger(__name__)
+
+
+def parse_jwks(data):
+    """``{kid: public key}`` for the signing keys in a JWKS document."""
+    return {
+        key.key_id: key.key
+        for key in jwt.PyJWKSet.from_dict(data).keys
+        if key.key_id and key.public_key_use in (None, 'sig')
+    }
+
+
+class JWKSCache:
+    def __init__(self, url, refresh_interval=300, unknown_kid_wait=2, cooldown=10,
+                 timeout=3, cache_file=''):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.unknown_kid_wait = unknown_kid_wait
+        self.cooldown = cooldown
+        self.timeout = timeout
+        self.cache_file = Path(cache_file) if cache_file else None
+        self._keys = {}
+        self._lock = threading.Lock()
+        self._refreshing = None
+        self._last_attempt = float('-inf')
+        self._started = False
+
+    def get(self, kid):
+        """The public key for ``kid``, or None if user-service does not publish one."""
+        self._start()
+        key = self._keys.get(kid)
+        if key is None:
+            refreshing = self.refresh()
+            if refreshing is not None:
+                refreshing.wait(self.unknown_kid_wait)
+            key = self._keys.get(kid)
+        return key
+
+    def refresh(self, force=False):
+        """Start a background refresh unless one is running or one ran recently."""
+        with self._lock:
+            if self._refreshing is None and (force or time.monotonic() - self._last_attempt >= self.cooldown):
+                self._refreshing = threading.Event()
+                self._last_attempt = time.monotonic()
+                threading.Thread(target=self._refresh, args=(self._refreshing,), daemon=True).start()
+            return self._refreshing
+
+    def _refresh(self, done):
+        try:
+            with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+                data = json.load(response)
+            self._keys = parse_jwks(data)
+            if self.cache_file is not None:
+                self.cache_file.write_text(json.dumps(data))
+        except Exception as exc:
+            logger.warning("Refreshing JWKS from %s failed: %s", self.url, exc)
+        finally:
+            with self._lock:
+                self._refreshing = None
+            done.set()
+
+    def _start(self):
+        # Started on first use, so each forked worker gets its own thread.
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            if self.cache_file is not None and self.cache_file.exists():
+                try:
+                    self._keys = parse_jwks(json.loads(self.cache_file.read_text()))
+                except Exception as exc:
+                    logger.warning("Ignoring unreadable JWKS cache %s: %s", self.cache_file, exc)
+        threading.Thread(target=self._refresh_periodically, daemon=True).start()
+
+    def _refresh_periodically(self):
+        while True:
+            refreshing = self.refresh(force=True)
+            if refreshing is not None:
+                refreshing.wait()
+            time.sleep(self.refresh_interval)
+
+
+_cache = None
+
+
+def get_jwks_cache():
+    global _cache
+    if _cache is None:
+        _cache = JWKSCache(
+            settings.JWT_JWKS_URL,
+            refresh_interval=settings.JWT_JWKS_REFRESH_INTERVAL,
+            unknown_kid_wait=settings.JWT_JWKS_UNKNOWN_KID_WAIT,
+            cooldown=settings.JWT_JWKS_REFRESH_COOLDOWN,
+            cache_file=settings.JWT_JWKS_CACHE_FILE,
+        )
+    return _cache
+
+
+class JWKSTokenBackend(TokenBackend):
+    """Verifies tokens against the cached JWKS; this service issues none."""
+
+    def encode(self, payload):
+        raise TokenBackendError(_("Tokens are issued by user-service"))
+
+    def get_verifying_key(self, token):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as e:
+            raise TokenBackendError(_("Token is invalid")) from e
+        key = get_jwks_cache().get(kid) if kid else None
+        if key is None:
+            raise TokenBackendError(_("Token is invalid"))
+        return key
+
+
+_backend = None
+
+
+def get_token_backend():
+    global _backend
+    if _backend is None:
+        _backend = JWKSTokenBackend(
+            api_settings.ALGORITHM,
+            audience=api_settings.AUDIENCE,
+            issuer=api_settings.ISSUER,
+            leeway=api_settings.LEEWAY,
+            json_encoder=api_settings.JSON_ENCODER,
+        )
+    return _backend
+
+
+class JWKSAccessToken(AccessToken):
+    """Access token verified offline against user-service's published keys."""
+
+    @property
+    def token_backend(self):
+        return get_token_backend()
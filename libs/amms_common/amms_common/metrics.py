@@ -0,0 +1,250 @@
+"""
+Prometheus metrics, served at ``/metrics``.
+
+``MetricsMiddleware`` records for every request:
+
+* its latency, by method, route pattern and status;
+* the requests in flight;
+* how many DB queries it ran and the time they took, by route.
+
+Caches count their hits and misses in ``CACHE_REQUESTS``, and calls to
+other services are timed per target with ``observe_upstream()``.
+``instrument_celery()`` times tasks, and each scrape reads the depth of the
+Celery queues (METRICS_CELERY_QUEUES) from the broker.
+
+gunicorn runs several workers, so set PROMETHEUS_MULTIPROC_DIR: each worker
+then writes its samples to memory-mapped files there, and a scrape, served
+by any worker, adds up the files of all of them. ``gunicorn_conf`` empties
+the directory at start-up and retires the files of workers that exit. A
+Celery worker cannot be scraped through gunicorn, so its main process
+serves its own metrics on WORKER_METRICS_PORT.
+
+Recording costs a few microseconds per request. Connection-pool gauges are
+refreshed at most once a second per process.
+"""
+import os
+import shutil
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess, start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from .dbpool import stats as db_pool_stats
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', "Request latency.", ['method', 'route', 'status'],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'http_requests_in_flight', "Requests being handled.", multiprocess_mode='livesum',
+)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', "Database queries per request.", ['route'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500),
+)
+REQUEST_DB_SECONDS = Histogram(
+    'http_request_db_seconds', "Time spent in database queries per request.", ['route'],
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', "Cache lookups.", ['cache', 'result'],
+)
+UPSTREAM_LATENCY = Histogram(
+    'upstream_request_duration_seconds', "Latency of calls to other services.", ['target', 'outcome'],
+)
+TASK_DURATION = Histogram(
+    'celery_task_duration_seconds', "Celery task run time.", ['task', 'state'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600),
+)
+DB_POOL = Gauge(
+    'db_pool_connections', "Pooled database connections.", ['database', 'state'],
+    multiprocess_mode='livesum',
+)
+DB_POOL_WAITS = Gauge(
+    'db_pool_waits', "Checkouts that waited for a free connection.", ['database'],
+    multiprocess_mode='livesum',
+)
+DB_POOL_WAIT_SECONDS = Gauge(
+    'db_pool_wait_seconds', "Time spent waiting for a free connection.", ['database'],
+    multiprocess_mode='livesum',
+)
+DB_POOL_TIMEOUTS = Gauge(
+    'db_pool_timeouts', "Checkouts that gave up waiting.", ['database'],
+    multiprocess_mode='livesum',
+)
+DB_CONNECTIONS_OPENED = Gauge(
+    'db_connections_opened', "Database connections opened.", ['database'],
+    multiprocess_mode='livesum',
+)
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match is not None else UNMATCHED_ROUTE
+
+
+class _QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+_pool_observed_at = 0.0
+
+
+def _observe_db_pool():
+    global _pool_observed_at
+    if time.monotonic() - _pool_observed_at < 1:
+        return
+    _pool_observed_at = time.monotonic()
+    stats = db_pool_stats()
+    for alias, opened in stats['connections_opened'].items():
+        DB_CONNECTIONS_OPENED.labels(alias).set(opened)
+    for database, pool in stats['pools'].items():
+        for state in ('size', 'in_use', 'idle', 'waiting'):
+            DB_POOL.labels(database, state).set(pool[state])
+        DB_POOL.labels(database, 'max_size').set(pool['max_size'])
+        DB_POOL_WAITS.labels(database).set(pool['waits'])
+        DB_POOL_WAIT_SECONDS.labels(database).set(pool['wait_seconds'])
+        DB_POOL_TIMEOUTS.labels(database).set(pool['timeouts'])
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = _QueryTimer()
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        status = '500'
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer))
+                response = self.get_response(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            route = _route(request)
+            REQUEST_LATENCY.labels(request.method, route, status).observe(time.perf_counter() - started)
+            REQUEST_DB_QUERIES.labels(route).observe(timer.count)
+            REQUEST_DB_SECONDS.labels(route).observe(timer.seconds)
+            REQUESTS_IN_FLIGHT.dec()
+            _observe_db_pool()
+
+
+@contextmanager
+def observe_upstream(target):
+    """Time the call made inside the block as a call to ``target``."""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        UPSTREAM_LATENCY.labels(target, outcome).observe(time.perf_counter() - started)
+
+
+class QueueDepthCollector:
+    """Length of each Celery queue in the Redis broker, read at scrape time."""
+
+    def __init__(self):
+        self._client = None
+
+    def collect(self):
+        broker = getattr(settings, 'CELERY_BROKER_URL', None)
+        if not broker:
+            return
+        import redis
+
+        if self._client is None:
+            self._client = redis.Redis.from_url(broker, socket_timeout=1)
+        family = GaugeMetricFamily('celery_queue_depth', "Tasks waiting in a Celery queue.", labels=['queue'])
+        try:
+            for queue in getattr(settings, 'METRICS_CELERY_QUEUES', ['celery']):
+                family.add_metric([queue], self._client.llen(queue))
+        except redis.RedisError:
+            return
+        yield family
+
+
+_scrape_registry = CollectorRegistry()
+_scrape_registry.register(QueueDepthCollector())
+
+
+def _registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_view(request):
+    _observe_db_pool()
+    output = generate_latest(_registry()) + generate_latest(_scrape_registry)
+    return HttpResponse(output, content_type=CONTENT_TYPE_LATEST)
+
+
+def reset_multiproc_dir():
+    """Empty PROMETHEUS_MULTIPROC_DIR; call before any worker starts."""
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def mark_process_dead(pid):
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(pid)
+
+
+def instrument_celery():
+    """Time Celery tasks and serve the worker's metrics on WORKER_METRICS_PORT."""
+    from celery import signals
+
+    started = {}
+    lock = threading.Lock()
+
+    @signals.task_prerun.connect(weak=False)
+    def task_started(task_id=None, **kwargs):
+        with lock:
+            started[task_id] = time.perf_counter()
+
+    @signals.task_postrun.connect(weak=False)
+    def task_finished(task_id=None, task=None, state=None, **kwargs):
+        with lock:
+            began = started.pop(task_id, None)
+        if began is not None:
+            TASK_DURATION.labels(task.name, state or 'UNKNOWN').observe(time.perf_counter() - began)
+
+    @signals.celeryd_init.connect(weak=False)
+    def worker_starting(**kwargs):
+        reset_multiproc_dir()
+
+    @signals.worker_ready.connect(weak=False)
+    def worker_ready(**kwargs):
+        port = getattr(settings, 'WORKER_METRICS_PORT', 0)
+        if port:
+            start_http_server(port, registry=_registry())
+
+    @signals.worker_process_shutdown.connect(weak=False)
+    def worker_process_exiting(pid=None, **kwargs):
+        mark_process_dead(pid or os.getpid())
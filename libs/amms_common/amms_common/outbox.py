@@ -0,0 +1,118 @@
+"""
+Transactional outbox for domain events, relayed to Redis Streams.
+
+``emit()`` writes a row of the service's EVENT_OUTBOX_MODEL (e.g.
+``users.OutboxEvent``) with the same database connection as the change it
+describes, so the event is committed together with the change, or not at
+all. That needs a transaction around both: ``emit()``
+raises ``TransactionManagementError`` outside ``transaction.atomic()``
+rather than let the change and its event commit separately.
+
+``relay()`` is run in a loop by ``manage.py relay_events``. It reads the
+oldest unpublished rows, ``XADD``s them to ``<EVENT_STREAM_PREFIX><aggregate>``
+and marks them published, all in one transaction. If the process dies
+between the ``XADD`` and the commit, the batch is published again, so
+delivery is at least once. Consumers dedupe on the event ``id``
+(``<EVENT_SOURCE>:<row id>``). Streams are trimmed to roughly
+EVENT_STREAM_MAXLEN entries. Published rows are deleted after
+EVENT_OUTBOX_RETENTION_HOURS.
+
+Run a single relay per service: it keeps per-aggregate order.
+"""
+import json
+import logging
+from datetime import timedelta
+
+import redis
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.transaction import TransactionManagementError
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.EVENT_BUS_REDIS_URL)
+    return _client
+
+
+def outbox_model():
+    return apps.get_model(settings.EVENT_OUTBOX_MODEL)
+
+
+def stream_name(aggregate):
+    return f'{settings.EVENT_STREAM_PREFIX}{aggregate}'
+
+
+def _require_transaction():
+    if not transaction.get_connection().in_atomic_block:
+        raise TransactionManagementError(
+            'Outbox events must be emitted inside transaction.atomic(), with the change they describe.'
+        )
+
+
+def emit(aggregate, event_type, key, payload):
+    """Record an event for ``aggregate``/``key`` in the current transaction."""
+    _require_transaction()
+    return outbox_model().objects.create(
+        aggregate=aggregate, event_type=event_type, key=str(key), payload=payload,
+    )
+
+
+def emit_many(events):
+    """``emit()`` for many ``(aggregate, event_type, key, payload)`` tuples in one INSERT."""
+    _require_transaction()
+    OutboxEvent = outbox_model()
+    return OutboxEvent.objects.bulk_create([
+        OutboxEvent(aggregate=aggregate, event_type=event_type, key=str(key), payload=payload)
+        for aggregate, event_type, key, payload in events
+    ])
+
+
+def _fields(event):
+    return {
+        'id': f'{settings.EVENT_SOURCE}:{event.pk}',
+        'type': event.event_type,
+        'key': event.key,
+        'source': settings.EVENT_SOURCE,
+        'occurred_at': event.created_at.isoformat(),
+        'payload': json.dumps(event.payload, cls=DjangoJSONEncoder),
+    }
+
+
+def relay(batch_size=None):
+    """Publish up to ``batch_size`` pending events; returns how many."""
+    batch_size = batch_size or settings.EVENT_RELAY_BATCH_SIZE
+    OutboxEvent = outbox_model()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects
+            .select_for_update(skip_locked=True)
+            .filter(published_at__isnull=True)
+            .order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+        pipe = get_client().pipeline(transaction=False)
+        for event in events:
+            pipe.xadd(
+                stream_name(event.aggregate), _fields(event),
+                maxlen=settings.EVENT_STREAM_MAXLEN, approximate=True,
+            )
+        pipe.execute()
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(published_at=timezone.now())
+    return len(events)
+
+
+def prune():
+    """Delete events published longer ago than the retention window."""
+    cutoff = timezone.now() - timedelta(hours=settings.EVENT_OUTBOX_RETENTION_HOURS)
+    deleted, _ = outbox_model().objects.filter(published_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,136 @@
+"""
+Support for the performance tests in each service's tests.py.
+
+Synthetic data is sized as a fraction, PERF_SCALE, of production-sized
+targets: at 1.0 that is 1M arms, 5M requisitions and 50k users. The default
+keeps ``manage.py test`` quick. A nightly job can run at a larger scale.
+
+Query counts are pinned with ``assertNumQueries``, so a change that adds a
+query fails until its budget is raised in the same diff.
+``assertQueriesIndependentOf`` catches N+1 patterns by checking that the
+count stays the same when a request returns more rows.
+
+``assertLatency`` times a request PERF_RUNS times and compares the p95 with
+the baseline in PERF_BASELINES (perf_baselines.json by default), which is
+keyed by database vendor and scale. A p95 more than PERF_TOLERANCE above
+its baseline fails. To record or refresh baselines, run
+``manage.py test --update-baselines`` (or set PERF_RECORD=1) on the machine
+and database that will check them, then commit the file. A latency test
+with no baseline is skipped locally and fails under CI (the CI variable
+set, or PERF_REQUIRE_BASELINES=1), so a pipeline cannot go green without
+checking latency.
+"""
+import json
+import math
+import os
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.views import APIView
+
+SCALE = float(os.environ.get('PERF_SCALE', '0.001'))
+RUNS = int(os.environ.get('PERF_RUNS', '30'))
+TOLERANCE = float(os.environ.get('PERF_TOLERANCE', '0.25'))
+RECORD = os.environ.get('PERF_RECORD') == '1'
+REQUIRE_BASELINES = os.environ.get('PERF_REQUIRE_BASELINES', '1' if os.environ.get('CI') else '0') == '1'
+BASELINES = Path(os.environ.get('PERF_BASELINES', settings.BASE_DIR / 'perf_baselines.json'))
+
+# Allowed on top of the tolerance, for timings close to timer noise.
+SLACK_MS = 5
+BATCH_SIZE = 5000
+
+
+def scaled(full):
+    """``full`` rows at PERF_SCALE, at least one."""
+    return max(1, round(full * SCALE))
+
+
+def bulk_seed(model, objects, batch_size=BATCH_SIZE):
+    """``bulk_create`` ``objects`` (any iterable) in batches."""
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == batch_size:
+            model.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+
+
+def p95(samples):
+    ordered = sorted(samples)
+    return ordered[math.ceil(len(ordered) * 0.95) - 1]
+
+
+def _baseline_key():
+    return f'{connection.vendor}@{SCALE:g}'
+
+
+def _load_baselines():
+    try:
+        return json.loads(BASELINES.read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def _record_baseline(name, p95_ms):
+    baselines = _load_baselines()
+    baselines.setdefault(_baseline_key(), {})[name] = round(p95_ms, 2)
+    BASELINES.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+
+
+@override_settings(TRACE_SAMPLE_RATE=0)  # a recorded trace adds to the timings
+class PerfTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        # Throttle history would carry over from run to run and turn into 429s.
+        patcher = mock.patch.object(APIView, 'throttle_classes', [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def countQueries(self, func, *args, **kwargs):
+        with CaptureQueriesContext(connection) as captured:
+            func(*args, **kwargs)
+        return len(captured)
+
+    def assertQueriesIndependentOf(self, name, func, values):
+        """``func(value)`` must run as many queries for each of ``values``."""
+        counts = {value: self.countQueries(func, value) for value in values}
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f"Query count changes with {name} ({counts}), which suggests a query per row.",
+        )
+
+    def assertLatency(self, name, func, *args, **kwargs):
+        """
+        p95 of RUNS calls of ``func`` within PERF_TOLERANCE of the recorded
+        baseline, or record it with ``--update-baselines``.
+        """
+        func(*args, **kwargs)  # warm-up: caches, connection, lazy imports
+        samples = []
+        for _ in range(RUNS):
+            started = time.perf_counter()
+            func(*args, **kwargs)
+            samples.append((time.perf_counter() - started) * 1000)
+        measured = p95(samples)
+
+        if RECORD:
+            _record_baseline(name, measured)
+            return
+        baseline = _load_baselines().get(_baseline_key(), {}).get(name)
+        if baseline is None:
+            message = (f"No {_baseline_key()} baseline for {name} in {BASELINES}; "
+                       "record one with manage.py test --update-baselines.")
+            if REQUIRE_BASELINES:
+                self.fail(message)
+            self.skipTest(message)
+        limit = baseline * (1 + TOLERANCE) + SLACK_MS
+        self.assertLessEqual(
+            measured, limit,
+            f"{name}: p95 {measured:.1f} ms, baseline {baseline:.1f} ms (limit {limit:.1f} ms).",
+        )
@@ -0,0 +1,266 @@
+"""
+Sampling profiler for production requests, off unless PROFILING_ENABLED.
+
+While ``ProfilingMiddleware`` is on, one background thread per process
+samples the Python stack of every in-flight request every
+PROFILING_INTERVAL_MS, and the request's SQL is noted as it runs. Nothing
+is traced per call, so the profiled code runs at full speed; the cost is
+the sampler walking the stacks of busy threads.
+
+When a request ends, its profile is kept if the request was picked at
+random (PROFILING_SAMPLE_RATE) or took longer than PROFILING_SLOW_MS, and
+dropped otherwise. Kept profiles are JSON files in PROFILING_DIR, shared
+by the service's processes. The directory is a ring buffer: only the
+newest PROFILING_MAX_PROFILES files are kept.
+
+A profile holds the stacks in collapsed form ("outer;inner;leaf" with a
+sample count), the functions most often on top of the stack, and the
+queries run with their durations. Admins browse them at ``profiles/``.
+``profiles/<id>/collapsed/`` serves the stacks as text for flamegraph.pl
+or speedscope.
+"""
+import collections
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+TOP_FUNCTIONS = 20
+
+_ids = itertools.count()
+
+
+def _frame_name(code):
+    path = code.co_filename
+    if 'site-packages' in path:
+        path = path.rsplit('site-packages' + os.sep, 1)[-1]
+    elif path.startswith(str(settings.BASE_DIR)):
+        path = os.path.relpath(path, settings.BASE_DIR)
+    return f'{getattr(code, "co_qualname", code.co_name)} ({path}:{code.co_firstlineno})'
+
+
+class _Profile:
+    def __init__(self):
+        self.stacks = collections.Counter()  # tuple of code objects, outermost first
+        self.queries = []
+        self.query_count = 0
+        self.query_seconds = 0.0
+
+    def sample(self, frame):
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        codes.reverse()
+        self.stacks[tuple(codes)] += 1
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.query_count += 1
+            self.query_seconds += elapsed
+            if len(self.queries) < settings.PROFILING_MAX_QUERIES:
+                self.queries.append({'sql': sql, 'ms': round(elapsed * 1000, 3), 'many': many})
+
+    def report(self):
+        names = {}
+        collapsed = collections.Counter()
+        leaves = collections.Counter()
+        for codes, count in self.stacks.items():
+            for code in codes:
+                if code not in names:
+                    names[code] = _frame_name(code)
+            collapsed[';'.join(names[code] for code in codes)] += count
+            leaves[names[codes[-1]]] += count
+        return {
+            'samples': sum(self.stacks.values()),
+            'top_functions': [{'function': name, 'samples': count} for name, count in leaves.most_common(TOP_FUNCTIONS)],
+            'stacks': [{'stack': stack, 'samples': count} for stack, count in collapsed.most_common()],
+            'query_count': self.query_count,
+            'query_ms': round(self.query_seconds * 1000, 3),
+            'queries': self.queries,
+        }
+
+
+class _Sampler:
+    """Samples the stacks of the threads with a profile, on a daemon thread."""
+
+    def __init__(self):
+        self._profiles = {}  # thread id -> _Profile
+        self._lock = threading.Lock()
+        self._sampling = threading.Lock()
+        self._pid = None
+
+    def watch(self, profile):
+        self._start()
+        self._profiles[threading.get_ident()] = profile
+
+    def unwatch(self):
+        # Waits out a sampling pass, so the profile is not written to after.
+        with self._sampling:
+            self._profiles.pop(threading.get_ident(), None)
+
+    def _start(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._profiles.clear()
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        interval = settings.PROFILING_INTERVAL_MS / 1000
+        while True:
+            time.sleep(interval)
+            if not self._profiles:
+                continue
+            with self._sampling:
+                frames = sys._current_frames()
+                for thread_id, profile in list(self._profiles.items()):
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        profile.sample(frame)
+                del frames
+
+
+sampler = _Sampler()
+
+
+def save(profile):
+    """Write ``profile`` to PROFILING_DIR and drop the oldest beyond the limit."""
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    path = os.path.join(settings.PROFILING_DIR, f"{profile['id']}.json")
+    with open(f'{path}.tmp', 'w') as file:
+        json.dump(profile, file)
+    os.replace(f'{path}.tmp', path)
+
+    # Ids start with the time, so name order is age order.
+    names = sorted(name for name in os.listdir(settings.PROFILING_DIR) if name.endswith('.json'))
+    for name in names[:-settings.PROFILING_MAX_PROFILES]:
+        try:
+            os.remove(os.path.join(settings.PROFILING_DIR, name))
+        except FileNotFoundError:
+            pass  # another process got there first
+
+
+def load(profile_id):
+    try:
+        with open(os.path.join(settings.PROFILING_DIR, f'{profile_id}.json')) as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        raise Http404
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = _Profile()
+        sampled = random.random() < settings.PROFILING_SAMPLE_RATE
+        started_at = time.time()
+        started = time.perf_counter()
+        response = None
+        sampler.watch(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile.record_query))
+                response = self.get_response(request)
+            return response
+        finally:
+            sampler.unwatch()
+            duration_ms = (time.perf_counter() - started) * 1000
+            if sampled or duration_ms >= settings.PROFILING_SLOW_MS:
+                self._keep(request, response, profile, started_at, duration_ms)
+
+    def _keep(self, request, response, profile, started_at, duration_ms):
+        match = getattr(request, 'resolver_match', None)
+        try:
+            save({
+                'id': f'{time.time_ns()}-{os.getpid()}-{next(_ids)}',
+                'reason': 'slow' if duration_ms >= settings.PROFILING_SLOW_MS else 'sampled',
+                'started_at': started_at,
+                'method': request.method,
+                'path': request.path,
+                'route': match.route if match is not None else None,
+                'status': response.status_code if response is not None else None,
+                'traceresponse': response.get('traceresponse') if response is not None else None,
+                'duration_ms': round(duration_ms, 3),
+                'interval_ms': settings.PROFILING_INTERVAL_MS,
+                **profile.report(),
+            })
+        except OSError as exc:
+            logger.warning("Saving the profile of %s %s failed: %s", request.method, request.path, exc)
+
+
+SUMMARY_FIELDS = (
+    'id', 'reason', 'started_at', 'method', 'path', 'route', 'status',
+    'duration_ms', 'samples', 'query_count', 'query_ms',
+)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_list(request):
+    """Kept profiles, newest first; ``?route=`` and ``?min_ms=`` narrow the list."""
+    try:
+        names = sorted(
+            (name for name in os.listdir(settings.PROFILING_DIR) if name.endswith('.json')),
+            reverse=True,
+        )
+    except FileNotFoundError:
+        names = []
+    route = request.query_params.get('route')
+    try:
+        min_ms = float(request.query_params.get('min_ms', 0))
+    except ValueError:
+        return Response({'error': 'min_ms must be a number'}, status=400)
+
+    profiles = []
+    for name in names:
+        try:
+            profile = load(name[:-len('.json')])
+        except Http404:
+            continue  # dropped from the ring since the listing
+        if (route and profile['route'] != route) or profile['duration_ms'] < min_ms:
+            continue
+        profiles.append({field: profile.get(field) for field in SUMMARY_FIELDS})
+    return Response({'enabled': settings.PROFILING_ENABLED, 'profiles': profiles})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_detail(request, profile_id):
+    return Response(load(profile_id))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_collapsed(request, profile_id):
+    """The stacks in collapsed format, the input of flamegraph.pl and speedscope."""
+    profile = load(profile_id)
+    lines = [f"{stack['stack']} {stack['samples']}" for stack in profile['stacks']]
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; charset=utf-8')
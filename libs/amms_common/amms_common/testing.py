@@ -0,0 +1,34 @@
+"""
+Test runner of the services (TEST_RUNNER = 'amms_common.testing.TestRunner').
+
+Spans are not exported while the tests run (TRACE_EXPORTER=none), so a test
+run never tries to reach the collector. ``manage.py test --update-baselines``
+records the p95 of every latency test as its baseline, as PERF_RECORD=1
+does (see ``amms_common.perftest``).
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+from . import perftest
+
+
+class TestRunner(DiscoverRunner):
+    def __init__(self, update_baselines=False, **kwargs):
+        super().__init__(**kwargs)
+        self.update_baselines = update_baselines
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--update-baselines', action='store_true',
+            help='Record the p95 of each latency test as its new baseline (PERF_RECORD=1).',
+        )
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # Not restored at teardown: the spans the tests buffered are flushed
+        # at exit, and must not be exported then either.
+        settings.TRACE_EXPORTER = 'none'
+        if self.update_baselines:
+            perftest.RECORD = True
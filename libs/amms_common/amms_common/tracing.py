@@ -0,0 +1,484 @@
+"""
+Distributed tracing with W3C Trace Context.
+
+A trace follows one request from the gateway through every service it
+reaches. ``TracingMiddleware`` continues the trace named by the request's
+``traceparent`` header, or starts a new one, and returns the request's own
+span in a ``traceresponse`` header so a slow response can be looked up.
+Below it:
+
+* ``ViewTracingMiddleware``, last in MIDDLEWARE, spans the view;
+* every DB query, ``TracedRedisCache`` call and DRF serializer
+  ``is_valid()``/``data`` gets a span;
+* ``outbound()`` spans a call to another service and supplies the
+  ``traceparent`` header that continues the trace there;
+* ``instrument_celery()`` carries the trace from ``delay()`` into the task.
+
+Whether a trace is recorded is decided once, where it starts, with
+probability TRACE_SAMPLE_RATE. Services downstream follow the sampled flag
+in ``traceparent``. An unsampled request still passes its trace id on but
+records nothing, which costs a context lookup per query or cache call.
+
+Each process exports finished spans in batches from a background thread,
+either to an OTLP/HTTP collector (TRACE_EXPORTER=otlp, TRACE_OTLP_ENDPOINT)
+or as OTLP JSON lines appended to TRACE_FILE (TRACE_EXPORTER=file). Jaeger
+in docker-compose shows the exported traces as waterfalls;
+``render_waterfall()`` draws one from the JSON lines.
+"""
+import atexit
+import collections
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache.backends.redis import RedisCache
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT = 'traceparent'
+KINDS = {'internal': 1, 'server': 2, 'client': 3, 'producer': 4, 'consumer': 5}
+BATCH_SIZE = 512
+MAX_STATEMENT = 2000
+
+_current = contextvars.ContextVar('tracing_span', default=None)
+
+
+class Span:
+    __slots__ = (
+        'trace_id', 'span_id', 'parent_id', 'sampled', 'name', 'kind',
+        'attributes', 'start_ns', 'end_ns', 'error',
+    )
+
+    def __init__(self, trace_id, parent_id, sampled, name, kind='internal', attributes=None):
+        self.trace_id = trace_id
+        self.span_id = f'{random.getrandbits(64) or 1:016x}'
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def fail(self, exc):
+        self.error = f'{type(exc).__name__}: {exc}'
+
+    def finish(self):
+        self.end_ns = time.time_ns()
+        if self.sampled:
+            exporter.add(self)
+
+    def to_otlp(self):
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': KINDS[self.kind],
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': _otlp_attributes(self.attributes),
+            'status': {'code': 2, 'message': self.error} if self.error else {},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+def _otlp_attributes(attributes):
+    encoded = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            value = {'boolValue': value}
+        elif isinstance(value, int):
+            value = {'intValue': str(value)}
+        elif isinstance(value, float):
+            value = {'doubleValue': value}
+        else:
+            value = {'stringValue': str(value)}
+        encoded.append({'key': key, 'value': value})
+    return encoded
+
+
+def parse_traceparent(value):
+    """``(trace_id, parent_id, sampled)`` from a ``traceparent`` header, or None."""
+    parts = (value or '').strip().lower().split('-')
+    if len(parts) < 4 or parts[0] == 'ff' or (parts[0] == '00' and len(parts) != 4):
+        return None
+    version, trace_id, parent_id, flags = parts[:4]
+    if len(version) != 2 or len(trace_id) != 32 or len(parent_id) != 16 or len(flags) != 2:
+        return None
+    try:
+        int(trace_id, 16), int(parent_id, 16)
+        sampled = bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+    if not int(trace_id, 16) or not int(parent_id, 16):
+        return None
+    return trace_id, parent_id, sampled
+
+
+def start(name, traceparent=None, kind='server', attributes=None):
+    """
+    A span continuing ``traceparent``, else the current span, else a new
+    trace sampled at TRACE_SAMPLE_RATE. The caller makes it current and
+    ``finish()``es it.
+    """
+    parent = parse_traceparent(traceparent)
+    if parent is None:
+        current = _current.get()
+        if current is not None:
+            parent = current.trace_id, current.span_id, current.sampled
+        else:
+            trace_id = f'{random.getrandbits(128) or 1:032x}'
+            parent = trace_id, None, random.random() < settings.TRACE_SAMPLE_RATE
+    return Span(*parent, name, kind, attributes)
+
+
+@contextmanager
+def span(name, kind='internal', attributes=None):
+    """Span the block as a child of the current span, if that is sampled."""
+    parent = _current.get()
+    if parent is None or not parent.sampled:
+        yield None
+        return
+    child = Span(parent.trace_id, parent.span_id, True, name, kind, attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as exc:
+        child.fail(exc)
+        raise
+    finally:
+        _current.reset(token)
+        child.finish()
+
+
+def annotate(attributes):
+    """Add ``attributes`` to the current span, if it is recorded."""
+    current = _current.get()
+    if current is not None and current.sampled:
+        current.attributes.update(attributes)
+
+
+@contextmanager
+def outbound(method, url, headers=None):
+    """
+    Span a call to another service. Yields ``headers`` plus the
+    ``traceparent`` that continues the trace in that service.
+    """
+    headers = dict(headers or {})
+    attributes = {'http.method': method, 'http.url': url}
+    with span(f'{method} {urlsplit(url).netloc}', 'client', attributes) as client:
+        current = client or _current.get()
+        if current is not None:
+            headers[TRACEPARENT] = current.traceparent
+        yield headers
+
+
+class _Exporter:
+    """Buffers finished spans and sends them in batches from a thread."""
+
+    def __init__(self):
+        self._spans = collections.deque()
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._failing = False
+
+    def add(self, span):
+        if self._pid != os.getpid():
+            self._start()
+        if len(self._spans) >= settings.TRACE_QUEUE_SIZE:
+            return
+        self._spans.append(span)
+        if len(self._spans) >= BATCH_SIZE:
+            self._wake.set()
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # Spans buffered before a fork belong to the parent.
+            self._spans.clear()
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, daemon=True).start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(settings.TRACE_EXPORT_INTERVAL)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            while self._spans:
+                batch = []
+                while self._spans and len(batch) < BATCH_SIZE:
+                    batch.append(self._spans.popleft())
+                try:
+                    self._send(batch)
+                except (OSError, ValueError) as exc:
+                    # Drop the backlog rather than wait out a timeout per batch.
+                    if not self._failing:
+                        logger.warning("Exporting spans failed, dropping %d: %s", len(batch) + len(self._spans), exc)
+                    self._failing = True
+                    self._spans.clear()
+                else:
+                    self._failing = False
+
+    def _send(self, batch):
+        payload = json.dumps({'resourceSpans': [{
+            'resource': {'attributes': _otlp_attributes({'service.name': settings.TRACE_SERVICE_NAME})},
+            'scopeSpans': [{'scope': {'name': __name__}, 'spans': [span.to_otlp() for span in batch]}],
+        }]})
+        if settings.TRACE_EXPORTER == 'otlp':
+            request = urllib.request.Request(
+                settings.TRACE_OTLP_ENDPOINT, data=payload.encode(),
+                headers={'Content-Type': 'application/json'},
+            )
+            urllib.request.urlopen(request, timeout=5).close()
+        elif settings.TRACE_EXPORTER == 'file':
+            os.makedirs(os.path.dirname(os.path.abspath(settings.TRACE_FILE)), exist_ok=True)
+            with open(settings.TRACE_FILE, 'a') as file:
+                file.write(payload + '\n')
+
+
+exporter = _Exporter()
+
+
+def _trace_query(execute, sql, params, many, context):
+    parent = _current.get()
+    if parent is None or not parent.sampled:
+        return execute(sql, params, many, context)
+    connection = context['connection']
+    attributes = {
+        'db.system': connection.vendor,
+        'db.name': connection.alias,
+        'db.statement': sql[:MAX_STATEMENT],
+    }
+    if many:
+        attributes['db.executemany'] = True
+    operation = (sql.split(None, 1) or ['?'])[0].upper()
+    with span(f'db {operation}', 'client', attributes):
+        return execute(sql, params, many, context)
+
+
+def _install_query_tracing(sender, connection, **kwargs):
+    # At the front: connection.execute_wrapper() blocks pop the last wrapper.
+    if _trace_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _trace_query)
+
+
+connection_created.connect(_install_query_tracing)
+
+
+class TracedRedisCache(RedisCache):
+    """``RedisCache`` that spans every call."""
+
+
+def _traced_cache_method(name):
+    method = getattr(RedisCache, name)
+
+    def traced(self, *args, **kwargs):
+        with span(f'cache {name}', 'client', {'db.system': 'redis'}):
+            return method(self, *args, **kwargs)
+
+    traced.__name__ = name
+    return traced
+
+
+for _name in (
+    'add', 'get', 'set', 'touch', 'delete', 'get_many', 'has_key', 'incr',
+    'set_many', 'delete_many', 'clear',
+):
+    setattr(TracedRedisCache, _name, _traced_cache_method(_name))
+
+
+def _serializer_name(serializer):
+    child = getattr(serializer, 'child', None)
+    return f'{type(child).__name__}[]' if child is not None else type(serializer).__name__
+
+
+def instrument_serializers():
+    """Span DRF serializer validation and output; safe to call repeatedly."""
+    from rest_framework.serializers import BaseSerializer
+
+    if getattr(BaseSerializer, '_traced', False):
+        return
+    data, is_valid = BaseSerializer.data, BaseSerializer.is_valid
+
+    def traced_data(self):
+        with span(f'serialize {_serializer_name(self)}'):
+            return data.fget(self)
+
+    def traced_is_valid(self, *args, **kwargs):
+        with span(f'validate {_serializer_name(self)}'):
+            return is_valid(self, *args, **kwargs)
+
+    BaseSerializer.data = property(traced_data)
+    BaseSerializer.is_valid = traced_is_valid
+    BaseSerializer._traced = True
+
+
+class TracingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument_serializers()
+
+    def __call__(self, request):
+        server = start(request.method, request.META.get('HTTP_TRACEPARENT'), 'server', {
+            'http.method': request.method,
+            'http.target': request.path,
+        })
+        token = _current.set(server)
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        except BaseException as exc:
+            server.fail(exc)
+            raise
+        finally:
+            _current.reset(token)
+            match = getattr(request, 'resolver_match', None)
+            route = match.route if match is not None else '<unmatched>'
+            server.name = f'{request.method} {route}'
+            server.attributes['http.route'] = route
+            if response is not None:
+                server.attributes['http.status_code'] = response.status_code
+                if response.status_code >= 500:
+                    server.error = f'HTTP {response.status_code}'
+                response['traceresponse'] = server.traceparent
+            server.finish()
+
+
+class ViewTracingMiddleware:
+    """Last in MIDDLEWARE, so its span covers URL resolution and the view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with span('view') as view:
+            response = self.get_response(request)
+            match = getattr(request, 'resolver_match', None)
+            if view is not None and match is not None:
+                view.name = f'view {_view_name(match.func, request.method)}'
+            return response
+
+
+def _view_name(func, method):
+    view = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    if view is None:
+        return f'{func.__module__}.{func.__qualname__}'
+    action = (getattr(func, 'actions', None) or {}).get(method.lower())
+    name = f'{view.__module__}.{view.__qualname__}'
+    return f'{name}.{action}' if action else name
+
+
+def instrument_celery():
+    """Carry the publisher's trace into tasks, and span each task run."""
+    from celery import signals
+
+    running = {}
+
+    @signals.before_task_publish.connect(weak=False)
+    def task_publishing(headers=None, **kwargs):
+        current = _current.get()
+        if current is not None and headers is not None:
+            headers.setdefault(TRACEPARENT, current.traceparent)
+
+    @signals.task_prerun.connect(weak=False)
+    def task_started(task_id=None, task=None, **kwargs):
+        task_span = start(f'task {task.name}', getattr(task.request, TRACEPARENT, None), 'consumer', {
+            'celery.task_id': task_id,
+        })
+        running[task_id] = task_span, _current.set(task_span)
+
+    @signals.task_failure.connect(weak=False)
+    def task_failed(task_id=None, exception=None, **kwargs):
+        if task_id in running:
+            running[task_id][0].fail(exception)
+
+    @signals.task_postrun.connect(weak=False)
+    def task_finished(task_id=None, state=None, **kwargs):
+        task_span, token = running.pop(task_id, (None, None))
+        if task_span is None:
+            return
+        _current.reset(token)
+        task_span.attributes['celery.state'] = state or 'UNKNOWN'
+        task_span.finish()
+
+    @signals.worker_process_shutdown.connect(weak=False)
+    def worker_process_exiting(**kwargs):
+        exporter.flush()
+
+
+def read_traces(paths):
+    """``{trace_id: [span, ...]}`` from OTLP JSON lines files; spans gain ``service``."""
+    traces = collections.defaultdict(list)
+    for path in paths:
+        with open(path) as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                for resource_spans in json.loads(line).get('resourceSpans', []):
+                    resource = {
+                        attribute['key']: attribute['value'].get('stringValue')
+                        for attribute in resource_spans.get('resource', {}).get('attributes', [])
+                    }
+                    for scope_spans in resource_spans.get('scopeSpans', []):
+                        for otlp_span in scope_spans.get('spans', []):
+                            otlp_span['service'] = resource.get('service.name', '?')
+                            traces[otlp_span['traceId']].append(otlp_span)
+    return traces
+
+
+def render_waterfall(spans, width=50):
+    """
+    One line per span of a trace, children indented under their parent,
+    with its offset, duration and a bar placed on the trace's timeline.
+    """
+    by_parent = collections.defaultdict(list)
+    ids = {otlp_span['spanId'] for otlp_span in spans}
+    for otlp_span in spans:
+        parent = otlp_span.get('parentSpanId')
+        by_parent[parent if parent in ids else None].append(otlp_span)
+    begin = min(int(otlp_span['startTimeUnixNano']) for otlp_span in spans)
+    end = max(int(otlp_span['endTimeUnixNano']) for otlp_span in spans)
+    scale = width / max(end - begin, 1)
+
+    lines = [f"{'start ms':>9} {'ms':>9}  {'service':<20} span"]
+
+    def walk(parent, depth):
+        for otlp_span in sorted(by_parent[parent], key=lambda s: int(s['startTimeUnixNano'])):
+            started = int(otlp_span['startTimeUnixNano']) - begin
+            duration = int(otlp_span['endTimeUnixNano']) - int(otlp_span['startTimeUnixNano'])
+            offset = int(started * scale)
+            bar = ' ' * offset + '#' * max(1, round(duration * scale))
+            failed = ' !' if otlp_span.get('status', {}).get('code') == 2 else ''
+            name = '  ' * depth + otlp_span['name'] + failed
+            lines.append(
+                f"{started / 1e6:>9.1f} {duration / 1e6:>9.1f}  {otlp_span['service']:<20} "
+                f"{name:<60.60} |{bar:<{width}.{width}}|"
+            )
+            walk(otlp_span['spanId'], depth + 1)
+
+    walk(None, 0)
+    return '\n'.join(lines)
@@ -0,0 +1,7 @@
+"""
+Load tests for the whole stack, driven through the API gateway.
+
+``python -m loadtest <scenario>``; see ``__main__`` for usage. Services
+started by ``local_stack`` import ``service_settings`` from here, so keep
+this module free of imports.
+"""
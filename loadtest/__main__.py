@@ -0,0 +1,135 @@
+"""
+Load test the stack through the gateway.
+
+Runs a scenario (see ``loadtest/scenarios``) against a running stack, such
+as docker-compose's gateway, or against a local stand-in stack it starts
+itself (see ``loadtest.local_stack``). Prints a latency and error report
+per request and per ramp stage, and exits with status 1 when the
+scenario's thresholds are breached.
+
+Usage (from the repository root):
+    python -m loadtest loadtest/scenarios/smoke.json --local
+    python -m loadtest loadtest/scenarios/release.json --local --db mysql --output release.json
+    python -m loadtest loadtest/scenarios/release.json --target http://localhost:8080 \\
+        --username clerk --password ... --seed
+
+Against a shared stack, every virtual user logs in as --username, or in
+turn as the users in --credentials (a file of ``username,password``
+lines). Inventory and requisition look a token's user up in their own
+databases, so these users must exist there too. --seed creates the scenario's ``seed`` data first; the local stack
+is always seeded.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from .actions import LoginFailed, seed
+from .local_stack import LocalStack, StackError
+from .runner import Runner
+from .scenario import Scenario, ScenarioError
+
+PROGRESS_EVERY = 10  # seconds
+
+
+def read_credentials(path):
+    credentials = []
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                username, _, password = line.partition(',')
+                credentials.append((username.strip(), password.strip()))
+    return credentials
+
+
+def print_progress(elapsed, stage, users, stats):
+    if int(elapsed) % PROGRESS_EVERY:
+        return
+    total = stats.total()
+    p95 = total.latency.percentile(95)
+    print(
+        f'{elapsed:6.0f}s  stage {stage + 1}/{len(stats.stages)}  {users:>4} users  '
+        f'{total.latency.count:>8} requests  {100 * total.error_rate:5.2f}% errors  '
+        f"p95 {f'{p95:.0f} ms' if p95 is not None else '-'}",
+        flush=True,
+    )
+
+
+def run(args, scenario, target, credentials):
+    if args.seed and scenario.seed:
+        print(f'Seeding {target}: {scenario.seed}...', flush=True)
+        failed = seed(target, credentials[0], timeout=args.timeout, **scenario.seed)
+        if failed:
+            print(f'  {failed} seed calls failed', file=sys.stderr)
+
+    print(f'Running {scenario.name!r} against {target}: up to {scenario.peak_users} users '
+          f'for {scenario.duration:g} s', flush=True)
+    started_at = time.time()
+    runner = Runner(scenario, target, credentials, timeout=args.timeout, progress=print_progress)
+    stats = runner.run()
+    print()
+    print(stats.render())
+
+    report = stats.report()
+    breaches = scenario.check(report)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({
+                'scenario': scenario.name,
+                'target': target,
+                'started_at': started_at,
+                'breaches': breaches,
+                **report,
+            }, file, indent=2)
+    if breaches:
+        print('\nThresholds breached:')
+        for breach in breaches:
+            print(f'  {breach}')
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('scenario', help='scenario JSON file')
+    where = parser.add_mutually_exclusive_group()
+    where.add_argument('--target', default=os.environ.get('LOADTEST_TARGET', 'http://localhost:8080'),
+                       help='gateway URL of a running stack (default: %(default)s)')
+    where.add_argument('--local', action='store_true', help='start a local stand-in stack and test that')
+    parser.add_argument('--db', choices=['sqlite', 'mysql'], default='sqlite', help='database of the local stack')
+    parser.add_argument('--port', type=int, default=18080, help='gateway port of the local stack')
+    parser.add_argument('--web-workers', type=int, default=4, help='gunicorn workers per local service')
+    parser.add_argument('--keep', action='store_true', help="keep the local stack's data and logs")
+    parser.add_argument('--username', default=os.environ.get('LOADTEST_USERNAME'))
+    parser.add_argument('--password', default=os.environ.get('LOADTEST_PASSWORD'))
+    parser.add_argument('--credentials', help='file of username,password lines')
+    parser.add_argument('--seed', action='store_true', help="create the scenario's seed data first")
+    parser.add_argument('--timeout', type=float, default=30, help='seconds before a request counts as failed')
+    parser.add_argument('--output', help='write the report as JSON to this file')
+    args = parser.parse_args()
+
+    try:
+        scenario = Scenario.load(args.scenario)
+        if args.local:
+            with LocalStack(db=args.db, port=args.port, web_workers=args.web_workers, keep=args.keep) as stack:
+                args.seed = True
+                return run(args, scenario, stack.target, [stack.credentials])
+
+        if args.credentials:
+            credentials = read_credentials(args.credentials)
+        elif args.username and args.password:
+            credentials = [(args.username, args.password)]
+        else:
+            parser.error('give --username and --password, or --credentials, or use --local')
+        if not credentials:
+            parser.error(f'no credentials in {args.credentials}')
+        return run(args, scenario, args.target, credentials)
+    except (ScenarioError, StackError, LoginFailed) as exc:
+        print(exc, file=sys.stderr)
+        return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
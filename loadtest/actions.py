@@ -0,0 +1,184 @@
+"""
+What a virtual user does, all of it through the gateway.
+
+Calls go to ``<target>/api/<service>/<path>``, the way the frontend reaches
+the services. A user logs in when it starts and sends its access token
+with every call. A 401 means the token expired during a long run: the user
+logs in again and retries once, and the 401 does not count as an error.
+
+``ACTIONS`` are what a scenario's ``mix`` picks from; one action may make
+several calls (a dashboard poll fetches every panel).
+"""
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+LOGIN_PATH = '/api/user/api/v1/auth/login/'
+
+# Synthetic data, shared by the seed and the actions, so that searches and
+# reports hit rows that exist.
+MANUFACTURERS = ['Glock', 'Beretta', 'Heckler & Koch', 'Kalashnikov', 'Remington', 'Sig Sauer', 'FN Herstal']
+MODELS = ['G17', '92FS', 'MP5', 'AK-47', '870', 'P226', 'FAL', 'G19', 'UMP45']
+CALIBRES = ['9mm', '7.62x39mm', '5.56mm', '12 gauge', '.45 ACP']
+ARM_TYPES = ['pistol', 'rifle', 'shotgun', 'submachine_gun', 'sniper_rifle']
+STATIONS = [f'Station {index:02d}' for index in range(40)]
+RANKS = ['Constable', 'Corporal', 'Sergeant', 'Inspector']
+
+SEARCH_TERMS = ['glock', 'ak', 'mp5', 'beretta', '9mm', 'sig', '870', 'LT-']
+REPORT_GROUPS = ['station_unit', 'firearm_type', 'status', 'station_unit,status', 'rank,firearm_type']
+
+
+class LoginFailed(Exception):
+    pass
+
+
+class VirtualUser:
+    def __init__(self, target, credentials, stats=None, stage=lambda: None, timeout=30):
+        self.target = target.rstrip('/')
+        self.username, self.password = credentials
+        self.stats = stats
+        self.stage = stage  # the current ramp stage, to file each call under
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.access = None
+        self.profile = {}
+
+    def close(self):
+        self.session.close()
+
+    def login(self):
+        response = self.call('login', 'POST', LOGIN_PATH, json={
+            'username': self.username, 'password': self.password,
+        }, authenticated=False)
+        if response is None or response.status_code != 200:
+            self.access = None
+            return False
+        data = response.json()
+        self.access = data.get('access')
+        self.profile = data.get('user') or {}
+        return True
+
+    def call(self, name, method, path, authenticated=True, **kwargs):
+        """Send one request and record it; None if it never got a response."""
+        response = self._send(name, method, path, authenticated, retry=authenticated, **kwargs)
+        if response is not None and response.status_code == 401 and authenticated and self.login():
+            response = self._send(name, method, path, authenticated, retry=False, **kwargs)
+        return response
+
+    def _send(self, name, method, path, authenticated, retry, **kwargs):
+        headers = {}
+        if authenticated and self.access:
+            headers['Authorization'] = f'Bearer {self.access}'
+        stage = self.stage()
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.target + path, headers=headers,
+                                            timeout=self.timeout, **kwargs)
+        except requests.RequestException as exc:
+            self._record(name, stage, started, type(exc).__name__, True)
+            return None
+        status = response.status_code
+        self._record(name, stage, started, status, status >= 400 and not (status == 401 and retry))
+        return response
+
+    def _record(self, name, stage, started, status, error):
+        if self.stats is not None:
+            self.stats.record(name, stage, (time.perf_counter() - started) * 1000, status, error)
+
+
+def login(user):
+    user.login()
+
+
+def inventory_search(user):
+    user.call('inventory.search', 'GET', '/api/inventory/api/arms/search/',
+              params={'q': random.choice(SEARCH_TERMS)})
+
+
+def dashboard_poll(user):
+    user.call('inventory.dashboard', 'GET', '/api/inventory/api/arms/dashboard/')
+    user.call('requisitions.summary', 'GET', '/api/requisition/api/requisitions/summary/',
+              params={'group_by': 'station_unit,status'})
+    user.call('reporting.total_requisitions', 'GET', '/api/reporting/api/total-requisitions/')
+    user.call('reporting.arms_status_summary', 'GET', '/api/reporting/api/arms-status-summary/')
+
+
+def submit_requisition(user):
+    user.call('requisitions.create', 'POST', '/api/requisition/api/requisitions/',
+              json=_requisition(user.profile))
+
+
+def generate_report(user):
+    user.call('reporting.adhoc', 'GET', '/api/reporting/api/reports/adhoc/', params={
+        'dataset': 'requisitions',
+        'group_by': random.choice(REPORT_GROUPS),
+        'metrics': 'count,sum:quantity,distinct:service_number',
+    })
+
+
+ACTIONS = {
+    'login': login,
+    'inventory_search': inventory_search,
+    'dashboard_poll': dashboard_poll,
+    'submit_requisition': submit_requisition,
+    'generate_report': generate_report,
+}
+
+
+def _requisition(profile, index=None):
+    index = random.randrange(10_000) if index is None else index
+    return {
+        'service_number': profile.get('service_number') or f'LT-{index % 5000:05d}',
+        'rank': profile.get('rank') or RANKS[index % len(RANKS)],
+        'name': ' '.join(filter(None, [profile.get('first_name'), profile.get('last_name')])) or f'Officer {index}',
+        'station_unit': random.choice(STATIONS),
+        'firearm_type': random.choice(ARM_TYPES),
+        'quantity': random.randint(1, 5),
+    }
+
+
+def _arm(run, index):
+    return {
+        'serial_number': f'LT-{run}-{index:07d}',
+        'model': MODELS[index % len(MODELS)],
+        'calibre': CALIBRES[index % len(CALIBRES)],
+        'type': ARM_TYPES[index % len(ARM_TYPES)],
+        'manufacturer': MANUFACTURERS[index % len(MANUFACTURERS)],
+    }
+
+
+def seed(target, credentials, arms=0, requisitions=0, workers=8, timeout=30):
+    """
+    Create ``arms`` firearms and ``requisitions`` requisitions through the
+    gateway, so a fresh stack has data to search and report on. Returns the
+    number of calls that failed.
+    """
+    run = uuid.uuid4().hex[:6]  # keeps serial numbers unique across seeds
+    users = [VirtualUser(target, credentials, timeout=timeout) for _ in range(workers)]
+    for user in users:
+        if not user.login():
+            raise LoginFailed(f'Cannot log in to {target} as {credentials[0]}')
+
+    def create(user, jobs):
+        failed = 0
+        for kind, index in jobs:
+            if kind == 'arm':
+                response = user.call('seed', 'POST', '/api/inventory/api/arms/', json=_arm(run, index))
+            else:
+                payload = {**_requisition({}, index), 'service_number': f'LT-{index % 5000:05d}'}
+                response = user.call('seed', 'POST', '/api/requisition/api/requisitions/', json=payload)
+            if response is None or response.status_code != 201:
+                failed += 1
+        return failed
+
+    jobs = [('arm', index) for index in range(arms)] + [('requisition', index) for index in range(requisitions)]
+    try:
+        # One user, and so one session, per thread.
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return sum(executor.map(create, users, [jobs[start::workers] for start in range(workers)]))
+    finally:
+        for user in users:
+            user.close()
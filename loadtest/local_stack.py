@@ -0,0 +1,292 @@
+"""
+The whole stack on this machine, for load tests without docker-compose.
+
+Each docker-compose service runs as a local process from its directory,
+the way its container runs it in production: gunicorn with the service's
+``gunicorn_conf``, the Celery worker with beat, the outbox relay and the
+reporting event consumer. The gateway runs under ``runserver``, as in its
+Dockerfile. Settings come from ``loadtest.service_settings``, which keeps
+each service's own settings and swaps in:
+
+* SQLite files in a temporary directory, or with ``db='mysql'`` one
+  throwaway ``mysql:8.0`` container (run with docker) holding a database
+  per service;
+* an in-process fake Redis (fakeredis) on a free port, shared by every
+  service, as the compose ``redis`` is.
+
+The gateway listens on ``port`` and the services on the ports after it. An
+admin user, ADMIN_USERNAME, is created in every service for the load to
+log in as. Process output goes to ``<tmp>/logs/<process>.log``; the
+directory is removed on stop unless ``keep``.
+
+Needs each service's requirements, and ``loadtest/requirements.txt``,
+installed in the running interpreter.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+REPO = Path(__file__).resolve().parent.parent
+
+ADMIN_USERNAME = 'loadtest-admin'
+ADMIN_PASSWORD = 'Loadtest-Admin-1'
+MYSQL_IMAGE = 'mysql:8.0'
+MYSQL_PASSWORD = 'loadtest'
+START_TIMEOUT = 120  # seconds for a process to accept connections
+STOP_TIMEOUT = 10
+
+
+class StackError(Exception):
+    pass
+
+
+class Service:
+    def __init__(self, name, directory, package, setup=(), workers=(), gateway=False):
+        self.name = name
+        self.directory = REPO / directory
+        self.package = package
+        self.setup = setup  # manage.py commands after migrate
+        self.workers = workers  # background processes: 'celery', or a manage.py command
+        self.gateway = gateway
+
+
+SERVICES = [
+    Service('user', 'user-service', 'user_service',
+            setup=[['rotate_jwt_keys', '--if-missing']], workers=['celery', ['relay_events']]),
+    Service('inventory', 'inventory-service', 'inventory_service', workers=[['relay_events']]),
+    Service('requisition', 'requisition-service', 'requisition_service', workers=['celery', ['relay_events']]),
+    Service('reporting', 'reporting-service', 'reporting_service', workers=['celery', ['consume_events']]),
+    Service('gateway', 'api-gateway', 'api_gateway', gateway=True),
+]
+
+
+class LocalStack:
+    def __init__(self, db='sqlite', port=18080, web_workers=4, keep=False, log=print):
+        if db not in ('sqlite', 'mysql'):
+            raise StackError(f'Unknown database {db!r}: sqlite or mysql')
+        self.db = db
+        # The gateway on ``port``, the services on the ports after it.
+        backends = [service for service in SERVICES if not service.gateway]
+        self.ports = {'gateway': port, **{service.name: port + index for index, service in enumerate(backends, 1)}}
+        self.web_workers = web_workers
+        self.keep = keep
+        self.log = log
+        self.credentials = (ADMIN_USERNAME, ADMIN_PASSWORD)
+        self.tmp = None
+        self._redis = None
+        self._mysql = None  # (container name, host port)
+        self._processes = []  # (name, Popen, log file)
+
+    @property
+    def target(self):
+        return f"http://127.0.0.1:{self.ports['gateway']}"
+
+    def url(self, name):
+        return f'http://127.0.0.1:{self.ports[name]}'
+
+    def __enter__(self):
+        try:
+            self.start()
+        except BaseException:
+            self.stop()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix='amms-loadtest-'))
+        (self.tmp / 'logs').mkdir()
+        for service in SERVICES:
+            (self.tmp / 'prometheus' / service.name).mkdir(parents=True)
+        self._start_redis()
+        if self.db == 'mysql':
+            self._start_mysql()
+        for service in SERVICES:
+            self.log(f'Setting up {service.name}...')
+            self._manage(service, ['migrate', '--noinput'])
+            for command in service.setup:
+                self._manage(service, command)
+        self._create_admin()
+        for service in SERVICES:
+            self._serve(service)
+        for service in SERVICES:
+            self._wait_until_up(service)
+        self.log(f'Stack up at {self.target} (logs in {self.tmp / "logs"})')
+
+    def stop(self):
+        for name, process, log_file in reversed(self._processes):
+            if process.poll() is None:
+                process.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for name, process, log_file in self._processes:
+            try:
+                process.wait(max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            log_file.close()
+        self._processes = []
+        if self._redis is not None:
+            self._redis.shutdown()
+            self._redis.server_close()
+            self._redis = None
+        if self._mysql is not None:
+            subprocess.run(['docker', 'rm', '-f', self._mysql[0]], capture_output=True)
+            self._mysql = None
+        if self.tmp is not None and not self.keep:
+            shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _start_redis(self):
+        try:
+            from fakeredis import TcpFakeServer
+        except ImportError:
+            raise StackError('The local stack needs fakeredis: pip install -r loadtest/requirements.txt')
+        self._redis = TcpFakeServer(('127.0.0.1', 0), server_type='redis')
+        threading.Thread(target=self._redis.serve_forever, daemon=True).start()
+
+    def _start_mysql(self):
+        name = f'amms-loadtest-mysql-{os.getpid()}'
+        self.log(f'Starting {MYSQL_IMAGE} as {name}...')
+        try:
+            subprocess.run(
+                ['docker', 'run', '-d', '--rm', '--name', name, '-e', f'MYSQL_ROOT_PASSWORD={MYSQL_PASSWORD}',
+                 '-p', '127.0.0.1::3306', MYSQL_IMAGE],
+                check=True, capture_output=True, text=True,
+            )
+        except (OSError, subprocess.CalledProcessError) as exc:
+            raise StackError(f'Cannot start MySQL with docker: {getattr(exc, "stderr", None) or exc}')
+        port = subprocess.run(['docker', 'port', name, '3306'], capture_output=True, text=True).stdout
+        self._mysql = (name, port.strip().splitlines()[0].rsplit(':', 1)[1])
+
+        mysql = ['docker', 'exec', name, 'mysql', '-h127.0.0.1', '-uroot', f'-p{MYSQL_PASSWORD}']
+        # The image restarts the server once after initialising, so wait
+        # for one that answers over TCP.
+        deadline = time.monotonic() + START_TIMEOUT
+        while subprocess.run([*mysql, '-e', 'SELECT 1'], capture_output=True).returncode:
+            if time.monotonic() > deadline:
+                raise StackError(f'MySQL did not come up within {START_TIMEOUT} s')
+            time.sleep(2)
+        databases = ' '.join(
+            f'CREATE DATABASE loadtest_{service.name} CHARACTER SET utf8mb4;'
+            for service in SERVICES if not service.gateway
+        )
+        subprocess.run([*mysql, '-e', databases], check=True, capture_output=True)
+
+    def _env(self, service):
+        host, port = self._redis.server_address
+        env = {
+            **os.environ,
+            'PYTHONPATH': os.pathsep.join(filter(None, [
+                str(REPO), str(service.directory), str(REPO / 'libs' / 'amms_common'), os.environ.get('PYTHONPATH'),
+            ])),
+            'DJANGO_SETTINGS_MODULE': 'loadtest.service_settings',
+            'LOADTEST_BASE_SETTINGS': f'{service.package}.settings',
+            'LOADTEST_REDIS_URL': f'redis://{host}:{port}',
+            'LOADTEST_DB': 'sqlite' if service.gateway else self.db,
+            'LOADTEST_SQLITE_PATH': str(self.tmp / f'{service.name}.sqlite3'),
+            'DJANGO_SECRET_KEY': os.environ.get('DJANGO_SECRET_KEY', 'loadtest-not-a-secret'),
+            'JWT_KEYS_DIR': str(self.tmp / 'jwt-keys'),
+            'JWT_JWKS_URL': f"{self.url('user')}/.well-known/jwks.json",
+            'USER_SERVICE_URL': self.url('user'),
+            'INVENTORY_SERVICE_URL': self.url('inventory'),
+            'REQUISITION_SERVICE_URL': self.url('requisition'),
+            'REPORTING_SERVICE_URL': self.url('reporting'),
+            'INVENTORY_ARMS_URL': f"{self.url('inventory')}/api/arms/",
+            'REQUISITION_LIST_URL': f"{self.url('requisition')}/api/requisitions/",
+            'USER_LIST_URL': f"{self.url('user')}/api/v1/users/",
+            'TRACE_EXPORTER': os.environ.get('TRACE_EXPORTER', 'none'),
+            'WORKER_METRICS_PORT': '0',  # several workers share this host
+            'PROMETHEUS_MULTIPROC_DIR': str(self.tmp / 'prometheus' / service.name),
+            'REPORT_CACHE_DIR': str(self.tmp / 'reports'),
+            'REQUISITION_ARCHIVE_DIR': str(self.tmp / 'archive'),  # written by requisition, read by reporting
+            'PROFILING_DIR': str(self.tmp / 'profiles' / service.name),
+        }
+        if self.db == 'mysql' and not service.gateway:
+            env.update({
+                'DJANGO_DB_NAME': f'loadtest_{service.name}',
+                'DJANGO_DB_USER': 'root',
+                'DJANGO_DB_PASSWORD': MYSQL_PASSWORD,
+                'DJANGO_DB_HOST': '127.0.0.1',
+                'DJANGO_DB_PORT': self._mysql[1],
+            })
+        return env
+
+    def _manage(self, service, command, env=None):
+        result = subprocess.run(
+            [sys.executable, 'manage.py', *command], cwd=service.directory,
+            env=env or self._env(service), capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise StackError(f"{service.name}: manage.py {' '.join(command)} failed:\n{result.stderr[-2000:]}")
+
+    def _create_admin(self):
+        # Services look up a token's user id in their own database, so the
+        # admin is created in each; on fresh databases it gets the same id.
+        for service in SERVICES:
+            if service.gateway:
+                continue
+            env = {
+                **self._env(service),
+                'DJANGO_SUPERUSER_USERNAME': ADMIN_USERNAME,
+                'DJANGO_SUPERUSER_PASSWORD': ADMIN_PASSWORD,
+                'DJANGO_SUPERUSER_EMAIL': f'{ADMIN_USERNAME}@example.com',
+                # The user-service model's required fields; other models ignore them.
+                'DJANGO_SUPERUSER_SERVICE_NUMBER': 'LT-ADMIN',
+                'DJANGO_SUPERUSER_RANK': 'Inspector',
+                'DJANGO_SUPERUSER_FIRST_NAME': 'Load',
+                'DJANGO_SUPERUSER_LAST_NAME': 'Test',
+            }
+            self._manage(service, ['createsuperuser', '--noinput'], env=env)
+
+    def _spawn(self, service, name, command):
+        env = self._env(service)
+        log_file = open(self.tmp / 'logs' / f'{name}.log', 'w')
+        process = subprocess.Popen(command, cwd=service.directory, env=env,
+                                   stdout=log_file, stderr=subprocess.STDOUT)
+        self._processes.append((name, process, log_file))
+
+    def _serve(self, service):
+        bind = f'127.0.0.1:{self.ports[service.name]}'
+        if service.gateway:
+            self._spawn(service, service.name, [sys.executable, 'manage.py', 'runserver', '--noreload', bind])
+        else:
+            self._spawn(service, service.name, [
+                sys.executable, '-m', 'gunicorn', f'{service.package}.wsgi:application',
+                '--config', f'python:{service.package}.gunicorn_conf',
+                '--bind', bind, '--workers', str(self.web_workers),
+            ])
+        for worker in service.workers:
+            if worker == 'celery':
+                self._spawn(service, f'{service.name}-celery', [
+                    sys.executable, '-m', 'celery', '-A', service.package, 'worker', '-B',
+                    '--loglevel=warning', '--concurrency=2',
+                    '--schedule', str(self.tmp / f'{service.name}-celerybeat-schedule'),
+                ])
+            else:
+                self._spawn(service, f'{service.name}-{worker[0]}', [sys.executable, 'manage.py', *worker])
+
+    def _wait_until_up(self, service):
+        deadline = time.monotonic() + START_TIMEOUT
+        url = self.url(service.name)
+        while True:
+            for name, process, log_file in self._processes:
+                if process.poll() is not None:
+                    log = (self.tmp / 'logs' / f'{name}.log').read_text()[-2000:]
+                    raise StackError(f'{name} exited with status {process.returncode}:\n{log}')
+            try:
+                requests.get(url, timeout=5)
+                return
+            except requests.RequestException:
+                pass  # not listening yet, or its workers are still importing Django
+            if time.monotonic() > deadline:
+                raise StackError(f'{service.name} did not come up at {url} within {START_TIMEOUT} s')
+            time.sleep(0.5)
@@ -0,0 +1,94 @@
+"""
+Drives a scenario: one thread per virtual user, started and stopped to
+follow the ramp profile.
+
+Every TICK the controller works out how many users the profile calls for
+and starts or stops users to match. Stopping is cooperative: a user
+finishes its current action first. Each user logs in, then loops: pick an
+action by the mix weights, run it, wait a think time. Load is therefore
+closed-loop, as with real clerks at terminals: when the stack slows down,
+each user sends less, and the report shows it as lower throughput at the
+same user count.
+"""
+import random
+import threading
+import time
+
+from .actions import ACTIONS, VirtualUser
+from .stats import Stats
+
+TICK = 0.1  # seconds between ramp adjustments
+STOP_GRACE = 30  # seconds to wait for users to finish their last action
+
+
+class Runner:
+    def __init__(self, scenario, target, credentials, timeout=30, progress=None):
+        self.scenario = scenario
+        self.target = target
+        self.credentials = credentials  # list of (username, password), shared round-robin
+        self.timeout = timeout
+        self.progress = progress  # called with (elapsed, stage, users, stats) every second
+        self.stats = Stats(scenario.stages)
+        self._stage = None
+        self._users = []  # (thread, stop event), oldest first
+        self._started = 0
+
+    def current_stage(self):
+        return self._stage
+
+    def run(self):
+        names = list(self.scenario.mix)
+        weights = [self.scenario.mix[name] for name in names]
+        self.stats.start()
+        next_progress = 1
+        try:
+            while True:
+                elapsed = self.stats.elapsed()
+                stage, target = self.scenario.at(elapsed)
+                if stage is None:
+                    break
+                self._stage = stage
+                self._resize(target, names, weights)
+                self.stats.note_users(stage, len(self._users))
+                if self.progress and elapsed >= next_progress:
+                    self.progress(elapsed, stage, len(self._users), self.stats)
+                    next_progress += 1
+                time.sleep(TICK)
+        finally:
+            self._resize(0, names, weights)
+            self.stats.finish()
+        return self.stats
+
+    def _resize(self, target, names, weights):
+        while len(self._users) < target:
+            stop = threading.Event()
+            credentials = self.credentials[self._started % len(self.credentials)]
+            self._started += 1
+            thread = threading.Thread(target=self._user, args=(credentials, stop, names, weights), daemon=True)
+            thread.start()
+            self._users.append((thread, stop))
+        stopping = []
+        while len(self._users) > target:
+            thread, stop = self._users.pop()  # newest first
+            stop.set()
+            stopping.append(thread)
+        if target == 0:
+            deadline = time.monotonic() + STOP_GRACE
+            for thread in stopping:
+                thread.join(max(0, deadline - time.monotonic()))
+
+    def _user(self, credentials, stop, names, weights):
+        user = VirtualUser(self.target, credentials, self.stats, self.current_stage, self.timeout)
+        low, high = self.scenario.think_time
+        try:
+            # Users start at different points of their think time, so a ramp
+            # does not send its users' first calls in lockstep.
+            if stop.wait(random.uniform(0, high)):
+                return
+            user.login()
+            while not stop.is_set():
+                action = random.choices(names, weights)[0]
+                ACTIONS[action](user)
+                stop.wait(random.uniform(low, high))
+        finally:
+            user.close()
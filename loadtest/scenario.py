@@ -0,0 +1,150 @@
+"""
+Load test scenarios, read from JSON files (see ``scenarios/``):
+
+    {
+      "name": "release",
+      "stages": [{"duration": "2m", "users": 50}, {"duration": "5m", "users": 50}],
+      "mix": {"login": 5, "inventory_search": 30, "dashboard_poll": 40,
+              "submit_requisition": 15, "generate_report": 10},
+      "think_time": [1, 3],
+      "seed": {"arms": 500, "requisitions": 2000},
+      "thresholds": {"error_rate": 0.01, "p95_ms": 1000,
+                     "requests": {"reporting.adhoc": {"p95_ms": 3000}}}
+    }
+
+``stages`` is the ramp profile: each stage moves the number of virtual
+users linearly from the previous stage's level (0 at the start) to its own
+over its duration, so a constant stage repeats the level and a spike is a
+short stage to a high one. ``mix`` weighs the actions in ``actions.ACTIONS``
+a user picks from, and ``think_time`` is the range of seconds it waits
+between them. ``seed`` is the data ``--seed`` creates before the run, and
+``thresholds`` turn the run into a pass/fail check.
+"""
+import json
+import re
+
+from .actions import ACTIONS
+
+_UNITS = {'s': 1, 'm': 60, 'h': 3600}
+_THRESHOLD_KEYS = ('error_rate', 'p50_ms', 'p90_ms', 'p95_ms', 'p99_ms')
+
+
+class ScenarioError(Exception):
+    pass
+
+
+def parse_duration(value):
+    """Seconds from a number or a string such as ``90``, ``"30s"``, ``"2m"`` or ``"1h"``."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        seconds = float(value)
+    else:
+        match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smh]?)\s*', str(value))
+        if not match:
+            raise ScenarioError(f'Invalid duration: {value!r}')
+        seconds = float(match.group(1)) * _UNITS[match.group(2) or 's']
+    if seconds <= 0:
+        raise ScenarioError(f'Durations must be positive: {value!r}')
+    return seconds
+
+
+class Stage:
+    def __init__(self, duration, users):
+        self.duration = duration
+        self.users = users
+
+
+class Scenario:
+    def __init__(self, name, stages, mix, think_time=(1, 3), seed=None, thresholds=None, description=''):
+        self.name = name
+        self.description = description
+        self.stages = stages
+        self.mix = mix
+        self.think_time = think_time
+        self.seed = seed or {}
+        self.thresholds = thresholds or {}
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except (OSError, ValueError) as exc:
+            raise ScenarioError(f'Cannot read {path}: {exc}')
+        return cls.from_dict(data)
+
+    @classmethod
+    def from_dict(cls, data):
+        stages = []
+        for stage in data.get('stages') or []:
+            users = stage.get('users')
+            if not isinstance(users, int) or users < 0:
+                raise ScenarioError(f'Stage users must be a non-negative integer: {stage!r}')
+            stages.append(Stage(parse_duration(stage.get('duration')), users))
+        if not stages:
+            raise ScenarioError('A scenario needs at least one stage')
+
+        mix = data.get('mix') or {}
+        unknown = sorted(set(mix) - set(ACTIONS))
+        if unknown:
+            raise ScenarioError(f"Unknown actions in mix: {', '.join(unknown)}; known: {', '.join(ACTIONS)}")
+        if not mix or any(not isinstance(weight, (int, float)) or weight < 0 for weight in mix.values()):
+            raise ScenarioError('mix must give each action a non-negative weight')
+        if not sum(mix.values()):
+            raise ScenarioError('mix weights must not all be zero')
+
+        think_time = tuple(data.get('think_time', (1, 3)))
+        if len(think_time) != 2 or not 0 <= think_time[0] <= think_time[1]:
+            raise ScenarioError('think_time must be [min, max] seconds')
+
+        thresholds = data.get('thresholds') or {}
+        for limits in (thresholds, *(thresholds.get('requests') or {}).values()):
+            unknown = sorted(set(limits) - {*_THRESHOLD_KEYS, 'requests'})
+            if unknown:
+                raise ScenarioError(f"Unknown thresholds: {', '.join(unknown)}; known: {', '.join(_THRESHOLD_KEYS)}")
+
+        return cls(
+            name=data.get('name', 'unnamed'),
+            description=data.get('description', ''),
+            stages=stages,
+            mix=mix,
+            think_time=think_time,
+            seed=data.get('seed'),
+            thresholds=thresholds,
+        )
+
+    @property
+    def duration(self):
+        return sum(stage.duration for stage in self.stages)
+
+    @property
+    def peak_users(self):
+        return max(stage.users for stage in self.stages)
+
+    def at(self, elapsed):
+        """``(stage index, target users)`` ``elapsed`` seconds into the run, or ``(None, 0)`` after it."""
+        previous = 0
+        for index, stage in enumerate(self.stages):
+            if elapsed < stage.duration:
+                return index, round(previous + (stage.users - previous) * elapsed / stage.duration)
+            elapsed -= stage.duration
+            previous = stage.users
+        return None, 0
+
+    def check(self, report):
+        """Threshold breaches in ``report`` (``Stats.report()``), as messages."""
+        breaches = []
+        limits = {key: value for key, value in self.thresholds.items() if key != 'requests'}
+        breaches += _breaches('all requests', report['total'], limits)
+        for name, limits in (self.thresholds.get('requests') or {}).items():
+            if name in report['requests']:
+                breaches += _breaches(name, report['requests'][name], limits)
+        return breaches
+
+
+def _breaches(name, row, limits):
+    breaches = []
+    for key, limit in limits.items():
+        value = row.get(key)
+        if value is not None and value > limit:
+            breaches.append(f'{name}: {key} {value:g} > {limit:g}')
+    return breaches
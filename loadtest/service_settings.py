@@ -0,0 +1,79 @@
+"""
+Settings for a service run by ``loadtest.local_stack``.
+
+The service's own settings (the module named by LOADTEST_BASE_SETTINGS),
+with the parts that need the docker-compose network swapped for local
+stand-ins:
+
+* the database: SQLite at LOADTEST_SQLITE_PATH, whose serialised writes
+  make it fine for finding errors but not for absolute numbers, or the
+  throwaway MySQL container (LOADTEST_DB=mysql, connection in the
+  DJANGO_DB_* variables);
+* every ``redis://`` URL: the fake Redis server at LOADTEST_REDIS_URL, with
+  the database number kept, so services share it as they share ``redis``;
+* DEBUG off, as in production, but without the HTTPS redirect;
+* throttle rates lifted: all virtual users reach the services from the
+  gateway's address, which the anonymous login throttle would stop within
+  the first minute.
+"""
+import importlib
+import os
+from urllib.parse import urlsplit
+
+import django
+
+_base = importlib.import_module(os.environ['LOADTEST_BASE_SETTINGS'])
+globals().update({name: value for name, value in vars(_base).items() if name.isupper()})
+
+_REDIS_URL = os.environ['LOADTEST_REDIS_URL'].rstrip('/')
+
+
+def _local_redis(value):
+    if isinstance(value, str) and value.startswith('redis://'):
+        return _REDIS_URL + urlsplit(value).path
+    if isinstance(value, dict):
+        return {key: _local_redis(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_local_redis(item) for item in value)
+    return value
+
+
+for _name, _value in list(globals().items()):
+    if _name.isupper():
+        globals()[_name] = _local_redis(_value)
+
+_database = dict(DATABASES['default'])  # noqa: F821 (from the base settings)
+if os.environ.get('LOADTEST_DB', 'sqlite') == 'sqlite':
+    _database.update({
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['LOADTEST_SQLITE_PATH'],
+        # Concurrent writers wait for the lock rather than fail.
+        'OPTIONS': {'timeout': 30},
+    })
+    if django.VERSION >= (5, 1):
+        # A write's transaction takes the write lock up front: upgrading a
+        # read lock mid-transaction fails at once with "database is locked"
+        # instead of waiting out the timeout.
+        _database['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+else:
+    _database.update({
+        'ENGINE': 'django.db.backends.mysql',
+        'NAME': os.environ['DJANGO_DB_NAME'],
+        'USER': os.environ['DJANGO_DB_USER'],
+        'PASSWORD': os.environ['DJANGO_DB_PASSWORD'],
+        'HOST': os.environ['DJANGO_DB_HOST'],
+        'PORT': os.environ['DJANGO_DB_PORT'],
+    })
+DATABASES = {'default': _database}
+
+DEBUG = False
+SECURE_SSL_REDIRECT = False
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
+
+if 'REST_FRAMEWORK' in globals():
+    REST_FRAMEWORK = {
+        **REST_FRAMEWORK,  # noqa: F821
+        'DEFAULT_THROTTLE_RATES': {
+            scope: '1000000/hour' for scope in REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {})  # noqa: F821
+        },
+    }
@@ -0,0 +1,240 @@
+"""
+Latency histograms and error counts for a load test run.
+
+Each request is recorded under its name (``inventory.search``) and under
+the ramp stage it started in, so a report shows both which calls are slow
+and at what load they got slow. Latencies go into log-spaced buckets about
+2% wide, so percentiles are accurate to within 2% at any duration and a
+histogram takes the same memory for a minute's run as for an hour's.
+"""
+import bisect
+import collections
+import math
+import threading
+import time
+
+PRECISION = 0.02  # relative width of a histogram bucket
+MIN_MS = 0.1
+
+# Rows of the printed histogram: upper bounds in ms.
+DISPLAY_BOUNDS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, math.inf)
+BAR_WIDTH = 40
+
+_LOG_BASE = math.log1p(PRECISION)
+
+
+def _bucket(ms):
+    return max(0, int(math.log(max(ms, MIN_MS) / MIN_MS) / _LOG_BASE))
+
+
+def _bucket_upper(index):
+    return MIN_MS * math.exp((index + 1) * _LOG_BASE)
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = collections.Counter()
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms):
+        self.buckets[_bucket(ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def merge(self, other):
+        self.buckets.update(other.buckets)
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def percentile(self, q):
+        """The upper edge of the bucket holding the ``q``-th percentile (0-100)."""
+        if not self.count:
+            return None
+        rank = math.ceil(self.count * q / 100)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(_bucket_upper(index), self.max_ms)
+        return self.max_ms
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else None
+
+    def display_rows(self):
+        """``(upper bound, count)`` per row of DISPLAY_BOUNDS."""
+        counts = [0] * len(DISPLAY_BOUNDS)
+        for index, count in self.buckets.items():
+            # A bucket straddling a bound is shown under the row of its midpoint.
+            middle = MIN_MS * math.exp((index + 0.5) * _LOG_BASE)
+            counts[bisect.bisect_left(DISPLAY_BOUNDS, middle)] += count
+        return list(zip(DISPLAY_BOUNDS, counts))
+
+    def render(self):
+        rows = self.display_rows()
+        last = max((i for i, (_, count) in enumerate(rows) if count), default=-1)
+        peak = max((count for _, count in rows), default=0)
+        lines = []
+        for bound, count in rows[:last + 1]:
+            label = f'<= {bound:g} ms' if bound != math.inf else f'>  {DISPLAY_BOUNDS[-2]:g} ms'
+            bar = '#' * round(BAR_WIDTH * count / peak) if peak else ''
+            share = 100 * count / self.count
+            lines.append(f'  {label:>13} {count:>8} {share:5.1f}% {bar}')
+        return '\n'.join(lines)
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': _round(self.mean_ms),
+            'p50_ms': _round(self.percentile(50)),
+            'p90_ms': _round(self.percentile(90)),
+            'p95_ms': _round(self.percentile(95)),
+            'p99_ms': _round(self.percentile(99)),
+            'max_ms': _round(self.max_ms if self.count else None),
+        }
+
+
+def _round(value):
+    return round(value, 1) if value is not None else None
+
+
+class Series:
+    """What was recorded for one request name, or one stage."""
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.statuses = collections.Counter()  # status code, or exception class name
+        self.errors = 0
+
+    def record(self, ms, status, error):
+        self.latency.record(ms)
+        self.statuses[str(status)] += 1
+        if error:
+            self.errors += 1
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        self.statuses.update(other.statuses)
+        self.errors += other.errors
+
+    @property
+    def error_rate(self):
+        return self.errors / self.latency.count if self.latency.count else 0.0
+
+    def summary(self, seconds):
+        return {
+            **self.latency.summary(),
+            'rps': round(self.latency.count / seconds, 2) if seconds else None,
+            'errors': self.errors,
+            'error_rate': round(self.error_rate, 4),
+            'statuses': dict(sorted(self.statuses.items())),
+        }
+
+
+class Stats:
+    """Thread-safe recorder shared by the virtual users of a run."""
+
+    def __init__(self, stages):
+        self.stages = stages
+        self.requests = collections.defaultdict(Series)
+        self.by_stage = collections.defaultdict(Series)
+        self.stage_users = collections.defaultdict(int)  # peak users seen per stage
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.started = time.monotonic()
+
+    def finish(self):
+        self.finished = time.monotonic()
+
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def record(self, name, stage, ms, status, error):
+        with self._lock:
+            self.requests[name].record(ms, status, error)
+            self.by_stage[stage].record(ms, status, error)
+
+    def note_users(self, stage, users):
+        with self._lock:
+            self.stage_users[stage] = max(self.stage_users[stage], users)
+
+    def total(self):
+        total = Series()
+        for series in self.requests.values():
+            total.merge(series)
+        return total
+
+    def report(self):
+        """The run as a JSON-ready dict."""
+        elapsed = self.elapsed()
+        stages = []
+        for index, stage in enumerate(self.stages):
+            series = self.by_stage.get(index, Series())
+            stages.append({
+                'stage': index + 1,
+                'duration_s': stage.duration,
+                'target_users': stage.users,
+                'peak_users': self.stage_users.get(index, 0),
+                **series.summary(stage.duration),
+            })
+        return {
+            'duration_s': round(elapsed, 1),
+            'total': self.total().summary(elapsed),
+            'requests': {name: series.summary(elapsed) for name, series in sorted(self.requests.items())},
+            'stages': stages,
+            'histogram': [
+                {'le_ms': bound if bound != math.inf else None, 'count': count}
+                for bound, count in self.total().latency.display_rows()
+            ],
+        }
+
+    def render(self):
+        """The run as a plain-text report."""
+        report = self.report()
+        lines = [f"Ran {report['duration_s']:g} s, {report['total']['count']} requests."]
+
+        header = f"{'request':<30} {'count':>8} {'rps':>8} {'err %':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+        lines += ['', header, '-' * len(header)]
+        rows = [*report['requests'].items(), ('total', report['total'])]
+        for name, row in rows:
+            lines.append(
+                f"{name:<30} {row['count']:>8} {_fmt(row['rps'])} {100 * row['error_rate']:>6.2f}"
+                f" {_fmt(row['p50_ms'])} {_fmt(row['p95_ms'])} {_fmt(row['p99_ms'])} {_fmt(row['max_ms'])}"
+            )
+
+        header = f"{'stage':<6} {'users':>11} {'secs':>6} {'count':>8} {'rps':>8} {'err %':>6} {'p50':>8} {'p95':>8} {'p99':>8}"
+        lines += ['', header, '-' * len(header)]
+        for stage in report['stages']:
+            lines.append(
+                f"{stage['stage']:<6} {stage['peak_users']:>5}/{stage['target_users']:<5} {stage['duration_s']:>6g}"
+                f" {stage['count']:>8} {_fmt(stage['rps'])} {100 * stage['error_rate']:>6.2f}"
+                f" {_fmt(stage['p50_ms'])} {_fmt(stage['p95_ms'])} {_fmt(stage['p99_ms'])}"
+            )
+
+        failing = {
+            name: {status: count for status, count in row['statuses'].items() if not status.startswith(('2', '3'))}
+            for name, row in report['requests'].items()
+        }
+        failing = {name: statuses for name, statuses in failing.items() if statuses}
+        if failing:
+            lines += ['', 'Failures:']
+            for name, statuses in failing.items():
+                described = ', '.join(f'{status} x{count}' for status, count in statuses.items())
+                lines.append(f'  {name}: {described}')
+
+        total = self.total().latency
+        if total.count:
+            lines += ['', 'Latency, all requests (ms):', total.render()]
+        return '\n'.join(lines)
+
+
+def _fmt(value):
+    return f'{value:>8.1f}' if value is not None else f"{'-':>8}"
@@ -0,0 +1,106 @@
+"""
+Benchmark for the ad-hoc columnar aggregation engine.
+
+Builds synthetic requisition frames and times a representative report
+(group by unit and status; count, sum, distinct and p95) through
+``reporting_service.columnar.aggregate``. A row-by-row Python loop over the
+same data, in the style of the old ``arms_status_summary``, is timed on the
+smallest size for comparison.
+
+Usage (from reporting-service/):
+    python benchmarks/adhoc_aggregation.py
+    python benchmarks/adhoc_aggregation.py --rows 1000000 10000000 --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reporting_service.columnar import aggregate, parse_metric  # noqa: E402
+
+UNITS = [f"UNIT-{i:03d}" for i in range(200)]
+TYPES = ['pistol', 'rifle', 'shotgun', 'submachine_gun', 'sniper_rifle', 'other']
+STATUSES = ['pending', 'approved', 'rejected']
+RANKS = ['Constable', 'Corporal', 'Sergeant', 'Inspector', 'Superintendent']
+
+METRICS = ['count', 'sum:quantity', 'distinct:service_number', 'p95:quantity']
+NUMERIC = ('quantity',)
+COLUMNS = ('station_unit', 'firearm_type', 'status', 'rank', 'service_number', 'quantity', 'created_at')
+
+
+def synthetic_requisitions(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2020-01-01T00:00:00')
+    return pd.DataFrame({
+        'station_unit': pd.Categorical.from_codes(rng.integers(0, len(UNITS), rows), UNITS),
+        'firearm_type': pd.Categorical.from_codes(rng.integers(0, len(TYPES), rows), TYPES),
+        'status': pd.Categorical.from_codes(rng.integers(0, len(STATUSES), rows), STATUSES),
+        'rank': pd.Categorical.from_codes(rng.integers(0, len(RANKS), rows), RANKS),
+        'service_number': pd.Categorical(rng.integers(0, 50000, rows).astype(str)),
+        'quantity': rng.integers(1, 20, rows, dtype=np.int64),
+        'created_at': pd.to_datetime(
+            start + rng.integers(0, 5 * 365 * 24 * 3600, rows).astype('timedelta64[s]'), utc=True,
+        ),
+    })
+
+
+def row_loop(frame):
+    """Dict-accumulator baseline, one Python iteration per row."""
+    groups = {}
+    for unit, status, quantity, officer in zip(
+        frame['station_unit'].tolist(), frame['status'].tolist(),
+        frame['quantity'].tolist(), frame['service_number'].tolist(),
+    ):
+        group = groups.setdefault((unit, status), {'count': 0, 'sum': 0, 'officers': set(), 'quantities': []})
+        group['count'] += 1
+        group['sum'] += quantity
+        group['officers'].add(officer)
+        group['quantities'].append(quantity)
+    return {
+        key: (g['count'], g['sum'], len(g['officers']), float(np.percentile(g['quantities'], 95)))
+        for key, g in groups.items()
+    }
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    metrics = [parse_metric(spec, NUMERIC, COLUMNS) for spec in METRICS]
+    group_by = ['station_unit', 'status']
+    filtered = {'firearm_type': ['rifle', 'pistol']}
+
+    print(f"{'rows':>12}  {'report':<28} {'best (s)':>9} {'Mrows/s':>9}")
+    for index, rows in enumerate(args.rows):
+        frame = synthetic_requisitions(rows)
+        cases = [
+            ('grouped', lambda: aggregate(frame, group_by, metrics)),
+            ('grouped + filter', lambda: aggregate(frame, group_by, metrics, equals=filtered)),
+            ('totals only', lambda: aggregate(frame, [], metrics)),
+        ]
+        if index == 0:
+            cases.append(('python row loop (baseline)', lambda: row_loop(frame)))
+        for label, fn in cases:
+            seconds = timed(fn, args.repeat)
+            print(f"{rows:>12,}  {label:<28} {seconds:>9.3f} {rows / seconds / 1e6:>9.1f}")
+        del frame
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark for the analytics export formats.
+
+Encodes synthetic requisition rows as paginated-style JSON (a list of row
+dicts, as the list endpoints return), as an Arrow IPC stream and as a
+Parquet file, in record batches the size the export endpoints use, then
+decodes each back into columns. Reports the best produce and consume time
+and the payload size for every format.
+
+Usage (from reporting-service/):
+    python benchmarks/export_formats.py
+    python benchmarks/export_formats.py --rows 100000 1000000 --batch-size 65536
+"""
+import argparse
+import io
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from adhoc_aggregation import synthetic_requisitions, timed
+
+
+def batches(table, batch_size):
+    return table.to_batches(max_chunksize=batch_size)
+
+
+def produce_json(records):
+    return json.dumps(records, default=str).encode()
+
+
+def consume_json(payload):
+    rows = json.loads(payload)
+    return {column: [row[column] for row in rows] for column in rows[0]}
+
+
+def produce_arrow(table, batch_size):
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        for batch in batches(table, batch_size):
+            writer.write_batch(batch)
+    return sink.getvalue()
+
+
+def consume_arrow(payload):
+    return pa.ipc.open_stream(payload).read_all()
+
+
+def produce_parquet(table, batch_size):
+    sink = io.BytesIO()
+    with pq.ParquetWriter(sink, table.schema, compression='zstd') as writer:
+        for batch in batches(table, batch_size):
+            writer.write_batch(batch)
+    return sink.getvalue()
+
+
+def consume_parquet(payload):
+    return pq.read_table(io.BytesIO(payload))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--batch-size', type=int, default=65536)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12}  {'format':<8} {'produce (s)':>12} {'consume (s)':>12} {'MiB':>8}")
+    for rows in args.rows:
+        frame = synthetic_requisitions(rows)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        table = table.cast(pa.schema([
+            pa.field(field.name, pa.string() if pa.types.is_dictionary(field.type) else field.type)
+            for field in table.schema
+        ]))
+        records = table.to_pylist()
+
+        cases = [
+            ('json', lambda: produce_json(records), consume_json),
+            ('arrow', lambda: produce_arrow(table, args.batch_size), consume_arrow),
+            ('parquet', lambda: produce_parquet(table, args.batch_size), consume_parquet),
+        ]
+        for label, produce, consume in cases:
+            payload = produce()
+            produce_seconds = timed(produce, args.repeat)
+            consume_seconds = timed(lambda: consume(payload), args.repeat)
+            print(
+                f"{rows:>12,}  {label:<8} {produce_seconds:>12.3f} {consume_seconds:>12.3f} "
+                f"{len(payload) / 2 ** 20:>8.1f}"
+            )
+        del frame, table, records
+
+
+if __name__ == '__main__':
+    main()
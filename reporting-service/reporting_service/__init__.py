@@ -0,0 +1,7 @@
+from __future__ import absolute_import, unicode_literals
+
+# This will make sure the Celery app is always imported when
+# Django starts.
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
\ No newline at end of file
@@ -0,0 +1,161 @@
+"""
+Ad-hoc reports over the reporting read model.
+
+Columns are loaded from the read-model tables on first use and kept in
+process as pandas arrays (low-cardinality text as categoricals), keyed by
+the dataset version. The version is derived from the source's ``SyncState``,
+which every write to the read model bumps in its own transaction, so writes
+invalidate the cached columns and nothing else does. Aggregation itself
+lives in ``columnar``.
+"""
+import threading
+
+import pandas as pd
+from django.conf import settings
+from django.db import connection
+
+from .columnar import MetricError, aggregate, parse_metric
+from .models import ArmRecord, RequisitionRecord, SyncState, UserRecord
+
+LOAD_CHUNK_SIZE = 50000
+LOAD_ATTEMPTS = 3  # loads raced by a write before settling for an uncached one
+
+# dataset -> (model, sync source, text columns, numeric columns, time columns)
+DATASETS = {
+    'requisitions': (
+        RequisitionRecord, 'requisitions.requisitions',
+        ('service_number', 'rank', 'name', 'station_unit', 'firearm_type', 'status'),
+        ('quantity',),
+        ('created_at', 'updated_at'),
+    ),
+    'arms': (
+        ArmRecord, 'inventory.arms',
+        ('serial_number', 'model', 'calibre', 'type', 'manufacturer'),
+        (),
+        ('updated_at',),
+    ),
+    'users': (
+        UserRecord, 'users.users',
+        ('username', 'first_name', 'last_name', 'service_number', 'rank'),
+        (),
+        ('date_joined', 'updated_at'),
+    ),
+}
+
+_lock = threading.Lock()
+_columns = {}  # dataset -> (version, {column: pandas.Series})
+
+
+def dataset_version(dataset):
+    source = DATASETS[dataset][1]
+    state = SyncState.objects.filter(source=source).values_list('high_water_mark', 'rows_synced').first()
+    if state is None:
+        return 'empty'
+    high_water_mark, rows_synced = state
+    return f"{high_water_mark.isoformat() if high_water_mark else ''}:{rows_synced}"
+
+
+def _series(column, values, text_columns, time_columns):
+    if column in text_columns:
+        return pd.Series(pd.Categorical(values), name=column)
+    if column in time_columns:
+        return pd.Series(pd.to_datetime(values, utc=True), name=column)
+    return pd.Series(values, name=column, dtype='int64')
+
+
+def _load_columns(model, columns, text_columns, time_columns):
+    """``columns`` of every row, in one query so they come from one snapshot."""
+    table = connection.ops.quote_name(model._meta.db_table)
+    selected = ', '.join(connection.ops.quote_name(column) for column in columns)
+    values = [[] for _ in columns]
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {selected} FROM {table} ORDER BY {connection.ops.quote_name('id')}")
+        while True:
+            rows = cursor.fetchmany(LOAD_CHUNK_SIZE)
+            if not rows:
+                break
+            for column_values, chunk in zip(values, zip(*rows)):
+                column_values.extend(chunk)
+    return {
+        column: _series(column, column_values, text_columns, time_columns)
+        for column, column_values in zip(columns, values)
+    }
+
+
+def load_frame(dataset, columns):
+    """
+    Return a DataFrame holding ``columns`` of ``dataset`` at its current
+    version, loading only the columns not already cached for that version.
+
+    A load only joins the cached columns if the version is the same before
+    and after it, i.e. no write landed meanwhile; otherwise it is retried.
+    After LOAD_ATTEMPTS, every column is read afresh in one query and
+    nothing is cached.
+    """
+    model, _, text_columns, _, time_columns = DATASETS[dataset]
+    for _ in range(LOAD_ATTEMPTS):
+        version = dataset_version(dataset)
+        with _lock:
+            cached_version, cached = _columns.get(dataset, (None, {}))
+            if cached_version != version:
+                cached = {}
+            missing = [column for column in columns if column not in cached]
+
+        loaded = _load_columns(model, missing, text_columns, time_columns) if missing else {}
+        if dataset_version(dataset) != version:
+            continue
+
+        with _lock:
+            cached_version, current = _columns.get(dataset, (None, {}))
+            if cached_version != version:
+                current = {}
+            current.update(cached)
+            current.update(loaded)
+            _columns[dataset] = (version, current)
+        frame = {**cached, **loaded}
+        return pd.DataFrame({column: frame[column] for column in columns}), version
+
+    # Labelled with the version read before the load: the rows are at least
+    # that new, so nothing cached under a later version can be stale.
+    version = dataset_version(dataset)
+    frame = _load_columns(model, columns, text_columns, time_columns)
+    return pd.DataFrame({column: frame[column] for column in columns}), version
+
+
+def run_report(dataset, group_by, metrics, equals=None, ranges=None, limit=None):
+    """
+    Validate a report definition, load the columns it touches and aggregate.
+    At most REPORTING_ADHOC_MAX_ROWS rows come back, whatever ``limit`` asks.
+    """
+    if dataset not in DATASETS:
+        raise MetricError(f"dataset must be one of: {', '.join(DATASETS)}")
+    if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int) or limit < 1):
+        raise MetricError("limit must be a positive integer")
+    limit = min(limit or settings.REPORTING_ADHOC_MAX_ROWS, settings.REPORTING_ADHOC_MAX_ROWS)
+    _, _, text_columns, numeric_columns, time_columns = DATASETS[dataset]
+    all_columns = (*text_columns, *numeric_columns, *time_columns)
+
+    for column in (*group_by, *(equals or {})):
+        if column not in text_columns:
+            raise MetricError(f"Cannot group or filter on '{column}' in {dataset}")
+    for column in ranges or {}:
+        if column not in time_columns:
+            raise MetricError(f"Cannot range-filter on '{column}' in {dataset}")
+
+    parsed = [parse_metric(spec, numeric_columns, all_columns) for spec in metrics or ['count']]
+    needed = list(dict.fromkeys([
+        *group_by, *(equals or {}), *(ranges or {}),
+        *(column for _, _, column, _ in parsed if column),
+    ]))
+    if not needed:
+        # A bare count still needs one column to know the row count.
+        needed = [text_columns[0]]
+
+    frame, version = load_frame(dataset, needed)
+    return {
+        'dataset': dataset,
+        'version': version,
+        'group_by': list(group_by),
+        'metrics': [name for name, _, _, _ in parsed],
+        'rows': aggregate(frame, group_by, parsed, equals, ranges, limit),
+    }
@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from .models import ScheduledReport
+
+
+@admin.register(ScheduledReport)
+class ScheduledReportAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for recurring report precomputation
+    """
+    list_display = ('name', 'report', 'cron', 'enabled', 'last_run_at', 'last_error')
+    list_filter = ('report', 'enabled')
+    search_fields = ('name',)
+    readonly_fields = ('created_at', 'last_dispatched_at', 'last_run_at', 'last_cache_key', 'last_error')
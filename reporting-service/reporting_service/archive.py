@@ -0,0 +1,97 @@
+"""
+Read access to the requisition archive tier.
+
+requisition-service moves aged monthly partitions out of MySQL into
+zstd-compressed Parquet files under REQUISITION_ARCHIVE_DIR (a volume shared
+with this service). Queries here push filters down into the Parquet scan so
+only matching row groups and the requested columns are read, and aggregate
+the scan batch by batch, so memory follows the number of groups rather than
+the number of archived rows.
+"""
+import os
+from collections import Counter
+
+from django.conf import settings
+
+ARCHIVE_FILTER_FIELDS = ('station_unit', 'service_number', 'firearm_type', 'status', 'rank')
+ARCHIVE_GROUP_FIELDS = ARCHIVE_FILTER_FIELDS
+
+
+def _dataset():
+    import pyarrow.dataset as ds
+
+    archive_dir = settings.REQUISITION_ARCHIVE_DIR
+    if not os.path.isdir(archive_dir):
+        return None
+    files = [
+        os.path.join(archive_dir, name)
+        for name in sorted(os.listdir(archive_dir))
+        if name.endswith('.parquet')
+    ]
+    if not files:
+        return None
+    return ds.dataset(files, format='parquet')
+
+
+def _filter_expression(filters, created_after=None, created_before=None):
+    import pyarrow.dataset as ds
+
+    expression = None
+    conditions = [ds.field(name) == value for name, value in filters.items()]
+    if created_after is not None:
+        conditions.append(ds.field('created_at') >= created_after)
+    if created_before is not None:
+        conditions.append(ds.field('created_at') < created_before)
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def summarize_archive(group_by, filters=None, created_after=None, created_before=None, limit=None):
+    """
+    Grouped requisition counts and quantity sums over the archived partitions,
+    in the same shape as requisition-service's ``/requisitions/summary/``:
+    the largest ``limit`` groups (default and at most
+    REQUISITION_ARCHIVE_MAX_GROUPS), and whether there were more.
+    """
+    import pyarrow as pa
+
+    limit = min(limit or settings.REQUISITION_ARCHIVE_MAX_GROUPS, settings.REQUISITION_ARCHIVE_MAX_GROUPS)
+    dataset = _dataset()
+    if dataset is None:
+        return {'group_by': group_by, 'total': {'count': 0, 'total_quantity': 0}, 'groups': [], 'truncated': False}
+
+    scanner = dataset.scanner(
+        columns=list(dict.fromkeys([*group_by, 'id', 'quantity'])),
+        filter=_filter_expression(filters or {}, created_after, created_before),
+    )
+    counts, quantities = Counter(), Counter()
+    rows = 0
+    for batch in scanner.to_batches():
+        if not batch.num_rows:
+            continue
+        rows += batch.num_rows
+        partial = pa.Table.from_batches([batch]).group_by(group_by).aggregate([('id', 'count'), ('quantity', 'sum')])
+        for row in partial.to_pylist():
+            group = tuple(row[field] for field in group_by)
+            counts[group] += row['id_count']
+            quantities[group] += row['quantity_sum'] or 0
+
+    largest = counts.most_common(limit + 1)
+    groups = [
+        {
+            **dict(zip(group_by, group)),
+            'count': count,
+            'total_quantity': quantities[group],
+        }
+        for group, count in largest[:limit]
+    ]
+    return {
+        'group_by': group_by,
+        'total': {
+            'count': rows,
+            'total_quantity': sum(quantities.values()),
+        },
+        'groups': groups,
+        'truncated': len(largest) > limit,
+    }
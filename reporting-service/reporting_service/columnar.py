@@ -0,0 +1,118 @@
+"""
+Vectorised group-by aggregation over columnar frames.
+
+Kept free of Django imports so it can be driven directly by the benchmarks
+with synthetic data. Metrics are written as compact strings:
+
+    count                 rows per group
+    sum:<column>          sum of a numeric column
+    distinct:<column>     number of distinct values
+    p<NN>:<column>        NN-th percentile of a numeric column, e.g. p95:quantity
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+_PERCENTILE = re.compile(r'^p(\d{1,2}(?:\.\d+)?)$')
+
+
+class MetricError(ValueError):
+    """Raised for a metric or filter the dataset cannot answer."""
+
+
+def parse_metric(spec, numeric_columns, columns):
+    """
+    Turn ``sum:quantity`` style specs into ``(name, kind, column, arg)``.
+    """
+    spec = spec.strip()
+    if spec == 'count':
+        return ('count', 'count', None, None)
+
+    kind, _, column = spec.partition(':')
+    if not column:
+        raise MetricError(f"Metric '{spec}' needs a column, e.g. sum:quantity")
+    if column not in columns:
+        raise MetricError(f"Unknown column '{column}' in metric '{spec}'")
+
+    if kind == 'sum':
+        if column not in numeric_columns:
+            raise MetricError(f"sum needs a numeric column, got '{column}'")
+        return (spec, 'sum', column, None)
+    if kind == 'distinct':
+        return (spec, 'distinct', column, None)
+
+    match = _PERCENTILE.match(kind)
+    if match:
+        if column not in numeric_columns:
+            raise MetricError(f"Percentiles need a numeric column, got '{column}'")
+        return (spec, 'percentile', column, float(match.group(1)) / 100)
+
+    raise MetricError(f"Unknown metric '{spec}'")
+
+
+def filter_mask(frame, equals=None, ranges=None):
+    """
+    Build a boolean mask. ``equals`` maps column -> list of accepted values;
+    ``ranges`` maps column -> (lower inclusive or None, upper exclusive or None).
+    """
+    mask = np.ones(len(frame), dtype=bool)
+    for column, values in (equals or {}).items():
+        mask &= frame[column].isin(values).to_numpy()
+    for column, (lower, upper) in (ranges or {}).items():
+        series = frame[column]
+        if lower is not None:
+            mask &= (series >= lower).to_numpy()
+        if upper is not None:
+            mask &= (series < upper).to_numpy()
+    return mask
+
+
+def _scalar(frame, kind, column, arg):
+    if kind == 'count':
+        return int(len(frame))
+    if kind == 'sum':
+        return frame[column].sum().item()
+    if kind == 'distinct':
+        return int(frame[column].nunique())
+    if len(frame) == 0:
+        return None
+    return float(frame[column].quantile(arg))
+
+
+def aggregate(frame, group_by, metrics, equals=None, ranges=None, limit=None):
+    """
+    Filter ``frame`` and compute ``metrics`` per ``group_by`` group.
+    ``metrics`` are parsed tuples from ``parse_metric``. Returns a list of
+    dicts ordered by the first metric, descending.
+    """
+    if equals or ranges:
+        frame = frame[filter_mask(frame, equals, ranges)]
+
+    if not group_by:
+        return [{name: _scalar(frame, kind, column, arg) for name, kind, column, arg in metrics}]
+
+    grouped = frame.groupby(list(group_by), observed=True, sort=False)
+    results = []
+    for name, kind, column, arg in metrics:
+        if kind == 'count':
+            series = grouped.size()
+        elif kind == 'sum':
+            series = grouped[column].sum()
+        elif kind == 'distinct':
+            series = grouped[column].nunique()
+        else:
+            series = grouped[column].quantile(arg)
+        results.append(series.rename(name))
+
+    table = pd.concat(results, axis=1)
+    table = table.sort_values(metrics[0][0], ascending=False)
+    if limit is not None:
+        table = table.head(limit)
+    table = table.reset_index()
+
+    for column in table.columns:
+        if isinstance(table[column].dtype, pd.CategoricalDtype):
+            table[column] = table[column].astype(object)
+    table = table.astype(object).where(table.notna(), None)
+    return table.to_dict('records')
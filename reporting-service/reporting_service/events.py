@@ -0,0 +1,183 @@
+"""
+Push-based updates of the reporting read model from the event streams.
+
+inventory-, requisition- and user-service relay their outbox events to Redis
+Streams (``<EVENT_STREAM_PREFIX><aggregate>``). ``manage.py consume_events``
+reads them as a member of the REPORTING_EVENTS_GROUP consumer group and
+applies each one to the read model as it arrives, so records follow
+upstream changes within a second instead of at the next sync. The periodic
+sync still runs: it refreshes rollups and sketches and repairs anything the
+streams missed.
+
+Delivery is at least once. Each event is applied in one transaction with a
+``ProcessedEvent`` row for its id, so a redelivered event is skipped, and it
+is acknowledged only after that commit. An upsert only lands if the event is
+newer than the stored record, so replays and the sync cannot move a record
+back in time. Every write bumps its source's dataset version in the same
+transaction, as the sync does, so cached ad-hoc columns never outlive it. Messages left pending by a dead consumer are claimed after
+REPORTING_EVENTS_CLAIM_IDLE_MS; messages delivered REPORTING_EVENTS_MAX_DELIVERIES
+times without success are moved to ``<stream>:dead`` and acknowledged.
+"""
+import json
+import logging
+import socket
+from datetime import timedelta
+
+import redis
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ArmRecord, ProcessedEvent, RequisitionRecord, UserRecord
+from .sync import _arm_record, _requisition_record, _upsert, _user_record, count_writes
+
+logger = logging.getLogger(__name__)
+
+AGGREGATES = ('arms', 'requisitions', 'users')
+
+
+def _apply_upsert(source, model, record):
+    newer = model.objects.filter(source_id=record.source_id, updated_at__gt=record.updated_at)
+    if not newer.exists():
+        _upsert(model, [record])
+        count_writes(source, 1)
+
+
+def _upserter(source, model, to_record):
+    def handle(payload):
+        record = to_record(payload)
+        if record is None:
+            # The mapper drops it (a deactivated user): remove the record
+            # unless a newer version has already landed.
+            updated_at = parse_datetime(payload['updated_at'])
+            deleted, _ = model.objects.filter(source_id=payload['id'], updated_at__lte=updated_at).delete()
+            if deleted:
+                count_writes(source, deleted)
+        else:
+            _apply_upsert(source, model, record)
+    return handle
+
+
+def _deleter(source, model):
+    def handle(payload):
+        deleted, _ = model.objects.filter(source_id=payload['id']).delete()
+        if deleted:
+            count_writes(source, deleted)
+    return handle
+
+
+# event type -> handler(payload), run in the transaction that records the event
+HANDLERS = {
+    'arm.changed': _upserter('inventory.arms', ArmRecord, _arm_record),
+    'arm.deleted': _deleter('inventory.arms', ArmRecord),
+    'requisition.submitted': _upserter('requisitions.requisitions', RequisitionRecord, _requisition_record),
+    'requisition.status_changed': _upserter('requisitions.requisitions', RequisitionRecord, _requisition_record),
+    'user.changed': _upserter('users.users', UserRecord, _user_record),
+    'user.deleted': _deleter('users.users', UserRecord),
+}
+
+
+def _decode(fields):
+    return {key.decode(): value.decode() for key, value in fields.items()}
+
+
+class Consumer:
+    def __init__(self, client, group, name, streams, batch_size=100, block_ms=5000,
+                 claim_idle_ms=60000, max_deliveries=5):
+        self.client = client
+        self.group = group
+        self.name = name
+        self.streams = list(streams)
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.max_deliveries = max_deliveries
+
+    def ensure_groups(self):
+        for stream in self.streams:
+            try:
+                self.client.xgroup_create(stream, self.group, id='0', mkstream=True)
+            except redis.ResponseError as exc:
+                if 'BUSYGROUP' not in str(exc):
+                    raise
+
+    def run_once(self):
+        """Handle one round of reclaimed and new messages; returns how many."""
+        handled = 0
+        for stream in self.streams:
+            self._dead_letter(stream)
+            claimed = self.client.xautoclaim(
+                stream, self.group, self.name, self.claim_idle_ms, start_id='0-0', count=self.batch_size,
+            )[1]
+            handled += self._handle_all(stream, claimed)
+
+        response = self.client.xreadgroup(
+            self.group, self.name, {stream: '>' for stream in self.streams},
+            count=self.batch_size, block=self.block_ms,
+        )
+        for stream, messages in response or []:
+            handled += self._handle_all(stream.decode(), messages)
+        return handled
+
+    def _handle_all(self, stream, messages):
+        handled = 0
+        for message_id, fields in messages:
+            if not fields:  # deleted by stream trimming while pending
+                self.client.xack(stream, self.group, message_id)
+                continue
+            try:
+                self.handle(_decode(fields))
+            except Exception:
+                # Left pending: claimed again later, dead-lettered eventually.
+                logger.exception("Handling event %s from %s failed", message_id, stream)
+                continue
+            self.client.xack(stream, self.group, message_id)
+            handled += 1
+        return handled
+
+    def handle(self, event):
+        handler = HANDLERS.get(event['type'])
+        if handler is None:
+            return
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    ProcessedEvent.objects.create(group=self.group, event_id=event['id'])
+            except IntegrityError:
+                return  # already applied
+            handler(json.loads(event['payload']))
+
+    def _dead_letter(self, stream):
+        pending = self.client.xpending_range(
+            stream, self.group, min='-', max='+', count=self.batch_size, idle=self.claim_idle_ms,
+        )
+        for entry in pending:
+            if entry['times_delivered'] < self.max_deliveries:
+                continue
+            message_id = entry['message_id']
+            for _, fields in self.client.xrange(stream, min=message_id, max=message_id):
+                self.client.xadd(f'{stream}:dead', fields, maxlen=settings.EVENT_STREAM_MAXLEN, approximate=True)
+            self.client.xack(stream, self.group, message_id)
+            logger.error("Moved event %s from %s to the dead-letter stream after %d deliveries",
+                         message_id, stream, entry['times_delivered'])
+
+
+def get_consumer(name=None):
+    return Consumer(
+        redis.Redis.from_url(settings.EVENT_BUS_REDIS_URL),
+        settings.REPORTING_EVENTS_GROUP,
+        name or socket.gethostname(),
+        [f'{settings.EVENT_STREAM_PREFIX}{aggregate}' for aggregate in AGGREGATES],
+        batch_size=settings.REPORTING_EVENTS_BATCH_SIZE,
+        block_ms=settings.REPORTING_EVENTS_BLOCK_MS,
+        claim_idle_ms=settings.REPORTING_EVENTS_CLAIM_IDLE_MS,
+        max_deliveries=settings.REPORTING_EVENTS_MAX_DELIVERIES,
+    )
+
+
+def prune_processed():
+    """Forget processed event ids older than any redelivery could be."""
+    cutoff = timezone.now() - timedelta(hours=settings.REPORTING_EVENTS_RETENTION_HOURS)
+    deleted, _ = ProcessedEvent.objects.filter(processed_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,240 @@
+"""
+Asynchronous report jobs.
+
+A job is submitted with a report name and parameters, with any trailing
+``last_days`` window resolved (``resolve_window``). Its cache key is the
+SHA-256 of those plus the current source data version; if an artifact for
+that key already exists the job completes immediately, and if an identical
+job is already queued or running it is returned instead of a new one.
+Otherwise ``tasks.run_report_job`` builds the report on a Celery worker.
+
+Builders that scan large tables work in chunks and persist each chunk's
+partial result under the job's work directory, so a retried task resumes
+from the last finished chunk rather than starting over.
+"""
+import hashlib
+import json
+import os
+import shutil
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import adhoc, rollups
+from .models import ArmRecord, ReportJob, RequisitionRecord
+from .report_cache import get_report_cache
+
+
+def data_version():
+    return '|'.join(f"{name}={adhoc.dataset_version(name)}" for name in sorted(adhoc.DATASETS))
+
+
+def cache_key(report, params, version=None):
+    payload = json.dumps(
+        {'report': report, 'params': params, 'version': version or data_version()},
+        sort_keys=True, separators=(',', ':'),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _work_dir(job):
+    return os.path.join(settings.REPORT_CACHE_DIR, 'work', str(job.id))
+
+
+def _chunk_path(job, index):
+    return os.path.join(_work_dir(job), f"chunk-{index:06d}.json")
+
+
+def _load_chunk(job, index):
+    try:
+        with open(_chunk_path(job, index)) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def _save_chunk(job, index, partial):
+    os.makedirs(_work_dir(job), exist_ok=True)
+    path = _chunk_path(job, index)
+    with open(f"{path}.tmp", 'w') as handle:
+        json.dump(partial, handle)
+    os.replace(f"{path}.tmp", path)
+
+
+def _set_progress(job, progress):
+    job.progress = round(progress, 4)
+    job.save(update_fields=['progress'])
+
+
+def _grouped(queryset, fields):
+    return {
+        json.dumps([row[field] for field in fields]): [row['count'], row['quantity'] or 0]
+        for row in queryset.values(*fields).annotate(count=Count('id'), quantity=Sum('quantity')).order_by()
+    }
+
+
+AUDIT_GROUPINGS = {
+    'by_unit_status': ['station_unit', 'status'],
+    'by_type_status': ['firearm_type', 'status'],
+    'by_rank': ['rank'],
+}
+
+
+def build_full_audit(job, params):
+    """
+    Full-system audit: requisition counts and quantities by unit/status,
+    type/status and rank, scanned in id-range chunks, plus inventory counts.
+    """
+    chunk_size = settings.REPORT_JOB_CHUNK_SIZE
+    bounds = RequisitionRecord.objects.aggregate(low=Min('id'), high=Max('id'))
+    low, high = bounds['low'], bounds['high']
+    chunks = [] if low is None else list(range(low, high + 1, chunk_size))
+
+    totals = {name: Counter() for name in AUDIT_GROUPINGS}
+    quantities = {name: Counter() for name in AUDIT_GROUPINGS}
+    for index, chunk_start in enumerate(chunks):
+        partial = _load_chunk(job, index)
+        if partial is None:
+            queryset = RequisitionRecord.objects.filter(id__gte=chunk_start, id__lt=chunk_start + chunk_size)
+            partial = {name: _grouped(queryset, fields) for name, fields in AUDIT_GROUPINGS.items()}
+            _save_chunk(job, index, partial)
+        for name, groups in partial.items():
+            for group, (count, quantity) in groups.items():
+                totals[name][group] += count
+                quantities[name][group] += quantity
+        _set_progress(job, 0.9 * (index + 1) / len(chunks))
+
+    requisitions = {
+        name: [
+            {
+                **dict(zip(AUDIT_GROUPINGS[name], json.loads(group))),
+                'count': count,
+                'total_quantity': quantities[name][group],
+            }
+            for group, count in totals[name].most_common()
+        ]
+        for name in AUDIT_GROUPINGS
+    }
+    inventory = {
+        f"by_{field}": list(
+            ArmRecord.objects.values(field).annotate(count=Count('id')).order_by('-count')
+        )
+        for field in ('type', 'manufacturer', 'calibre')
+    }
+    return {
+        'requisitions': {
+            'total': sum(totals['by_rank'].values()),
+            **requisitions,
+        },
+        'inventory': {
+            'total': ArmRecord.objects.count(),
+            **inventory,
+        },
+    }
+
+
+def _ranges(params):
+    """``{column: [lower, upper]}`` of ISO strings or nulls -> adhoc ranges."""
+    return {
+        column: tuple(rollups.utc(parse_datetime(bound)) if bound else None for bound in bounds)
+        for column, bounds in (params.get('ranges') or {}).items()
+    }
+
+
+def build_adhoc(job, params):
+    return adhoc.run_report(
+        params.get('dataset', 'requisitions'),
+        params.get('group_by', []),
+        params.get('metrics', ['count']),
+        params.get('equals'),
+        _ranges(params),
+        params.get('limit'),
+    )
+
+
+REPORTS = {
+    'full_audit': build_full_audit,
+    'adhoc': build_adhoc,
+}
+
+
+def resolve_window(params, now=None):
+    """
+    Replace ``last_days: {column: days}`` with ``ranges`` starting at
+    midnight ``days`` days ago. Aligned to the day, every request for the
+    same window on the same day gets the same params, and so the same
+    cache key, whenever it is made.
+    """
+    if not params.get('last_days'):
+        return params
+    for column, days in params['last_days'].items():
+        if not isinstance(days, int) or isinstance(days, bool) or days < 0:
+            raise ValueError(f"last_days.{column} must be a whole number of days")
+    midnight = timezone.localtime(now or timezone.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    resolved = {key: value for key, value in params.items() if key != 'last_days'}
+    resolved['ranges'] = {
+        **(params.get('ranges') or {}),
+        **{
+            column: [(midnight - timedelta(days=days)).isoformat(), None]
+            for column, days in params['last_days'].items()
+        },
+    }
+    return resolved
+
+
+def submit(report, params):
+    """
+    Return a job for ``report``/``params``: already done on a cache hit, the
+    in-flight job for the same key if there is one, or a new pending job.
+    The boolean is True when the caller needs to enqueue the job.
+    """
+    params = resolve_window(params)
+    key = cache_key(report, params)
+    if get_report_cache().exists(key):
+        job = ReportJob.objects.create(
+            report=report, params=params, cache_key=key,
+            status='done', progress=1, finished_at=timezone.now(),
+        )
+        return job, False
+
+    in_flight = (
+        ReportJob.objects
+        .filter(cache_key=key, status__in=['pending', 'running'])
+        .order_by('created_at')
+        .first()
+    )
+    if in_flight is not None:
+        return in_flight, False
+    return ReportJob.objects.create(report=report, params=params, cache_key=key), True
+
+
+def run(job):
+    """Build ``job``'s artifact and store it under its cache key."""
+    job.status = 'running'
+    job.save(update_fields=['status'])
+    try:
+        artifact = {
+            'report': job.report,
+            'params': job.params,
+            'generated_at': timezone.now(),
+            'result': REPORTS[job.report](job, job.params),
+        }
+        get_report_cache().put(job.cache_key, artifact)
+    except Exception as exc:
+        shutil.rmtree(_work_dir(job), ignore_errors=True)
+        job.status = 'failed'
+        job.error = str(exc)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        raise
+
+    shutil.rmtree(_work_dir(job), ignore_errors=True)
+    job.status = 'done'
+    job.progress = 1
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'progress', 'finished_at'])
+    return job
@@ -0,0 +1,41 @@
+import logging
+import time
+
+import redis
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from ...events import get_consumer, prune_processed
+
+logger = logging.getLogger(__name__)
+
+PRUNE_INTERVAL = 3600
+RETRY_DELAY = 1
+
+
+class Command(BaseCommand):
+    help = "Apply upstream events from Redis Streams to the read model until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--name', help="Consumer name within the group (default: host name).")
+        parser.add_argument('--once', action='store_true', help="Handle one round of events and exit.")
+
+    def handle(self, *args, **options):
+        consumer = get_consumer(options['name'])
+        last_prune = float('-inf')
+        groups_ready = False
+        while True:
+            try:
+                if not groups_ready:
+                    consumer.ensure_groups()
+                    groups_ready = True
+                consumer.run_once()
+                if time.monotonic() - last_prune > PRUNE_INTERVAL:
+                    prune_processed()
+                    last_prune = time.monotonic()
+            except (redis.RedisError, DatabaseError) as exc:
+                logger.warning("Consuming events failed: %s", exc)
+                close_old_connections()
+                time.sleep(RETRY_DELAY)
+            if options['once']:
+                return
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArmRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_id', models.BigIntegerField(unique=True)),
+                ('serial_number', models.CharField(max_length=100)),
+                ('model', models.CharField(max_length=100)),
+                ('calibre', models.CharField(blank=True, max_length=50, null=True)),
+                ('type', models.CharField(db_index=True, max_length=30)),
+                ('manufacturer', models.CharField(max_length=100)),
+                ('updated_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=50, unique=True)),
+                ('high_water_mark', models.DateTimeField(blank=True, null=True)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('rows_synced', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RequisitionRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_id', models.BigIntegerField(unique=True)),
+                ('service_number', models.CharField(max_length=100)),
+                ('rank', models.CharField(max_length=100)),
+                ('name', models.CharField(max_length=100)),
+                ('station_unit', models.CharField(max_length=100)),
+                ('firearm_type', models.CharField(max_length=100)),
+                ('quantity', models.IntegerField(default=0)),
+                ('status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['station_unit', 'created_at'], name='rr_unit_created_idx'), models.Index(fields=['firearm_type', 'status'], name='rr_type_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting_service', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('bucket_start', models.DateTimeField()),
+                ('type', models.CharField(max_length=30)),
+                ('manufacturer', models.CharField(max_length=100)),
+                ('calibre', models.CharField(blank=True, default='', max_length=50)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RequisitionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('bucket_start', models.DateTimeField()),
+                ('station_unit', models.CharField(max_length=100)),
+                ('firearm_type', models.CharField(max_length=100)),
+                ('rank', models.CharField(max_length=100)),
+                ('count', models.BigIntegerField(default=0)),
+                ('total_quantity', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='requisitionrecord',
+            index=models.Index(fields=['created_at'], name='rr_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorysnapshot',
+            index=models.Index(fields=['granularity', 'bucket_start'], name='inv_snapshot_bucket_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='requisitionrollup',
+            constraint=models.UniqueConstraint(fields=('granularity', 'bucket_start', 'station_unit', 'firearm_type', 'rank'), name='requisition_rollup_bucket_uniq'),
+        ),
+    ]
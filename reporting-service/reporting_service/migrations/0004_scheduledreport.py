@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:59
+
+from django.db import migrations, models
+
+
+DEFAULT_SCHEDULES = [
+    {
+        'name': 'daily-unit-requisitions',
+        'report': 'adhoc',
+        'params': {
+            'dataset': 'requisitions',
+            'group_by': ['station_unit', 'status'],
+            'metrics': ['count', 'sum:quantity'],
+            'last_days': {'created_at': 1},
+        },
+        'cron': '0 5 * * *',
+    },
+    {
+        'name': 'weekly-inventory-by-calibre',
+        'report': 'adhoc',
+        'params': {'dataset': 'arms', 'group_by': ['calibre'], 'metrics': ['count']},
+        'cron': '0 5 * * 1',
+    },
+]
+
+
+def add_default_schedules(apps, schema_editor):
+    ScheduledReport = apps.get_model('reporting_service', 'ScheduledReport')
+    for schedule in DEFAULT_SCHEDULES:
+        ScheduledReport.objects.get_or_create(name=schedule['name'], defaults=schedule)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting_service', '0003_reportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.SlugField(max_length=100, unique=True)),
+                ('report', models.CharField(max_length=50)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('cron', models.CharField(max_length=100)),
+                ('enabled', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_dispatched_at', models.DateTimeField(blank=True, null=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_cache_key', models.CharField(blank=True, default='', max_length=64)),
+                ('last_error', models.TextField(blank=True, default='')),
+            ],
+        ),
+        migrations.RunPython(add_default_schedules, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting_service', '0004_scheduledreport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_id', models.BigIntegerField(unique=True)),
+                ('username', models.CharField(max_length=150)),
+                ('first_name', models.CharField(blank=True, max_length=150)),
+                ('last_name', models.CharField(blank=True, max_length=150)),
+                ('service_number', models.CharField(max_length=100)),
+                ('rank', models.CharField(db_index=True, max_length=100)),
+                ('date_joined', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,208 @@
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.db import models
+
+
+class SyncState(models.Model):
+    """
+    High-water mark for one upstream source. Each sync run only asks the
+    source for rows with ``updated_at`` at or after ``high_water_mark``.
+    ``rows_synced`` counts writes to the source's read model, in the same
+    transaction as each write (see ``sync.count_writes``).
+    """
+    source = models.CharField(max_length=50, unique=True)
+    high_water_mark = models.DateTimeField(null=True, blank=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    rows_synced = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.source} @ {self.high_water_mark}"
+
+
+class ArmRecord(models.Model):
+    """Local read-model copy of inventory-service ``Arm`` rows."""
+    source_id = models.BigIntegerField(unique=True)
+    serial_number = models.CharField(max_length=100)
+    model = models.CharField(max_length=100)
+    calibre = models.CharField(max_length=50, blank=True, null=True)
+    type = models.CharField(max_length=30, db_index=True)
+    manufacturer = models.CharField(max_length=100)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.manufacturer} {self.model} ({self.serial_number})"
+
+
+class RequisitionRecord(models.Model):
+    """Local read-model copy of requisition-service ``Requisition`` rows."""
+    source_id = models.BigIntegerField(unique=True)
+    service_number = models.CharField(max_length=100)
+    rank = models.CharField(max_length=100)
+    name = models.CharField(max_length=100)
+    station_unit = models.CharField(max_length=100)
+    firearm_type = models.CharField(max_length=100)
+    quantity = models.IntegerField(default=0)
+    status = models.CharField(max_length=20)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['station_unit', 'created_at'], name='rr_unit_created_idx'),
+            models.Index(fields=['firearm_type', 'status'], name='rr_type_status_idx'),
+            models.Index(fields=['created_at'], name='rr_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} - {self.service_number}"
+
+
+class UserRecord(models.Model):
+    """
+    Local read-model copy of the user-service directory. Contact details
+    stay in user-service.
+    """
+    source_id = models.BigIntegerField(unique=True)
+    username = models.CharField(max_length=150)
+    first_name = models.CharField(max_length=150, blank=True)
+    last_name = models.CharField(max_length=150, blank=True)
+    service_number = models.CharField(max_length=100)
+    rank = models.CharField(max_length=100, db_index=True)
+    date_joined = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.username} - {self.service_number}"
+
+
+class ProcessedEvent(models.Model):
+    """
+    A stream event a consumer group has applied. Recorded in the same
+    transaction as the change, so a redelivered event is recognised and
+    skipped.
+    """
+    group = models.CharField(max_length=100)
+    event_id = models.CharField(max_length=100)
+    processed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['group', 'event_id'], name='processed_event_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.group}: {self.event_id}"
+
+
+GRANULARITY_CHOICES = [
+    ('hour', 'Hour'),
+    ('day', 'Day'),
+    ('month', 'Month'),
+]
+
+
+class RequisitionRollup(models.Model):
+    """
+    Requisition counts and quantity sums per time bucket. Hour buckets are
+    rebuilt from ``RequisitionRecord``; day and month buckets are rebuilt
+    from the next finer rollup.
+    """
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    station_unit = models.CharField(max_length=100)
+    firearm_type = models.CharField(max_length=100)
+    rank = models.CharField(max_length=100)
+    count = models.BigIntegerField(default=0)
+    total_quantity = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['granularity', 'bucket_start', 'station_unit', 'firearm_type', 'rank'],
+                name='requisition_rollup_bucket_uniq',
+            ),
+        ]
+
+
+class InventorySnapshot(models.Model):
+    """
+    Firearm counts per type, manufacturer and calibre as of a time bucket.
+    Counts are levels, so a coarser bucket holds the latest finer snapshot
+    inside it rather than a sum.
+    """
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    type = models.CharField(max_length=30)
+    manufacturer = models.CharField(max_length=100)
+    calibre = models.CharField(max_length=50, blank=True, default='')
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['granularity', 'bucket_start'], name='inv_snapshot_bucket_idx'),
+        ]
+
+
+class ReportJob(models.Model):
+    """
+    An asynchronous report build. ``cache_key`` hashes the report parameters
+    with the source data version, so identical requests share one artifact.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    report = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    cache_key = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    progress = models.FloatField(default=0)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.report} [{self.status}] {self.id}"
+
+
+class ScheduledReport(models.Model):
+    """
+    A report rebuilt on a cron schedule so its artifact is already in the
+    report cache when people ask for it. ``cron`` is a five-field expression
+    (minute hour day-of-month month day-of-week) in CELERY_TIMEZONE. For
+    adhoc reports, ``params["last_days"]`` maps a time column to a trailing
+    window in days from midnight, resolved each time the report is built.
+    """
+    name = models.SlugField(max_length=100, unique=True)
+    report = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    cron = models.CharField(max_length=100)
+    enabled = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_dispatched_at = models.DateTimeField(null=True, blank=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_cache_key = models.CharField(max_length=64, blank=True, default='')
+    last_error = models.TextField(blank=True, default='')
+
+    def clean(self):
+        from .jobs import REPORTS, resolve_window
+        from .schedules import parse_cron
+
+        if self.report not in REPORTS:
+            raise ValidationError({'report': f"report must be one of: {', '.join(REPORTS)}"})
+        try:
+            parse_cron(self.cron)
+        except ValueError as exc:
+            raise ValidationError({'cron': str(exc)})
+        try:
+            resolve_window(self.params)
+        except ValueError as exc:
+            raise ValidationError({'params': str(exc)})
+
+    def __str__(self):
+        return f"{self.name} ({self.cron})"
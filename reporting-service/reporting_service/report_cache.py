@@ -0,0 +1,146 @@
+"""
+Content-addressed store for finished report artifacts.
+
+Artifacts are gzipped JSON keyed by ``ReportJob.cache_key``. They live on
+local disk under REPORT_CACHE_DIR, bounded by both a total byte size and an
+entry count, and evicted least-recently-used first (reads refresh the file's
+mtime). Artifacts small enough are also kept in Redis through the default
+Django cache, so repeat requests from any worker skip the disk entirely.
+"""
+import gzip
+import json
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from amms_common.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+_REDIS_PREFIX = 'report-artifact:'
+
+
+class ReportCache:
+    def __init__(self, directory, max_bytes, max_entries, redis_max_bytes, redis_timeout):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.redis_max_bytes = redis_max_bytes
+        self.redis_timeout = redis_timeout
+        self._evict_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            directory=settings.REPORT_CACHE_DIR,
+            max_bytes=settings.REPORT_CACHE_MAX_BYTES,
+            max_entries=settings.REPORT_CACHE_MAX_ENTRIES,
+            redis_max_bytes=settings.REPORT_CACHE_REDIS_MAX_BYTES,
+            redis_timeout=settings.REPORT_CACHE_REDIS_TIMEOUT,
+        )
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.json.gz")
+
+    def _redis_get(self, key):
+        try:
+            return cache.get(_REDIS_PREFIX + key)
+        except Exception as exc:  # The Redis tier is best effort.
+            logger.warning("Report cache Redis read failed: %s", exc)
+            return None
+
+    def _redis_set(self, key, blob):
+        if len(blob) > self.redis_max_bytes:
+            return
+        try:
+            cache.set(_REDIS_PREFIX + key, blob, self.redis_timeout)
+        except Exception as exc:
+            logger.warning("Report cache Redis write failed: %s", exc)
+
+    def get_blob(self, key):
+        """Return the gzipped artifact for ``key``, or None."""
+        blob = self._redis_get(key)
+        if blob is not None:
+            CACHE_REQUESTS.labels('report', 'redis_hit').inc()
+            return blob
+
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as handle:
+                blob = handle.read()
+            os.utime(path)  # LRU touch
+        except FileNotFoundError:
+            CACHE_REQUESTS.labels('report', 'miss').inc()
+            return None
+        CACHE_REQUESTS.labels('report', 'disk_hit').inc()
+        self._redis_set(key, blob)
+        return blob
+
+    def get(self, key):
+        blob = self.get_blob(key)
+        return None if blob is None else json.loads(gzip.decompress(blob))
+
+    def exists(self, key):
+        return self._redis_get(key) is not None or os.path.exists(self.path(key))
+
+    def put(self, key, artifact):
+        blob = gzip.compress(json.dumps(artifact, cls=DjangoJSONEncoder).encode())
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as handle:
+            handle.write(blob)
+        os.replace(tmp_path, path)
+        self._redis_set(key, blob)
+        self.evict()
+        return len(blob)
+
+    def evict(self):
+        """Drop least-recently-used artifacts until both caps are met."""
+        with self._evict_lock:
+            try:
+                names = os.listdir(self.directory)
+            except FileNotFoundError:
+                return []
+
+            entries = []
+            for name in names:
+                if not name.endswith('.json.gz'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            evicted = []
+            while entries and (total > self.max_bytes or len(entries) > self.max_entries):
+                _, size, name = entries.pop(0)
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+                total -= size
+                key = name[:-len('.json.gz')]
+                try:
+                    cache.delete(_REDIS_PREFIX + key)
+                except Exception as exc:
+                    logger.warning("Report cache Redis delete failed: %s", exc)
+                evicted.append(key)
+            return evicted
+
+
+_report_cache = None
+
+
+def get_report_cache():
+    global _report_cache
+    if _report_cache is None:
+        _report_cache = ReportCache.from_settings()
+    return _report_cache
@@ -0,0 +1,238 @@
+"""
+Time-bucket rollups over the reporting read model.
+
+Requisitions roll up as flows: the hour buckets holding the ``created_at``
+of requisitions a sync changed are rebuilt from ``RequisitionRecord``, then
+their day buckets from hours and month buckets from days. Only those
+buckets are rebuilt, so an edit to an old requisition costs its own hour,
+day and month, not everything since. Inventory
+rolls up as levels: each sync that changes arms writes the current counts
+into the hour, day and month buckets containing "now", so each coarser
+bucket always holds the latest finer snapshot.
+"""
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, Trunc
+from django.utils import timezone
+
+from .models import ArmRecord, InventorySnapshot, RequisitionRecord, RequisitionRollup
+
+GRANULARITIES = ('hour', 'day', 'month')
+REQUISITION_DIMENSIONS = ('station_unit', 'firearm_type', 'rank')
+INVENTORY_DIMENSIONS = ('type', 'manufacturer', 'calibre')
+BULK_BATCH_SIZE = 1000
+
+
+def truncate(value, granularity):
+    value = value.astimezone(dt_timezone.utc)
+    if granularity == 'hour':
+        return value.replace(minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_bucket(value, granularity):
+    if granularity == 'hour':
+        return value + timedelta(hours=1)
+    if granularity == 'day':
+        return value + timedelta(days=1)
+    if value.month == 12:
+        return value.replace(year=value.year + 1, month=1)
+    return value.replace(month=value.month + 1)
+
+
+def is_aligned(value, granularity):
+    return truncate(value, granularity) == value.astimezone(dt_timezone.utc)
+
+
+def coarsest_granularity(start, end):
+    """The coarsest granularity whose buckets tile ``[start, end)`` exactly."""
+    for granularity in reversed(GRANULARITIES):
+        if is_aligned(start, granularity) and is_aligned(end, granularity):
+            return granularity
+    return 'hour'
+
+
+def _runs(buckets, granularity):
+    """``buckets`` merged into sorted ``(start, end)`` runs of consecutive buckets."""
+    runs = []
+    for bucket in sorted(set(buckets)):
+        if runs and runs[-1][1] == bucket:
+            runs[-1][1] = next_bucket(bucket, granularity)
+        else:
+            runs.append([bucket, next_bucket(bucket, granularity)])
+    return [tuple(run) for run in runs]
+
+
+def _parents(runs, granularity):
+    """The ``granularity`` buckets covering ``runs`` of finer buckets."""
+    parents = set()
+    for start, end in runs:
+        bucket = truncate(start, granularity)
+        while bucket < end:
+            parents.add(bucket)
+            bucket = next_bucket(bucket, granularity)
+    return _runs(parents, granularity)
+
+
+def _within(field, runs):
+    condition = Q()
+    for start, end in runs:
+        condition |= Q(**{f'{field}__gte': start, f'{field}__lt': end})
+    return condition
+
+
+def _rebuild(granularity, runs, rows):
+    with transaction.atomic():
+        RequisitionRollup.objects.filter(_within('bucket_start', runs), granularity=granularity).delete()
+        RequisitionRollup.objects.bulk_create(
+            [RequisitionRollup(granularity=granularity, **row) for row in rows],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+
+def refresh_requisition_buckets(created_ats):
+    """Rebuild the buckets, at all granularities, holding any of ``created_ats``."""
+    _refresh(_runs([truncate(created_at, 'hour') for created_at in created_ats], 'hour'))
+
+
+def refresh_requisition_rollups(first_created_at, last_created_at):
+    """
+    Rebuild every requisition bucket overlapping
+    ``[first_created_at, last_created_at]`` at all granularities.
+    """
+    start = truncate(first_created_at, 'hour')
+    _refresh([(start, next_bucket(truncate(last_created_at, 'hour'), 'hour'))])
+
+
+def _refresh(runs):
+    if not runs:
+        return
+    hours = (
+        RequisitionRecord.objects
+        .filter(_within('created_at', runs))
+        .annotate(bucket_start=Trunc('created_at', 'hour', tzinfo=dt_timezone.utc))
+        .values('bucket_start', *REQUISITION_DIMENSIONS)
+        .annotate(count=Count('id'), total_quantity=Coalesce(Sum('quantity'), 0))
+        .order_by()
+    )
+    _rebuild('hour', runs, hours)
+
+    for finer, coarser in (('hour', 'day'), ('day', 'month')):
+        runs = _parents(runs, coarser)
+        rows = (
+            RequisitionRollup.objects
+            .filter(_within('bucket_start', runs), granularity=finer)
+            .annotate(bucket=Trunc('bucket_start', coarser, tzinfo=dt_timezone.utc))
+            .values('bucket', *REQUISITION_DIMENSIONS)
+            .annotate(total_count=Sum('count'), quantity=Sum('total_quantity'))
+            .order_by()
+        )
+        _rebuild(coarser, runs, [
+            {
+                'bucket_start': row['bucket'],
+                **{field: row[field] for field in REQUISITION_DIMENSIONS},
+                'count': row['total_count'],
+                'total_quantity': row['quantity'],
+            }
+            for row in rows
+        ])
+
+
+def snapshot_inventory(now=None, force=False):
+    """
+    Record current firearm counts into the buckets containing ``now``.
+    Skipped when the current hour already has a snapshot unless ``force``.
+    """
+    now = now or timezone.now()
+    hour = truncate(now, 'hour')
+    if not force and InventorySnapshot.objects.filter(granularity='hour', bucket_start=hour).exists():
+        return False
+
+    counts = list(
+        ArmRecord.objects
+        .values(*INVENTORY_DIMENSIONS)
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        for granularity in GRANULARITIES:
+            bucket_start = truncate(now, granularity)
+            InventorySnapshot.objects.filter(granularity=granularity, bucket_start=bucket_start).delete()
+            InventorySnapshot.objects.bulk_create(
+                [
+                    InventorySnapshot(
+                        granularity=granularity,
+                        bucket_start=bucket_start,
+                        type=row['type'],
+                        manufacturer=row['manufacturer'],
+                        calibre=row['calibre'] or '',
+                        count=row['count'],
+                    )
+                    for row in counts
+                ],
+                batch_size=BULK_BATCH_SIZE,
+            )
+    return True
+
+
+def requisition_series(start, end, granularity, group_by):
+    rows = (
+        RequisitionRollup.objects
+        .filter(granularity=granularity, bucket_start__gte=start, bucket_start__lt=end)
+        .values('bucket_start', *group_by)
+        .annotate(requisitions=Sum('count'), quantity=Sum('total_quantity'))
+        .order_by('bucket_start', *group_by)
+    )
+    return [
+        {
+            'bucket_start': row['bucket_start'],
+            **{field: row[field] for field in group_by},
+            'count': row['requisitions'],
+            'total_quantity': row['quantity'],
+        }
+        for row in rows
+    ]
+
+
+def inventory_series(start, end, granularity, group_by):
+    rows = (
+        InventorySnapshot.objects
+        .filter(granularity=granularity, bucket_start__gte=start, bucket_start__lt=end)
+        .values('bucket_start', *group_by)
+        .annotate(firearms=Sum('count'))
+        .order_by('bucket_start', *group_by)
+    )
+    return [
+        {
+            'bucket_start': row['bucket_start'],
+            **{field: row[field] for field in group_by},
+            'count': row['firearms'],
+        }
+        for row in rows
+    ]
+
+
+def parse_range(start, end, granularity=None):
+    """
+    Normalise a query range. With no granularity, the coarsest one that tiles
+    the range is chosen; with an explicit one, the range is widened to whole
+    buckets.
+    """
+    if granularity is None:
+        granularity = coarsest_granularity(start, end)
+    else:
+        start = truncate(start, granularity)
+        if not is_aligned(end, granularity):
+            end = next_bucket(truncate(end, granularity), granularity)
+    return start.astimezone(dt_timezone.utc), end.astimezone(dt_timezone.utc), granularity
+
+
+def utc(value):
+    if timezone.is_naive(value):
+        return value.replace(tzinfo=dt_timezone.utc)
+    return value
+
@@ -0,0 +1,121 @@
+"""
+Recurring report precomputation.
+
+Operators register ``ScheduledReport`` rows (report, params, cron) in the
+admin. Beat runs ``tasks.dispatch_scheduled_reports`` every minute; each due
+schedule is marked dispatched and its warm-up is enqueued with a countdown,
+spreading the reports that fall due together evenly over
+REPORT_SCHEDULE_STAGGER_SECONDS so they don't hit the read model and the
+source services at the same moment. Warming goes through ``jobs.submit``,
+so the artifact lands in the report cache under the same key an on-demand
+request made later that day would use (``last_days`` windows are aligned to
+midnight, see ``jobs.resolve_window``), and the schedule remembers that key
+for ``/api/reports/scheduled/<name>/``.
+"""
+import logging
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+from celery.schedules import ParseException, crontab
+from django.conf import settings
+from django.utils import timezone
+
+from . import jobs
+from .models import ScheduledReport
+
+logger = logging.getLogger(__name__)
+
+
+def parse_cron(expression):
+    """Turn ``minute hour day-of-month month day-of-week`` into a crontab."""
+    fields = expression.split()
+    if len(fields) != 5:
+        raise ValueError("cron must have five fields: minute hour day-of-month month day-of-week")
+    minute, hour, day_of_month, month_of_year, day_of_week = fields
+    try:
+        return crontab(
+            minute=minute, hour=hour, day_of_month=day_of_month,
+            month_of_year=month_of_year, day_of_week=day_of_week,
+        )
+    except ParseException as exc:
+        raise ValueError(str(exc)) from exc
+
+
+def next_run(cron, after):
+    """
+    The first minute matching ``cron`` strictly after ``after``, worked out
+    in CELERY_TIMEZONE with Celery's rules (day of month and day of week
+    must both match). None if it never matches, e.g. on 30 February.
+    """
+    schedule = parse_cron(cron)
+    zone = ZoneInfo(settings.CELERY_TIMEZONE)
+    moment = after.astimezone(zone).replace(second=0, microsecond=0) + timedelta(minutes=1)
+    give_up = moment + timedelta(days=5 * 366)
+    while moment < give_up:
+        if moment.month not in schedule.month_of_year:
+            moment = (moment.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+        elif (moment.day not in schedule.day_of_month
+              or moment.isoweekday() % 7 not in schedule.day_of_week):
+            moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+        elif moment.hour not in schedule.hour:
+            moment = (moment + timedelta(hours=1)).replace(minute=0)
+        elif moment.minute not in schedule.minute:
+            moment += timedelta(minutes=1)
+        else:
+            return moment
+    return None
+
+
+def is_due(schedule, now):
+    last = schedule.last_dispatched_at or schedule.created_at
+    upcoming = next_run(schedule.cron, last)
+    return upcoming is not None and upcoming <= now
+
+
+def stagger(schedules, window=None):
+    """Pair each schedule with a countdown, spread evenly across ``window``."""
+    window = settings.REPORT_SCHEDULE_STAGGER_SECONDS if window is None else window
+    ordered = sorted(schedules, key=lambda schedule: schedule.name)
+    step = window / len(ordered) if ordered else 0
+    return [(schedule, int(index * step)) for index, schedule in enumerate(ordered)]
+
+
+def due_schedules(now=None):
+    """Claim the enabled schedules that are due and return them staggered."""
+    now = now or timezone.now()
+    due = []
+    for schedule in ScheduledReport.objects.filter(enabled=True):
+        try:
+            if not is_due(schedule, now):
+                continue
+        except ValueError as exc:
+            logger.warning("Skipping scheduled report %s: %s", schedule.name, exc)
+            continue
+        # Claim it so an overlapping dispatcher doesn't enqueue it twice.
+        claimed = (
+            ScheduledReport.objects
+            .filter(pk=schedule.pk, last_dispatched_at=schedule.last_dispatched_at)
+            .update(last_dispatched_at=now)
+        )
+        if claimed:
+            due.append(schedule)
+    return stagger(due)
+
+
+def warm(schedule):
+    """Build ``schedule``'s report into the cache unless it is already there."""
+    job, enqueue = jobs.submit(schedule.report, schedule.params)
+    error = ''
+    if enqueue:
+        try:
+            jobs.run(job)
+        except Exception as exc:
+            logger.exception("Scheduled report %s failed", schedule.name)
+            error = str(exc)
+
+    schedule.last_run_at = timezone.now()
+    schedule.last_error = error
+    if not error:
+        schedule.last_cache_key = job.cache_key
+    schedule.save(update_fields=['last_run_at', 'last_error', 'last_cache_key'])
+    return job
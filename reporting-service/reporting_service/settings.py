@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/5.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
+from celery.schedules import crontab
 from decouple import config
 from pathlib import Path
 import json
@@ -42,7 +43,37 @@ INSTALLED_APPS = [
     'reporting_service',
 ]
 
+# JWT Configuration
+SIMPLE_JWT = {
+    "AUTH_HEADER_TYPES": ("Bearer",),
+    # user-service signs with RS256; keys come from its JWKS, see below.
+    "ALGORITHM": "RS256",
+    "AUTH_TOKEN_CLASSES": ("amms_common.jwks.JWKSAccessToken",),
+}
+
+# Offline token verification against user-service's JWKS (amms_common.jwks)
+JWT_JWKS_URL = config('JWT_JWKS_URL', default='http://user-service:8000/.well-known/jwks.json')
+JWT_JWKS_REFRESH_INTERVAL = config('JWT_JWKS_REFRESH_INTERVAL', default=300, cast=int)
+JWT_JWKS_UNKNOWN_KID_WAIT = config('JWT_JWKS_UNKNOWN_KID_WAIT', default=2, cast=float)
+JWT_JWKS_REFRESH_COOLDOWN = config('JWT_JWKS_REFRESH_COOLDOWN', default=10, cast=float)
+JWT_JWKS_CACHE_FILE = config('JWT_JWKS_CACHE_FILE', default='')
+
+# REST Framework Configuration. There is no local user table: requests are
+# authenticated as a TokenUser built from the token's claims (is_staff
+# included), without a database lookup.
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        'rest_framework_simplejwt.authentication.JWTStatelessUserAuthentication',
+    ),
+    'DEFAULT_PERMISSION_CLASSES': (
+        'rest_framework.permissions.IsAuthenticated',
+    ),
+}
+
 MIDDLEWARE = [
+    'amms_common.metrics.MetricsMiddleware',  # first, so it times the whole stack
+    'amms_common.profiling.ProfilingMiddleware',  # off unless PROFILING_ENABLED
+    'amms_common.tracing.TracingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,6 +81,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'amms_common.tracing.ViewTracingMiddleware',  # last, so it spans just the view
 ]
 
 ROOT_URLCONF = 'reporting_service.urls'
@@ -84,10 +116,27 @@ DATABASES = {
         'PASSWORD': config('DJANGO_DB_PASSWORD'),  # Required
         'HOST': config('DJANGO_DB_HOST', default='localhost'),
         'PORT': config('DJANGO_DB_PORT', default='3306', cast=int),
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
         'OPTIONS': json.loads(config('DB_OPTIONS', default='{}')),  # Parse JSON
     }
 }
 
+# Connection pool for ASGI/async workers (amms_common.dbpool). Replaces the
+# persistent per-thread connection above; MySQL only.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+if DB_POOL:
+    DATABASES['default'].update({
+        'ENGINE': 'amms_common.dbpool',
+        'CONN_MAX_AGE': 0,
+    })
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),  # seconds to wait for a free connection
+        'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=1800, cast=int),
+        'check_after': config('DB_POOL_CHECK_AFTER', default=30, cast=int),  # idle seconds before a ping
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -130,3 +179,99 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Celery Configuration
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://redis:6379/0')
+CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default='redis://redis:6379/0')
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_TIMEZONE = config('CELERY_TIMEZONE', default='UTC')
+CELERY_BEAT_SCHEDULE = {
+    'sync-read-models': {
+        'task': 'reporting_service.tasks.sync_read_models',
+        'schedule': crontab(minute='*'),  # Every minute
+    },
+    'dispatch-scheduled-reports': {
+        'task': 'reporting_service.tasks.dispatch_scheduled_reports',
+        'schedule': crontab(minute='*'),  # Every minute
+    },
+}
+
+# Prometheus metrics of Celery workers (amms_common.metrics)
+WORKER_METRICS_PORT = config('WORKER_METRICS_PORT', default=9808, cast=int)
+
+# Upstream services feeding the read model
+INVENTORY_ARMS_URL = config('INVENTORY_ARMS_URL', default='http://inventory-service:8000/api/arms/')
+REQUISITION_LIST_URL = config('REQUISITION_LIST_URL', default='http://requisition-service:8000/api/requisitions/')
+USER_LIST_URL = config('USER_LIST_URL', default='http://user-service:8000/api/v1/users/')
+REPORTING_UPSTREAM_TOKEN = config('REPORTING_UPSTREAM_TOKEN', default='')
+REPORTING_UPSTREAM_TIMEOUT = config('REPORTING_UPSTREAM_TIMEOUT', default=10, cast=int)
+REPORTING_SYNC_PAGE_SIZE = config('REPORTING_SYNC_PAGE_SIZE', default=1000, cast=int)
+REPORTING_UPSTREAM_DEADLINE = config('REPORTING_UPSTREAM_DEADLINE', default=30, cast=int)  # seconds per call
+REPORTING_SYNC_DEADLINE = config('REPORTING_SYNC_DEADLINE', default=300, cast=int)  # seconds per source
+REPORTING_SYNC_CLOCK_SKEW = config('REPORTING_SYNC_CLOCK_SKEW', default=5, cast=int)  # seconds
+# One sync run per source at a time (reporting_service.tasks.sync_read_models)
+REPORTING_SYNC_LOCK_REDIS_URL = config('REPORTING_SYNC_LOCK_REDIS_URL', default='redis://redis:6379/2')
+
+# Cache (Redis tier for report artifacts)
+CACHES = {
+    'default': {
+        'BACKEND': 'amms_common.tracing.TracedRedisCache',
+        'LOCATION': config('REDIS_URL', default='redis://redis:6379/2'),
+        'KEY_PREFIX': 'reporting_service',
+        'TIMEOUT': 300,
+    }
+}
+
+# Report jobs and artifact cache
+REPORT_JOB_CHUNK_SIZE = config('REPORT_JOB_CHUNK_SIZE', default=50000, cast=int)
+REPORT_CACHE_DIR = config('REPORT_CACHE_DIR', default='/data/reports')
+REPORT_CACHE_MAX_BYTES = config('REPORT_CACHE_MAX_BYTES', default=1024 * 1024 * 1024, cast=int)  # 1 GiB
+REPORT_CACHE_MAX_ENTRIES = config('REPORT_CACHE_MAX_ENTRIES', default=500, cast=int)
+REPORT_CACHE_REDIS_MAX_BYTES = config('REPORT_CACHE_REDIS_MAX_BYTES', default=1024 * 1024, cast=int)  # 1 MiB
+REPORT_CACHE_REDIS_TIMEOUT = config('REPORT_CACHE_REDIS_TIMEOUT', default=3600, cast=int)
+REPORT_SCHEDULE_STAGGER_SECONDS = config('REPORT_SCHEDULE_STAGGER_SECONDS', default=600, cast=int)
+REPORTING_SKETCH_REDIS_URL = config('REPORTING_SKETCH_REDIS_URL', default='redis://redis:6379/3')
+REPORTING_SKETCH_CMS_WIDTH = config('REPORTING_SKETCH_CMS_WIDTH', default=2048, cast=int)
+REPORTING_SKETCH_CMS_DEPTH = config('REPORTING_SKETCH_CMS_DEPTH', default=4, cast=int)
+REPORTING_SKETCH_TOP_K = config('REPORTING_SKETCH_TOP_K', default=20, cast=int)
+REPORTING_SKETCH_RETENTION_DAYS = config('REPORTING_SKETCH_RETENTION_DAYS', default=400, cast=int)
+EXPORT_BATCH_SIZE = config('EXPORT_BATCH_SIZE', default=65536, cast=int)  # rows per Arrow record batch
+REPORTING_ADHOC_MAX_ROWS = config('REPORTING_ADHOC_MAX_ROWS', default=10000, cast=int)  # groups per ad-hoc report
+
+# Requisition archive tier (Parquet files written by requisition-service)
+REQUISITION_ARCHIVE_DIR = config('REQUISITION_ARCHIVE_DIR', default='/data/archive/requisitions')
+# Largest number of groups an archive summary returns; ``?limit=`` asks for fewer.
+REQUISITION_ARCHIVE_MAX_GROUPS = config('REQUISITION_ARCHIVE_MAX_GROUPS', default=1000, cast=int)
+
+# Event streams from the upstream services (see reporting_service/events.py)
+EVENT_BUS_REDIS_URL = config('EVENT_BUS_REDIS_URL', default='redis://redis:6379/4')
+EVENT_STREAM_PREFIX = config('EVENT_STREAM_PREFIX', default='amms:events:')
+EVENT_STREAM_MAXLEN = config('EVENT_STREAM_MAXLEN', default=100_000, cast=int)
+REPORTING_EVENTS_GROUP = config('REPORTING_EVENTS_GROUP', default='reporting')
+REPORTING_EVENTS_BATCH_SIZE = config('REPORTING_EVENTS_BATCH_SIZE', default=100, cast=int)
+REPORTING_EVENTS_BLOCK_MS = config('REPORTING_EVENTS_BLOCK_MS', default=5000, cast=int)
+REPORTING_EVENTS_CLAIM_IDLE_MS = config('REPORTING_EVENTS_CLAIM_IDLE_MS', default=60000, cast=int)
+REPORTING_EVENTS_MAX_DELIVERIES = config('REPORTING_EVENTS_MAX_DELIVERIES', default=5, cast=int)
+REPORTING_EVENTS_RETENTION_HOURS = config('REPORTING_EVENTS_RETENTION_HOURS', default=168, cast=int)
+
+# Tracing (see amms_common.tracing)
+TRACE_SERVICE_NAME = config('TRACE_SERVICE_NAME', default='reporting-service')
+TRACE_SAMPLE_RATE = config('TRACE_SAMPLE_RATE', default=0.1, cast=float)  # share of new traces recorded
+TRACE_EXPORTER = config('TRACE_EXPORTER', default='otlp')  # otlp, file or none
+TRACE_OTLP_ENDPOINT = config('TRACE_OTLP_ENDPOINT', default='http://jaeger:4318/v1/traces')
+TRACE_FILE = config('TRACE_FILE', default=str(BASE_DIR / 'traces.jsonl'))
+TRACE_EXPORT_INTERVAL = config('TRACE_EXPORT_INTERVAL', default=1, cast=float)  # seconds
+TRACE_QUEUE_SIZE = config('TRACE_QUEUE_SIZE', default=10000, cast=int)  # spans buffered per process
+
+# Tests run without span export; --update-baselines records perf baselines (amms_common.testing)
+TEST_RUNNER = 'amms_common.testing.TestRunner'
+
+# Request profiling (see amms_common.profiling)
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.01, cast=float)  # share of requests kept
+PROFILING_SLOW_MS = config('PROFILING_SLOW_MS', default=1000, cast=float)  # always keep slower requests
+PROFILING_INTERVAL_MS = config('PROFILING_INTERVAL_MS', default=5, cast=float)  # between stack samples
+PROFILING_DIR = config('PROFILING_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILING_MAX_PROFILES = config('PROFILING_MAX_PROFILES', default=200, cast=int)  # kept on disk
+PROFILING_MAX_QUERIES = config('PROFILING_MAX_QUERIES', default=500, cast=int)  # listed per profile
@@ -0,0 +1,197 @@
+"""
+Approximate counters for high-cardinality report metrics.
+
+Sketches live in Redis and are fed by the read-model sync as pages arrive:
+
+* distinct officers requesting per unit: one HyperLogLog per station unit
+  (``PFADD`` of service numbers), plus a set of the units seen;
+* distinct serial numbers moved per day: one HyperLogLog per UTC day of the
+  arms whose rows changed that day, expiring after the retention window;
+* top-K requested firearm types: a count-min sketch held in a Redis hash of
+  ``depth x width`` counters, with a sorted set trimmed to the K heaviest
+  types scored by their count-min estimates.
+
+Every structure has a fixed size, so answering from them costs the same
+however much history has been synced. Redis is best effort here: a failed
+update is logged and the sync carries on.
+"""
+import hashlib
+import logging
+from collections import Counter
+from datetime import timedelta
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_PREFIX = 'sketch:'
+OFFICERS_BY_UNIT = _PREFIX + 'hll:officers:'
+UNITS = _PREFIX + 'units'
+SERIALS_BY_DAY = _PREFIX + 'hll:serials:'
+FIREARM_TYPES_CMS = _PREFIX + 'cms:firearm_types'
+FIREARM_TYPES_TOPK = _PREFIX + 'topk:firearm_types'
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REPORTING_SKETCH_REDIS_URL, decode_responses=True)
+    return _client
+
+
+class CountMinSketch:
+    """Count-min sketch over a Redis hash of ``depth`` rows of ``width`` counters."""
+
+    def __init__(self, client, key, width, depth):
+        self.client = client
+        self.key = key
+        self.width = width
+        self.depth = depth
+
+    def cells(self, item):
+        digest = hashlib.blake2b(str(item).encode(), digest_size=8 * self.depth).digest()
+        return [
+            f"{row}:{int.from_bytes(digest[row * 8:(row + 1) * 8], 'big') % self.width}"
+            for row in range(self.depth)
+        ]
+
+    def add(self, counts, pipeline=None):
+        pipe = pipeline or self.client.pipeline(transaction=False)
+        for item, count in counts.items():
+            for cell in self.cells(item):
+                pipe.hincrby(self.key, cell, count)
+        if pipeline is None:
+            pipe.execute()
+
+    def estimate(self, items):
+        items = list(items)
+        cells = [self.cells(item) for item in items]
+        values = self.client.hmget(self.key, [cell for row in cells for cell in row]) if items else []
+        estimates = {}
+        for index, item in enumerate(items):
+            row = values[index * self.depth:(index + 1) * self.depth]
+            estimates[item] = min(int(value or 0) for value in row)
+        return estimates
+
+
+def _firearm_types_cms(client):
+    return CountMinSketch(
+        client, FIREARM_TYPES_CMS,
+        settings.REPORTING_SKETCH_CMS_WIDTH, settings.REPORTING_SKETCH_CMS_DEPTH,
+    )
+
+
+def _day(value):
+    return value.date().isoformat()
+
+
+def newly_requested(records, window=None, counted=None):
+    """
+    Firearm types of the requisitions in ``records`` to count towards top-K:
+    those created in ``window`` (``(after, until)``, either end None for
+    open) and not already in ``counted``, which collects their ids.
+
+    A sync run's window runs from the mark it started from to its mark
+    ceiling, and it observes a page only once the page's mark is committed.
+    Every row it counted was created at or before that mark (no later than
+    its ``updated_at``, capped by the ceiling), and every later run, whether
+    the next one or a retry after a deadline, starts from that mark or past
+    it, so it never counts the row again. Runs of one source never overlap
+    (``tasks.sync_read_models``). ``counted`` covers rows one run reads twice
+    because they changed while it was paging.
+    """
+    after, until = window or (None, None)
+    counted = set() if counted is None else counted
+    requested = Counter()
+    for record in records:
+        if after is not None and record.created_at <= after:
+            continue
+        if until is not None and record.created_at > until:
+            continue
+        if record.source_id in counted:
+            continue
+        counted.add(record.source_id)
+        requested[record.firearm_type] += 1
+    return requested
+
+
+def observe_requisitions(records, window=None, counted=None):
+    """
+    Feed synced requisitions into the sketches; see ``newly_requested`` for
+    which count towards top-K. HyperLogLogs are idempotent.
+    """
+    officers = {}
+    for record in records:
+        officers.setdefault(record.station_unit, set()).add(record.service_number)
+    requested = newly_requested(records, window, counted)
+
+    try:
+        client = get_client()
+        pipe = client.pipeline(transaction=False)
+        for unit, service_numbers in officers.items():
+            pipe.pfadd(OFFICERS_BY_UNIT + unit, *service_numbers)
+        if officers:
+            pipe.sadd(UNITS, *officers)
+        cms = _firearm_types_cms(client)
+        cms.add(requested, pipeline=pipe)
+        pipe.execute()
+
+        if requested:
+            estimates = cms.estimate(requested)
+            pipe = client.pipeline(transaction=False)
+            pipe.zadd(FIREARM_TYPES_TOPK, estimates)
+            # Keep a little headroom over K so ties near the cut-off settle.
+            pipe.zremrangebyrank(FIREARM_TYPES_TOPK, 0, -(2 * settings.REPORTING_SKETCH_TOP_K + 1))
+            pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning("Updating requisition sketches failed: %s", exc)
+
+
+def observe_arms(records, window=None, counted=None):
+    """Feed synced arms into the per-day distinct-serial HyperLogLogs."""
+    serials = {}
+    for record in records:
+        serials.setdefault(_day(record.updated_at), set()).add(record.serial_number)
+
+    try:
+        pipe = get_client().pipeline(transaction=False)
+        retention = int(timedelta(days=settings.REPORTING_SKETCH_RETENTION_DAYS).total_seconds())
+        for day, serial_numbers in serials.items():
+            pipe.pfadd(SERIALS_BY_DAY + day, *serial_numbers)
+            pipe.expire(SERIALS_BY_DAY + day, retention)
+        pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning("Updating arms sketches failed: %s", exc)
+
+
+def distinct_officers_by_unit(units=None):
+    """``{unit: approximate distinct officers}`` for ``units`` (default: all seen)."""
+    client = get_client()
+    units = sorted(units or client.smembers(UNITS))
+    pipe = client.pipeline(transaction=False)
+    for unit in units:
+        pipe.pfcount(OFFICERS_BY_UNIT + unit)
+    return dict(zip(units, pipe.execute()))
+
+
+def top_firearm_types(k):
+    """The ``k`` most requested firearm types with count-min estimates."""
+    return [
+        {'firearm_type': item, 'count': int(score)}
+        for item, score in get_client().zrevrange(FIREARM_TYPES_TOPK, 0, k - 1, withscores=True)
+    ]
+
+
+def distinct_serials_by_day(days):
+    """Per-day approximate distinct serials moved, and the distinct total over ``days``."""
+    client = get_client()
+    keys = [SERIALS_BY_DAY + day for day in days]
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.pfcount(key)
+    counts = pipe.execute()
+    total = client.pfcount(*keys) if keys else 0
+    return dict(zip(days, counts)), total
@@ -0,0 +1,238 @@
+"""
+Incremental sync of upstream rows into the local reporting read model.
+
+Each source's change feed (``<list URL>changes/``) is read from
+``updated_after=<high-water mark>``: keyset pages in ``(updated_at, id)``
+order, fetched one after another by following their ``next`` links through
+``upstream.UpstreamClient``. Each page is upserted on ``source_id`` as it
+arrives. A row updated mid-run moves past the cursor and is read again
+rather than shifting unread rows out of reach. All sources sync side by
+side, each under its own deadline. The mark is saved with every page, in
+the transaction that writes it, so a run cut off by its deadline leaves the
+next one to carry on from its last page rather than start over. It is read
+with ``>=``, so rows sharing the boundary timestamp are re-read rather than
+skipped; upserts make that harmless. Requisition rollups are rebuilt in the
+same transaction as the page they cover; the inventory snapshot is taken
+once a run completes.
+
+Users deactivated upstream are removed from the read model; other deletions
+upstream are not propagated by this pull model.
+"""
+import logging
+from datetime import timedelta
+from urllib.parse import urljoin
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import rollups, sketches
+from .models import ArmRecord, RequisitionRecord, SyncState, UserRecord
+from .upstream import UpstreamClient, UpstreamError, gather_with_deadlines
+
+logger = logging.getLogger(__name__)
+
+
+def _arm_record(row):
+    return ArmRecord(
+        source_id=row['id'],
+        serial_number=row['serial_number'],
+        model=row['model'],
+        calibre=row.get('calibre'),
+        type=row['type'],
+        manufacturer=row['manufacturer'],
+        updated_at=parse_datetime(row['updated_at']),
+    )
+
+
+def _requisition_record(row):
+    return RequisitionRecord(
+        source_id=row['id'],
+        service_number=row['service_number'],
+        rank=row['rank'],
+        name=row['name'],
+        station_unit=row['station_unit'],
+        firearm_type=row['firearm_type'],
+        quantity=row['quantity'],
+        status=row['status'],
+        created_at=parse_datetime(row['created_at']),
+        updated_at=parse_datetime(row['updated_at']),
+    )
+
+
+def _user_record(row):
+    """None for a deactivated user, whose record is removed."""
+    if not row.get('is_active', True):
+        return None
+    return UserRecord(
+        source_id=row['id'],
+        username=row['username'],
+        first_name=row.get('first_name') or '',
+        last_name=row.get('last_name') or '',
+        service_number=row['service_number'],
+        rank=row['rank'],
+        date_joined=parse_datetime(row['date_joined']),
+        updated_at=parse_datetime(row['updated_at']),
+    )
+
+
+def _refresh_inventory_rollups(changed):
+    rollups.snapshot_inventory(force=bool(changed))
+
+
+def _refresh_requisition_rollups(records):
+    rollups.refresh_requisition_buckets(record.created_at for record in records)
+
+
+# source name -> (settings attribute holding the list URL, read model,
+#                 row mapper (None: remove the record),
+#                 rollups of a page's changed records or None,
+#                 rollups of a completed run's change count or None,
+#                 sketch observer or None)
+SOURCES = {
+    'inventory.arms': (
+        'INVENTORY_ARMS_URL', ArmRecord, _arm_record,
+        None, _refresh_inventory_rollups, sketches.observe_arms,
+    ),
+    'requisitions.requisitions': (
+        'REQUISITION_LIST_URL', RequisitionRecord, _requisition_record,
+        _refresh_requisition_rollups, None, sketches.observe_requisitions,
+    ),
+    'users.users': (
+        'USER_LIST_URL', UserRecord, _user_record,
+        None, None, None,
+    ),
+}
+
+
+def _page_params(since):
+    params = {'page_size': settings.REPORTING_SYNC_PAGE_SIZE}
+    if since is not None:
+        params['updated_after'] = since.isoformat()
+    return params
+
+
+def _upsert(model, records):
+    update_fields = [
+        field.name for field in model._meta.concrete_fields
+        if not field.primary_key and field.name != 'source_id'
+    ]
+    options = {'update_conflicts': True, 'update_fields': update_fields}
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = ['source_id']
+    model.objects.bulk_create(records, **options)
+
+
+def count_writes(source, rows):
+    """
+    Add ``rows`` to ``source``'s ``rows_synced``, and so bump its dataset
+    version (``adhoc.dataset_version``). Call it in the transaction that
+    writes the rows: a reader that sees the same version before and after a
+    load then knows no write landed in between.
+    """
+    if not SyncState.objects.filter(source=source).update(rows_synced=F('rows_synced') + rows):
+        SyncState.objects.get_or_create(source=source, defaults={'rows_synced': rows})
+
+
+class _SyncRun:
+    """Folds the pages of one source into the read model and tracks marks."""
+
+    def __init__(self, name):
+        self.name = name
+        (self.url_setting, self.model, self.to_record, self.page_rollups,
+         self.run_rollups, self.observe) = SOURCES[name]
+        self.state, _ = SyncState.objects.get_or_create(source=name)
+        # A row can be stamped before the run starts but committed after the
+        # feed has moved past it, so the mark never moves past the run's
+        # start (less a margin for clock skew and such late commits).
+        self.mark_ceiling = timezone.now() - timedelta(seconds=settings.REPORTING_SYNC_CLOCK_SKEW)
+        # The mark the run started from; the stored one moves page by page.
+        self.start_mark = self.high_water_mark = self.state.high_water_mark
+        self.rows = self.changed = 0
+        self.counted = set()  # ids the observer has counted this run
+
+    def apply_page(self, page):
+        records, removed = [], {}
+        for row in page:
+            record = self.to_record(row)
+            if record is None:
+                removed[row['id']] = parse_datetime(row['updated_at'])
+            else:
+                records.append(record)
+
+        # Rows sitting exactly on the run's starting mark were synced before,
+        # so only rows past it count: an idle sync leaves the dataset version
+        # (and every cache keyed on it) unchanged.
+        previous = self.start_mark
+        fresh = [record for record in records if previous is None or record.updated_at > previous]
+        changed = len(fresh) + sum(1 for at in removed.values() if previous is None or at > previous)
+        page_mark = max([record.updated_at for record in records] + list(removed.values()))
+        if self.high_water_mark is None or page_mark > self.high_water_mark:
+            self.high_water_mark = page_mark
+        with transaction.atomic():
+            if records:
+                _upsert(self.model, records)
+            if removed:
+                self.model.objects.filter(source_id__in=list(removed)).delete()
+            if changed:
+                count_writes(self.name, changed)
+            if self.page_rollups is not None and fresh:
+                self.page_rollups(fresh)
+            SyncState.objects.filter(source=self.name).update(high_water_mark=self.capped_mark())
+        # Only after the mark is committed: see sketches.newly_requested.
+        if self.observe is not None and records:
+            self.observe(records, (self.start_mark, self.mark_ceiling), self.counted)
+        self.rows += len(page)
+        self.changed += changed
+
+    def capped_mark(self):
+        if self.high_water_mark is None:
+            return None
+        return min(self.high_water_mark, self.mark_ceiling)
+
+    def finish(self):
+        if self.run_rollups is not None:
+            self.run_rollups(self.changed)
+        self.state.high_water_mark = self.capped_mark()
+        self.state.last_synced_at = timezone.now()
+        # rows_synced was counted page by page, with the writes.
+        self.state.save(update_fields=['high_water_mark', 'last_synced_at'])
+        logger.info("Synced %s rows from %s (mark %s)", self.rows, self.name, self.state.high_water_mark)
+        return self.rows
+
+
+async def _sync_source(client, name):
+    run = await sync_to_async(_SyncRun)(name)
+    url = urljoin(getattr(settings, run.url_setting), 'changes/')
+    async for page in client.iter_pages(url, _page_params(run.state.high_water_mark)):
+        if page:
+            await sync_to_async(run.apply_page)(page)
+    return await sync_to_async(run.finish)()
+
+
+async def _sync_sources(names):
+    async with UpstreamClient() as client:
+        return await gather_with_deadlines(
+            {name: _sync_source(client, name) for name in names},
+            deadline=settings.REPORTING_SYNC_DEADLINE,
+        )
+
+
+def sync_all(names=None):
+    """
+    Sync ``names`` (default: every source) concurrently. Returns
+    ``{source: rows synced}``, with None for sources that failed.
+    """
+    results = async_to_sync(_sync_sources)(list(names or SOURCES))
+    return {
+        name: None if isinstance(result, UpstreamError) else result
+        for name, result in results.items()
+    }
+
+
+def sync_source(name):
+    """Pull everything changed since the stored mark for ``name``."""
+    return sync_all([name])[name]
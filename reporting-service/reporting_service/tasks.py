@@ -1,7 +1,72 @@
+import logging
+
+import redis
 from celery import shared_task
+from django.conf import settings
+from . import jobs, schedules
+from .models import ReportJob, ScheduledReport
+from .sync import SOURCES, sync_all
+
+logger = logging.getLogger(__name__)
+
+SYNC_LOCK_PREFIX = 'reporting:sync-lock:'
 
 @shared_task
 def generate_report(report_id):
     # Simulate report generation
     print(f"Generating report with ID: {report_id}")
-    return f"Report {report_id} generated successfully."
\ No newline at end of file
+    return f"Report {report_id} generated successfully."
+
+@shared_task
+def sync_read_models():
+    """
+    Incrementally refresh the local read-model tables from upstream services.
+    Beat fires this more often than a run can last, so each source is synced
+    under a Redis lock held for its whole walk; a source whose lock is still
+    held by an earlier run is skipped this time.
+    """
+    client = redis.Redis.from_url(settings.REPORTING_SYNC_LOCK_REDIS_URL)
+    locks = {}
+    for name in SOURCES:
+        # Outlives the run's deadline, so it only expires if the worker died.
+        lock = client.lock(f'{SYNC_LOCK_PREFIX}{name}', timeout=settings.REPORTING_SYNC_DEADLINE + 60)
+        if lock.acquire(blocking=False):
+            locks[name] = lock
+        else:
+            logger.info("Skipping sync of %s: an earlier run still holds it", name)
+    if not locks:
+        return {}
+    try:
+        return sync_all(list(locks))
+    finally:
+        for lock in locks.values():
+            try:
+                lock.release()
+            except redis.exceptions.LockError:
+                pass  # expired, and perhaps taken by a later run
+
+@shared_task(acks_late=True)
+def run_report_job(job_id):
+    """
+    Build a submitted report. ``acks_late`` means a job whose worker dies is
+    redelivered, and resumes from its last persisted chunk.
+    """
+    job = ReportJob.objects.get(pk=job_id)
+    if job.status == 'done':
+        return str(job.id)
+    jobs.run(job)
+    return str(job.id)
+
+@shared_task
+def dispatch_scheduled_reports():
+    """Enqueue the scheduled reports that are due, staggered over a window."""
+    due = schedules.due_schedules()
+    for schedule, countdown in due:
+        warm_scheduled_report.apply_async((schedule.pk,), countdown=countdown)
+    return [schedule.name for schedule, _ in due]
+
+@shared_task(acks_late=True)
+def warm_scheduled_report(schedule_id):
+    """Build a scheduled report into the report cache."""
+    schedule = ScheduledReport.objects.get(pk=schedule_id)
+    return str(schedules.warm(schedule).id)
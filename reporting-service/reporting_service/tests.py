@@ -0,0 +1,549 @@
+"""
+Tests for the read model and its report endpoints: behaviour, then
+performance (query budgets and p95 latency). Data volume and timing runs for
+the latter come from the PERF_* environment variables, see
+``amms_common.perftest``.
+"""
+import json
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import fakeredis
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.models import TokenUser
+from amms_common.perftest import PerfTestCase, bulk_seed, scaled
+
+from . import adhoc, events, jobs, report_cache, rollups, schedules, sketches, sync, tasks
+from .models import ArmRecord, RequisitionRecord, RequisitionRollup, ScheduledReport, SyncState, UserRecord
+from .upstream import UpstreamError
+
+ARMS = scaled(1_000_000)
+REQUISITIONS = scaled(5_000_000)
+
+YEAR_START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+YEAR_END = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+TYPES = ['pistol', 'rifle', 'shotgun', 'submachine_gun', 'sniper_rifle']
+MANUFACTURERS = ['Glock', 'Beretta', 'Heckler & Koch', 'Kalashnikov', 'Remington']
+STATIONS = [f'Station {index:02d}' for index in range(40)]
+RANKS = ['Constable', 'Corporal', 'Sergeant', 'Inspector']
+STATUSES = ['pending', 'approved', 'rejected', 'issued']
+
+
+def synthetic_arms(count):
+    for index in range(count):
+        yield ArmRecord(
+            source_id=index + 1,
+            serial_number=f'PERF-{index:08d}',
+            model=f'Model {index % 12}',
+            type=TYPES[index % len(TYPES)],
+            manufacturer=MANUFACTURERS[index % len(MANUFACTURERS)],
+            updated_at=YEAR_START,
+        )
+
+
+def synthetic_requisitions(count):
+    # Spread evenly over 2025, so every month has rollups to read.
+    step = (YEAR_END - YEAR_START) / count
+    for index in range(count):
+        created_at = YEAR_START + step * index
+        yield RequisitionRecord(
+            source_id=index + 1,
+            service_number=f'PERF-{index % 50_000:06d}',
+            rank=RANKS[index % len(RANKS)],
+            name=f'Officer {index % 50_000}',
+            station_unit=STATIONS[index % len(STATIONS)],
+            firearm_type=TYPES[index % len(TYPES)],
+            quantity=1 + index % 5,
+            status=STATUSES[index % len(STATUSES)],
+            created_at=created_at,
+            updated_at=created_at,
+        )
+
+
+class FakeChangeFeed:
+    """
+    An upstream ``changes/`` feed over an in-memory table, for
+    ``UpstreamClient.get_json``. ``on_page(feed, page_number)`` runs after
+    each page is served, to change rows mid-run.
+    """
+
+    def __init__(self, rows, page_size=2, on_page=None):
+        self.rows = {row['id']: row for row in rows}
+        self.page_size = page_size
+        self.on_page = on_page
+        self.requests = []
+
+    def update(self, row_id, at, **changes):
+        self.rows[row_id] = {**self.rows[row_id], **changes, 'updated_at': at.isoformat()}
+
+    async def get_json(self, url, params=None):
+        base = url.split('?')[0]
+        params = {**dict(parse_qsl(urlsplit(url).query)), **(params or {})}
+        self.requests.append(params)
+        rows = sorted(self.rows.values(), key=lambda row: (row['updated_at'], row['id']))
+        if 'after' in params:
+            cursor = (datetime.fromisoformat(params['after']), int(params['after_id']))
+            rows = [row for row in rows if (datetime.fromisoformat(row['updated_at']), row['id']) > cursor]
+        elif 'updated_after' in params:
+            since = datetime.fromisoformat(params['updated_after'])
+            rows = [row for row in rows if datetime.fromisoformat(row['updated_at']) >= since]
+        page, more = rows[:self.page_size], len(rows) > self.page_size
+        next_link = None
+        if more:
+            last = page[-1]
+            next_link = f"{base}?{urlencode({'after': last['updated_at'], 'after_id': last['id']})}"
+        if self.on_page:
+            self.on_page(self, len(self.requests))
+        return {'next': next_link, 'results': page}
+
+
+def upstream_user(index, at, **fields):
+    return {
+        'id': index, 'username': f'user{index}', 'first_name': 'First', 'last_name': f'Last {index}',
+        'service_number': f'SN-{index}', 'rank': RANKS[index % len(RANKS)], 'is_active': True,
+        'date_joined': YEAR_START.isoformat(), 'updated_at': at.isoformat(), **fields,
+    }
+
+
+def upstream_requisition(record):
+    return {
+        'id': record.source_id, 'service_number': record.service_number, 'rank': record.rank,
+        'name': record.name, 'station_unit': record.station_unit, 'firearm_type': record.firearm_type,
+        'quantity': record.quantity, 'status': record.status,
+        'created_at': record.created_at.isoformat(), 'updated_at': record.updated_at.isoformat(),
+    }
+
+
+class SyncTests(TestCase):
+    def run_sync(self, feed):
+        with mock.patch('reporting_service.upstream.UpstreamClient.get_json', new=lambda client, url, params=None:
+                        feed.get_json(url, params)):
+            return sync.sync_source('users.users')
+
+    def mark(self):
+        return SyncState.objects.get(source='users.users').high_water_mark
+
+    def test_rows_updated_mid_run_are_not_lost(self):
+        at = [YEAR_START + timedelta(minutes=minute) for minute in range(10)]
+
+        def touch_read_row(feed, page_number):
+            if page_number == 1:
+                # user 1 was on the first page and moves to the end of the
+                # feed; by page number, user 3 would shift onto page 1.
+                feed.update(1, at[9], rank='Inspector')
+
+        feed = FakeChangeFeed([upstream_user(index, at[index]) for index in range(1, 7)], on_page=touch_read_row)
+        self.run_sync(feed)
+
+        self.assertEqual(set(UserRecord.objects.values_list('source_id', flat=True)), {1, 2, 3, 4, 5, 6})
+        self.assertEqual(UserRecord.objects.get(source_id=1).rank, 'Inspector')
+        self.assertEqual(self.mark(), at[9])
+        # Pages after the first follow the cursor of the page before.
+        self.assertEqual(feed.requests[1], {'after': at[2].isoformat(), 'after_id': '2'})
+
+    def test_next_run_resumes_from_mark(self):
+        at = [YEAR_START + timedelta(minutes=minute) for minute in range(10)]
+        feed = FakeChangeFeed([upstream_user(index, at[index]) for index in range(1, 4)])
+        self.run_sync(feed)
+        self.assertEqual(self.mark(), at[3])
+
+        feed.requests.clear()
+        feed.update(2, at[5], is_active=False)
+        self.run_sync(feed)
+
+        self.assertEqual(feed.requests[0]['updated_after'], at[3].isoformat())
+        # Deactivated users leave the read model.
+        self.assertEqual(set(UserRecord.objects.values_list('source_id', flat=True)), {1, 3})
+        self.assertEqual(self.mark(), at[5])
+
+    def test_cut_off_run_keeps_the_mark_of_its_last_page(self):
+        at = [YEAR_START + timedelta(minutes=minute) for minute in range(10)]
+
+        def fail_third_page(feed, page_number):
+            if page_number == 3:
+                raise UpstreamError('deadline')
+
+        feed = FakeChangeFeed([upstream_user(index, at[index]) for index in range(1, 7)], on_page=fail_third_page)
+        self.assertIsNone(self.run_sync(feed))
+        self.assertEqual(self.mark(), at[4])
+
+        feed.on_page = None
+        feed.requests.clear()
+        self.run_sync(feed)
+        self.assertEqual(feed.requests[0]['updated_after'], at[4].isoformat())
+        self.assertEqual(UserRecord.objects.count(), 6)
+        self.assertEqual(self.mark(), at[6])
+
+    def test_mark_stays_behind_run_start(self):
+        future = datetime.now(timezone.utc) + timedelta(hours=1)
+        feed = FakeChangeFeed([upstream_user(1, future)])
+        self.run_sync(feed)
+        self.assertLess(self.mark(), datetime.now(timezone.utc))
+
+
+class SyncLockTests(TestCase):
+    def test_source_held_by_an_earlier_run_is_skipped(self):
+        client = fakeredis.FakeRedis()
+        held = client.lock(f'{tasks.SYNC_LOCK_PREFIX}users.users', timeout=60)
+        held.acquire()
+        synced = []
+        with mock.patch.object(tasks.redis.Redis, 'from_url', return_value=client), \
+                mock.patch.object(tasks, 'sync_all', side_effect=lambda names: synced.extend(names) or {}):
+            tasks.sync_read_models()
+        self.assertEqual(sorted(synced), ['inventory.arms', 'requisitions.requisitions'])
+        # The run's own locks are released; the held one is left alone.
+        self.assertEqual(client.keys(f'{tasks.SYNC_LOCK_PREFIX}*'), [f'{tasks.SYNC_LOCK_PREFIX}users.users'.encode()])
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        bulk_seed(RequisitionRecord, synthetic_requisitions(24))
+        rollups.refresh_requisition_rollups(YEAR_START, YEAR_END - timedelta(microseconds=1))
+
+    def totals(self, granularity, bucket_start):
+        return sum(RequisitionRollup.objects.filter(granularity=granularity, bucket_start=bucket_start)
+                   .values_list('total_quantity', flat=True))
+
+    def test_only_touched_buckets_are_rebuilt(self):
+        old, new = RequisitionRecord.objects.order_by('created_at')[0], RequisitionRecord.objects.latest('created_at')
+        # Left alone by a rebuild of the first and last hours, not by one of the span between.
+        RequisitionRollup.objects.create(granularity='hour', bucket_start=datetime(2025, 6, 1, 3, tzinfo=timezone.utc),
+                                         station_unit='SENTINEL', firearm_type='pistol', rank='Constable',
+                                         count=1, total_quantity=1)
+        RequisitionRecord.objects.filter(pk=old.pk).update(quantity=old.quantity + 10)
+        rollups.refresh_requisition_buckets([old.created_at, new.created_at])
+
+        self.assertTrue(RequisitionRollup.objects.filter(station_unit='SENTINEL').exists())
+        for granularity in rollups.GRANULARITIES:
+            bucket = rollups.truncate(old.created_at, granularity)
+            expected = sum(RequisitionRecord.objects.filter(
+                created_at__gte=bucket, created_at__lt=rollups.next_bucket(bucket, granularity),
+            ).values_list('quantity', flat=True))
+            self.assertEqual(self.totals(granularity, bucket), expected)
+
+
+class AdhocFrameTests(TestCase):
+    def setUp(self):
+        adhoc._columns.clear()
+        at = YEAR_START
+        for index in range(1, 3):
+            sync._user_record(upstream_user(index, at)).save()
+        sync.count_writes('users.users', 2)
+
+    def test_sync_pages_bump_the_version_as_they_land(self):
+        before = adhoc.dataset_version('users')
+        run = sync._SyncRun('users.users')
+        run.apply_page([upstream_user(3, YEAR_START + timedelta(days=1))])
+        self.assertNotEqual(adhoc.dataset_version('users'), before)
+
+    def test_load_raced_by_a_write_is_retried(self):
+        frame, _ = adhoc.load_frame('users', ['rank'])
+        self.assertEqual(len(frame), 2)
+        load_columns = adhoc._load_columns
+
+        def load_while_a_write_lands(*args):
+            result = load_columns(*args)
+            if not UserRecord.objects.filter(source_id=3).exists():
+                sync._user_record(upstream_user(3, YEAR_START)).save()
+                sync.count_writes('users.users', 1)
+            return result
+
+        with mock.patch.object(adhoc, '_load_columns', side_effect=load_while_a_write_lands) as load:
+            frame, version = adhoc.load_frame('users', ['rank', 'username'])
+        self.assertEqual(load.call_count, 2)
+        self.assertEqual(version, adhoc.dataset_version('users'))
+        self.assertEqual(list(frame['username']), ['user1', 'user2', 'user3'])
+        self.assertEqual(frame['rank'].notna().sum(), 3)
+
+
+def at(day, hour, minute=0):
+    return datetime(2025, 3, day, hour, minute, tzinfo=timezone.utc)
+
+
+class EventTests(TestCase):
+    def setUp(self):
+        self.consumer = events.Consumer(None, 'reporting', 'test', [])
+        self.row = {
+            'id': 7, 'service_number': 'SN-7', 'rank': 'Constable', 'name': 'Officer 7',
+            'station_unit': 'UNIT-001', 'firearm_type': 'pistol', 'quantity': 1, 'status': 'pending',
+            'created_at': '2025-03-01T00:00:00+00:00', 'updated_at': '2025-03-01T00:00:00+00:00',
+        }
+
+    def deliver(self, event_id, event_type, row):
+        self.consumer.handle({'id': event_id, 'type': event_type, 'payload': json.dumps(row)})
+
+    def test_writes_bump_the_dataset_version(self):
+        versions = [adhoc.dataset_version('requisitions')]
+        self.deliver('1-0', 'requisition.submitted', self.row)
+        versions.append(adhoc.dataset_version('requisitions'))
+        self.deliver('2-0', 'requisition.status_changed',
+                     {**self.row, 'status': 'approved', 'updated_at': '2025-03-02T00:00:00+00:00'})
+        versions.append(adhoc.dataset_version('requisitions'))
+        self.assertEqual(len(set(versions)), 3)
+        self.assertEqual(RequisitionRecord.objects.get(source_id=7).status, 'approved')
+
+    def test_skipped_events_leave_the_version(self):
+        self.deliver('1-0', 'requisition.submitted', self.row)
+        version = adhoc.dataset_version('requisitions')
+        self.deliver('1-0', 'requisition.submitted', self.row)  # redelivered
+        self.deliver('2-0', 'requisition.submitted', {**self.row, 'updated_at': '2025-02-01T00:00:00+00:00'})
+        self.assertEqual(adhoc.dataset_version('requisitions'), version)
+
+
+class SketchTests(TestCase):
+    def test_each_requisition_counts_once_across_runs(self):
+        records = list(synthetic_requisitions(12))
+        ceiling = records[7].created_at
+        counted = set()
+        # The first run reads every row, one of them twice, but its mark
+        # stops at the ceiling; the next run re-reads the rows past it.
+        first = sketches.newly_requested(records[:6], (None, ceiling), counted)
+        first += sketches.newly_requested(records[5:], (None, ceiling), counted)
+        second = sketches.newly_requested(records[8:], (ceiling, None), set())
+        self.assertEqual(sum((first + second).values()), 12)
+        self.assertEqual(sum(first.values()), 8)
+
+    def test_retried_sync_does_not_recount(self):
+        client = fakeredis.FakeRedis(decode_responses=True)
+        rows = [upstream_requisition(record) for record in synthetic_requisitions(6)]
+
+        def fail_third_page(feed, page_number):
+            if page_number == 3:
+                raise UpstreamError('deadline')
+
+        feed = FakeChangeFeed(rows, on_page=fail_third_page)
+        with mock.patch.object(sketches, 'get_client', return_value=client), \
+                mock.patch('reporting_service.upstream.UpstreamClient.get_json',
+                           new=lambda upstream, url, params=None: feed.get_json(url, params)):
+            self.assertIsNone(sync.sync_source('requisitions.requisitions'))
+            feed.on_page = None
+            sync.sync_source('requisitions.requisitions')
+            sync.sync_source('requisitions.requisitions')
+            self.assertEqual(sum(item['count'] for item in sketches.top_firearm_types(10)), 6)
+
+
+class ScheduleTests(TestCase):
+    def test_next_run(self):
+        self.assertEqual(schedules.next_run('0 5 * * *', at(1, 5)), at(2, 5))
+        self.assertEqual(schedules.next_run('0 5 * * *', at(1, 4, 59)), at(1, 5))
+        self.assertEqual(schedules.next_run('*/15 * * * *', at(1, 5, 7)), at(1, 5, 15))
+        self.assertEqual(schedules.next_run('30 6 * * 1', at(1, 0)), at(3, 6, 30))  # 3 March 2025 is a Monday
+        self.assertEqual(schedules.next_run('0 0 1 * *', at(31, 12)), datetime(2025, 4, 1, tzinfo=timezone.utc))
+        self.assertIsNone(schedules.next_run('0 0 30 2 *', at(1, 0)))
+
+    def test_daily_schedule_is_due_once_a_day(self):
+        schedule = ScheduledReport.objects.create(name='daily', report='full_audit', cron='0 5 * * *')
+        ScheduledReport.objects.filter(pk=schedule.pk).update(created_at=at(1, 4))
+
+        def dispatched(now):
+            return [schedule.name for schedule, _ in schedules.due_schedules(now)]
+
+        self.assertEqual(dispatched(at(1, 4, 30)), [])
+        self.assertEqual(dispatched(at(1, 5)), ['daily'])
+        for now in (at(1, 5, 1), at(1, 17), at(2, 4, 59)):
+            self.assertEqual(dispatched(now), [], now)
+        self.assertEqual(dispatched(at(2, 5)), ['daily'])
+        self.assertEqual(dispatched(at(2, 5, 30)), [])
+
+
+class ScheduledWarmingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = report_cache.ReportCache(directory.name, 10 ** 9, 100, redis_max_bytes=0, redis_timeout=1)
+        patcher = mock.patch.object(report_cache, '_report_cache', cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def submit_at(self, now, params):
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            return jobs.submit('adhoc', params)
+
+    def test_later_request_hits_the_warmed_artifact(self):
+        params = {'dataset': 'requisitions', 'group_by': ['station_unit'], 'last_days': {'created_at': 7}}
+        schedule = ScheduledReport.objects.create(name='weekly-units', report='adhoc', params=params,
+                                                  cron='0 5 * * *')
+        with mock.patch('django.utils.timezone.now', return_value=at(1, 5)):
+            schedules.warm(schedule)
+        self.assertEqual(schedule.last_error, '')
+
+        job, enqueue = self.submit_at(at(1, 14), params)
+        self.assertFalse(enqueue)
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.cache_key, schedule.last_cache_key)
+        self.assertEqual(job.params['ranges'], {'created_at': [(at(1, 0) - timedelta(days=7)).isoformat(), None]})
+
+        # The next day's window is a different report.
+        job, enqueue = self.submit_at(at(2, 9), params)
+        self.assertTrue(enqueue)
+
+    def test_invalid_window(self):
+        with self.assertRaises(ValueError):
+            jobs.resolve_window({'last_days': {'created_at': 'week'}})
+
+
+# Users as reporting-service sees them: claims of a user-service access token.
+OFFICER = TokenUser({'user_id': 2, 'is_staff': False})
+STAFF = TokenUser({'user_id': 1, 'is_staff': True})
+
+
+class AccessTests(TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        adhoc._columns.clear()
+
+    def test_anonymous_requests_are_refused(self):
+        self.assertEqual(self.api.get('/api/total-requisitions/').status_code, 401)
+        self.assertEqual(self.api.get('/api/exports/requisitions.arrow').status_code, 401)
+
+    def test_users_dataset_is_staff_only(self):
+        self.api.force_authenticate(OFFICER)
+        self.assertEqual(self.api.get('/api/reports/adhoc/', {'dataset': 'users'}).status_code, 403)
+        self.assertEqual(self.api.get('/api/exports/users.arrow').status_code, 403)
+        response = self.api.post('/api/reports/jobs/', {
+            'report': 'adhoc', 'params': {'dataset': 'users'},
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.api.get('/api/reports/adhoc/').status_code, 200)
+
+    def test_staff_may_read_users_dataset(self):
+        joined = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        UserRecord.objects.create(source_id=1, username='admin', service_number='SN-1', rank='Inspector',
+                                  date_joined=joined, updated_at=joined)
+        self.api.force_authenticate(STAFF)
+        response = self.api.get('/api/reports/adhoc/', {'dataset': 'users', 'group_by': 'rank'})
+        self.assertEqual(response.status_code, 200, response.content)
+
+
+class AdhocLimitTests(TestCase):
+    def setUp(self):
+        bulk_seed(RequisitionRecord, synthetic_requisitions(20))
+        adhoc._columns.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(OFFICER)
+
+    def report(self, limit):
+        return self.api.get('/api/reports/adhoc/', {'group_by': 'station_unit', 'limit': limit})
+
+    def test_invalid_limits(self):
+        for limit in ('many', '0', '-5'):
+            self.assertEqual(self.report(limit).status_code, 400, limit)
+
+    @override_settings(REPORTING_ADHOC_MAX_ROWS=2)
+    def test_limit_is_capped(self):
+        response = self.report(1000)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['rows']), 2)
+
+
+class ArchiveSummaryTests(TestCase):
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        # Station n holds n + 1 requisitions, split across two monthly files.
+        rows = [(station, index) for station in range(4) for index in range(station + 1)]
+        for month, part in enumerate((rows[::2], rows[1::2]), start=1):
+            pq.write_table(pa.table({
+                'id': [station * 10 + index for station, index in part],
+                'station_unit': [f'UNIT-{station}' for station, _ in part],
+                'quantity': [2] * len(part),
+            }), f'{archive_dir.name}/requisitions_2024_{month:02d}.parquet', row_group_size=2)
+        settings_override = override_settings(REQUISITION_ARCHIVE_DIR=archive_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.api = APIClient()
+        self.api.force_authenticate(OFFICER)
+
+    def summary(self, **params):
+        return self.api.get('/api/requisitions/archive/summary/', {'group_by': 'station_unit', **params})
+
+    def test_groups_merge_across_batches_and_files(self):
+        response = self.summary()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(group['station_unit'], group['count']) for group in response.data['groups']],
+                         [('UNIT-3', 4), ('UNIT-2', 3), ('UNIT-1', 2), ('UNIT-0', 1)])
+        self.assertEqual(response.data['total'], {'count': 10, 'total_quantity': 20})
+        self.assertFalse(response.data['truncated'])
+
+    def test_limit(self):
+        response = self.summary(limit=2)
+        self.assertEqual([group['station_unit'] for group in response.data['groups']], ['UNIT-3', 'UNIT-2'])
+        self.assertTrue(response.data['truncated'])
+        self.assertEqual(response.data['total']['count'], 10)
+        with self.settings(REQUISITION_ARCHIVE_MAX_GROUPS=3):
+            self.assertEqual(self.summary(limit=4).status_code, 400)
+            self.assertEqual(len(self.summary().data['groups']), 3)
+        self.assertEqual(self.summary(limit='many').status_code, 400)
+
+
+class ReportEndpointPerformanceTests(PerfTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        bulk_seed(ArmRecord, synthetic_arms(ARMS))
+        bulk_seed(RequisitionRecord, synthetic_requisitions(REQUISITIONS))
+        rollups.refresh_requisition_rollups(YEAR_START, YEAR_END - timedelta(microseconds=1))
+        SyncState.objects.create(
+            source='requisitions.requisitions', high_water_mark=YEAR_END, rows_synced=REQUISITIONS,
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(STAFF)
+        adhoc._columns.clear()  # columns cached by another test would skip the load
+
+    def get(self, path, params=None):
+        response = self.api.get(path, params or {})
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        return response
+
+    def total_requisitions(self):
+        return self.get('/api/total-requisitions/')
+
+    def arms_summary(self):
+        return self.get('/api/arms-status-summary/')
+
+    def trends(self, group_by=''):
+        return self.get('/api/trends/requisitions/', {
+            'start': YEAR_START.isoformat(), 'end': YEAR_END.isoformat(),
+            'granularity': 'day', 'group_by': group_by,
+        })
+
+    def adhoc_report(self):
+        return self.get('/api/reports/adhoc/', {
+            'dataset': 'requisitions', 'group_by': 'station_unit,status',
+            'metrics': 'count,sum:quantity,distinct:service_number',
+        })
+
+    # Query budgets: one query per dashboard figure or series. Ad-hoc reports
+    # only check the dataset version once the columns are cached.
+
+    def test_dashboard_queries(self):
+        self.assertNumQueries(1, self.total_requisitions)
+        self.assertNumQueries(1, self.arms_summary)
+
+    def test_trend_queries_do_not_grow_with_groups(self):
+        self.assertNumQueries(1, self.trends)
+        self.assertQueriesIndependentOf('group_by', self.trends, ['', 'station_unit', 'station_unit,rank'])
+
+    def test_adhoc_report_queries(self):
+        self.adhoc_report()
+        self.assertNumQueries(2, self.adhoc_report)
+
+    def test_total_requisitions_latency(self):
+        self.assertLatency('reports.total_requisitions', self.total_requisitions)
+
+    def test_arms_summary_latency(self):
+        self.assertLatency('reports.arms_status_summary', self.arms_summary)
+
+    def test_trends_latency(self):
+        self.assertLatency('reports.requisition_trends', self.trends, 'station_unit')
+
+    def test_adhoc_report_latency(self):
+        self.assertLatency('reports.adhoc', self.adhoc_report)
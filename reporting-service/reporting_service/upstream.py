@@ -0,0 +1,90 @@
+"""
+Async client for calls from reporting-service to the other services.
+
+One ``httpx.AsyncClient`` per run gives pooled keep-alive connections. A
+paginated list is walked by following its ``next`` links, one request at a
+time: with keyset (cursor) pages, each link is only known once the page
+before it has arrived, and offset pages fetched side by side would skip or
+repeat rows that change mid-walk. Concurrency comes from walking the
+sources side by side instead. Pages are yielded as they arrive so callers can fold
+them into aggregates without holding the whole collection.
+``gather_with_deadlines`` runs several independent calls side by side, each
+bounded by its own deadline.
+"""
+import asyncio
+import logging
+
+import httpx
+from django.conf import settings
+
+from amms_common import tracing
+from amms_common.metrics import observe_upstream
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamError(Exception):
+    """An upstream call failed or timed out."""
+
+
+class UpstreamClient:
+    def __init__(self, timeout=None, token=None):
+        timeout = timeout or settings.REPORTING_UPSTREAM_TIMEOUT
+        token = settings.REPORTING_UPSTREAM_TOKEN if token is None else token
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        self._client = httpx.AsyncClient(headers=headers, timeout=httpx.Timeout(timeout))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+
+    async def get_json(self, url, params=None):
+        try:
+            with observe_upstream(httpx.URL(url).host), tracing.outbound('GET', url) as headers:
+                response = await self._client.get(url, params=params, headers=headers)
+                tracing.annotate({'http.status_code': response.status_code})
+                response.raise_for_status()
+        except httpx.HTTPError as exc:
+            raise UpstreamError(f"GET {url} failed: {exc}") from exc
+        return response.json()
+
+    async def iter_pages(self, url, params=None):
+        """
+        Yield the ``results`` list of every page of a paginated list, in
+        order, following each page's ``next`` link.
+        """
+        page = await self.get_json(url, params)
+        while True:
+            if isinstance(page, list):
+                yield page
+                return
+            yield page.get('results', [])
+            if not page.get('next'):
+                return
+            page = await self.get_json(page['next'])
+
+
+async def gather_with_deadlines(calls, deadline=None):
+    """
+    Run ``{name: coroutine}`` concurrently, each limited to ``deadline``
+    seconds. Returns ``{name: result}`` with an ``UpstreamError`` in place of
+    the result for calls that failed or ran out of time.
+    """
+    deadline = deadline or settings.REPORTING_UPSTREAM_DEADLINE
+
+    async def bounded(name, coroutine):
+        try:
+            return await asyncio.wait_for(coroutine, deadline)
+        except asyncio.TimeoutError:
+            return UpstreamError(f"{name} exceeded its {deadline}s deadline")
+        except UpstreamError as exc:
+            return exc
+
+    names = list(calls)
+    results = await asyncio.gather(*(bounded(name, calls[name]) for name in names))
+    for name, result in zip(names, results):
+        if isinstance(result, UpstreamError):
+            logger.warning("Upstream call %s failed: %s", name, result)
+    return dict(zip(names, results))
@@ -16,11 +16,34 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
-from reporting_service.views import total_requisitions, arms_status_summary
+from amms_common import dbpool, metrics, profiling
+from reporting_service.views import (
+    total_requisitions, arms_status_summary, requisition_archive_summary,
+    requisition_trends, inventory_trends, adhoc_report,
+    submit_report_job, report_job_detail, report_job_download, scheduled_report,
+    export_dataset, distinct_officers, top_firearm_types, distinct_serials_moved,
+)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/total-requisitions/', total_requisitions),
     path('api/arms-status-summary/', arms_status_summary),
+    path('api/requisitions/archive/summary/', requisition_archive_summary),
+    path('api/trends/requisitions/', requisition_trends),
+    path('api/trends/inventory/', inventory_trends),
+    path('api/reports/adhoc/', adhoc_report),
+    path('api/reports/jobs/', submit_report_job),
+    path('api/reports/jobs/<uuid:job_id>/', report_job_detail),
+    path('api/reports/jobs/<uuid:job_id>/download/', report_job_download),
+    path('api/reports/scheduled/<slug:name>/', scheduled_report),
+    path('api/exports/<slug:dataset>.<slug:file_format>', export_dataset),
+    path('api/metrics/distinct-officers/', distinct_officers),
+    path('api/metrics/top-firearm-types/', top_firearm_types),
+    path('api/metrics/distinct-serials-moved/', distinct_serials_moved),
+    path('metrics/db/', dbpool.metrics_view),
+    path('metrics', metrics.metrics_view),
+    path('profiles/', profiling.profile_list),
+    path('profiles/<slug:profile_id>/', profiling.profile_detail),
+    path('profiles/<slug:profile_id>/collapsed/', profiling.profile_collapsed),
 ]
 
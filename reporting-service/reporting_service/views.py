@@ -1,25 +1,431 @@
+import gzip
+from datetime import timedelta
+import redis
 from rest_framework.decorators import api_view
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
-import requests
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_datetime
+from . import adhoc, export, jobs, rollups, sketches
+from .archive import ARCHIVE_FILTER_FIELDS, ARCHIVE_GROUP_FIELDS, summarize_archive
+from .columnar import MetricError
+from .models import ArmRecord, ReportJob, RequisitionRecord, ScheduledReport
+from .report_cache import get_report_cache
+from .tasks import run_report_job
+
+# Datasets holding personal data; staff only, whichever endpoint reads them.
+ADMIN_DATASETS = ('users',)
+
+def _dataset_forbidden(request, dataset):
+    if dataset in ADMIN_DATASETS and not IsAdminUser().has_permission(request, None):
+        return Response({'error': f'The {dataset} dataset is restricted to administrators'}, status=403)
+    return None
+
+def _job_dataset(report, params):
+    return params.get('dataset', 'requisitions') if report == 'adhoc' else None
 
 @api_view(['GET'])
 def total_requisitions(request):
-    try:
-        res = requests.get("http://requisition-service:8000/api/requisitions/")
-        data = res.json()
-        return Response({'total_requisitions': len(data)})
-    except:
-        return Response({'error': 'Could not fetch requisitions'}, status=500)
+    return Response({'total_requisitions': RequisitionRecord.objects.count()})
 
 @api_view(['GET'])
 def arms_status_summary(request):
+    # Arm has no status field upstream; firearms are summarised by type.
+    status_count = dict(
+        ArmRecord.objects.values_list('type')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    return Response(status_count)
+
+@api_view(['GET'])
+def requisition_archive_summary(request):
+    """
+    Grouped counts over archived requisitions: the largest ``limit`` groups
+    (at most REQUISITION_ARCHIVE_MAX_GROUPS), with ``truncated`` set if
+    there were more.
+    Example: /api/requisitions/archive/summary/?group_by=station_unit&created_after=2023-01-01T00:00:00Z
+    """
+    group_by = [
+        field.strip()
+        for field in request.query_params.get('group_by', 'station_unit').split(',')
+        if field.strip()
+    ]
+    if not group_by or any(field not in ARCHIVE_GROUP_FIELDS for field in group_by):
+        return Response(
+            {'error': f"group_by must be one or more of: {', '.join(ARCHIVE_GROUP_FIELDS)}"},
+            status=400,
+        )
+
+    filters = {
+        field: request.query_params[field]
+        for field in ARCHIVE_FILTER_FIELDS
+        if request.query_params.get(field)
+    }
+    bounds = {}
+    for param in ('created_after', 'created_before'):
+        value = request.query_params.get(param)
+        if value:
+            bounds[param] = parse_datetime(value)
+            if bounds[param] is None:
+                return Response({'error': f'{param} must be an ISO 8601 datetime'}, status=400)
+    limit, error = _limit(request, settings.REQUISITION_ARCHIVE_MAX_GROUPS)
+    if error:
+        return error
+
+    return Response(summarize_archive(group_by, filters, limit=limit, **bounds))
+
+def _limit(request, maximum, default=None):
+    """``(?limit= within 1..maximum, None)``, or ``(None, 400 response)``."""
+    try:
+        limit = int(request.query_params.get('limit', default or maximum))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= maximum:
+        return None, Response({'error': f'limit must be between 1 and {maximum}'}, status=400)
+    return limit, None
+
+def _trend_params(request, dimensions):
+    """Parse start/end/granularity/group_by for the trend endpoints."""
+    bounds = {}
+    for param in ('start', 'end'):
+        value = parse_datetime(request.query_params.get(param, ''))
+        if value is None:
+            return None, Response({'error': f'{param} must be an ISO 8601 datetime'}, status=400)
+        bounds[param] = rollups.utc(value)
+    if bounds['start'] >= bounds['end']:
+        return None, Response({'error': 'start must be before end'}, status=400)
+
+    granularity = request.query_params.get('granularity') or None
+    if granularity is not None and granularity not in rollups.GRANULARITIES:
+        return None, Response(
+            {'error': f"granularity must be one of: {', '.join(rollups.GRANULARITIES)}"},
+            status=400,
+        )
+
+    group_by = [
+        field.strip()
+        for field in request.query_params.get('group_by', '').split(',')
+        if field.strip()
+    ]
+    if any(field not in dimensions for field in group_by):
+        return None, Response(
+            {'error': f"group_by must be zero or more of: {', '.join(dimensions)}"},
+            status=400,
+        )
+
+    start, end, granularity = rollups.parse_range(bounds['start'], bounds['end'], granularity)
+    return (start, end, granularity, group_by), None
+
+@api_view(['GET'])
+def requisition_trends(request):
+    """
+    Requisition counts per time bucket, served from the coarsest rollup that
+    tiles the range unless granularity is given.
+    Example: /api/trends/requisitions/?start=2024-01-01T00:00:00Z&end=2025-01-01T00:00:00Z&group_by=station_unit
+    """
+    params, error = _trend_params(request, rollups.REQUISITION_DIMENSIONS)
+    if error:
+        return error
+    start, end, granularity, group_by = params
+    return Response({
+        'start': start,
+        'end': end,
+        'granularity': granularity,
+        'group_by': group_by,
+        'series': rollups.requisition_series(start, end, granularity, group_by),
+    })
+
+@api_view(['GET'])
+def inventory_trends(request):
+    """
+    Firearm counts per time bucket (latest snapshot within each bucket).
+    Example: /api/trends/inventory/?start=2025-01-01T00:00:00Z&end=2025-02-01T00:00:00Z&granularity=day&group_by=type
+    """
+    params, error = _trend_params(request, rollups.INVENTORY_DIMENSIONS)
+    if error:
+        return error
+    start, end, granularity, group_by = params
+    return Response({
+        'start': start,
+        'end': end,
+        'granularity': granularity,
+        'group_by': group_by,
+        'series': rollups.inventory_series(start, end, granularity, group_by),
+    })
+
+@api_view(['GET'])
+def adhoc_report(request):
+    """
+    Ad-hoc group-by report over the read model, computed on cached columns;
+    ``limit`` (default 1000) is capped at REPORTING_ADHOC_MAX_ROWS.
+    Example: /api/reports/adhoc/?dataset=requisitions&group_by=station_unit
+             &metrics=count,sum:quantity,distinct:service_number,p95:quantity
+             &status=pending,approved&created_after=2025-01-01T00:00:00Z
+    """
+    dataset = request.query_params.get('dataset', 'requisitions')
+    if dataset not in adhoc.DATASETS:
+        return Response({'error': f"dataset must be one of: {', '.join(adhoc.DATASETS)}"}, status=400)
+    forbidden = _dataset_forbidden(request, dataset)
+    if forbidden:
+        return forbidden
+
+    group_by = _csv_param(request, 'group_by')
+    metrics = _csv_param(request, 'metrics') or ['count']
+    try:
+        limit = int(request.query_params.get('limit', 1000))
+    except ValueError:
+        return Response({'error': 'limit must be a positive integer'}, status=400)
+    try:
+        equals, ranges = _dataset_filters(request, dataset)
+        report = adhoc.run_report(dataset, group_by, metrics, equals, ranges, limit)
+    except (ValueError, MetricError) as exc:
+        return Response({'error': str(exc)}, status=400)
+    return Response(report)
+
+def _csv_param(request, name):
+    return [value.strip() for value in request.query_params.get(name, '').split(',') if value.strip()]
+
+def _dataset_filters(request, dataset):
+    """
+    Equality filters (``<text column>=a,b``) and time ranges
+    (``<prefix>_after`` / ``<prefix>_before``) for a read-model dataset.
+    """
+    _, _, text_columns, _, time_columns = adhoc.DATASETS[dataset]
+    equals = {
+        column: _csv_param(request, column)
+        for column in text_columns
+        if request.query_params.get(column)
+    }
+    ranges = {}
+    for column in time_columns:
+        prefix = column[:-len('_at')] if column.endswith('_at') else column
+        bounds = []
+        for param in (f'{prefix}_after', f'{prefix}_before'):
+            value = request.query_params.get(param)
+            parsed = parse_datetime(value) if value else None
+            if value and parsed is None:
+                raise ValueError(f'{param} must be an ISO 8601 datetime')
+            bounds.append(rollups.utc(parsed) if parsed else None)
+        if any(bounds):
+            ranges[column] = tuple(bounds)
+    return equals, ranges
+
+def _job_payload(request, job):
+    payload = {
+        'id': str(job.id),
+        'report': job.report,
+        'params': job.params,
+        'status': job.status,
+        'progress': job.progress,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+    }
+    if job.status == 'done':
+        payload['download_url'] = request.build_absolute_uri(f'/api/reports/jobs/{job.id}/download/')
+    if job.status == 'failed':
+        payload['error'] = job.error
+    return payload
+
+@api_view(['POST'])
+def submit_report_job(request):
+    """
+    Submit a report build. Body: {"report": "full_audit" | "adhoc", "params": {...}};
+    adhoc params may give a trailing window as {"last_days": {"created_at": 7}}.
+    Returns 200 when served from cache, otherwise 202 with a job to poll.
+    """
+    report = request.data.get('report')
+    params = request.data.get('params') or {}
+    if report not in jobs.REPORTS:
+        return Response({'error': f"report must be one of: {', '.join(jobs.REPORTS)}"}, status=400)
+    if not isinstance(params, dict):
+        return Response({'error': 'params must be an object'}, status=400)
+    forbidden = _dataset_forbidden(request, _job_dataset(report, params))
+    if forbidden:
+        return forbidden
+
+    try:
+        job, enqueue = jobs.submit(report, params)
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=400)
+    if enqueue:
+        run_report_job.delay(str(job.id))
+    return Response(_job_payload(request, job), status=200 if job.status == 'done' else 202)
+
+@api_view(['GET'])
+def report_job_detail(request, job_id):
+    job = get_object_or_404(ReportJob, pk=job_id)
+    forbidden = _dataset_forbidden(request, _job_dataset(job.report, job.params))
+    if forbidden:
+        return forbidden
+    return Response(_job_payload(request, job))
+
+@api_view(['GET'])
+def report_job_download(request, job_id):
+    job = get_object_or_404(ReportJob, pk=job_id)
+    forbidden = _dataset_forbidden(request, _job_dataset(job.report, job.params))
+    if forbidden:
+        return forbidden
+    if job.status != 'done':
+        return Response({'error': f'Report is {job.status}'}, status=409)
+    blob = get_report_cache().get_blob(job.cache_key)
+    if blob is None:
+        return Response({'error': 'Report artifact has been evicted; submit the report again'}, status=410)
+    return HttpResponse(gzip.decompress(blob), content_type='application/json')
+
+@api_view(['GET'])
+def scheduled_report(request, name):
+    """Latest precomputed artifact of a scheduled report."""
+    schedule = get_object_or_404(ScheduledReport, name=name)
+    forbidden = _dataset_forbidden(request, _job_dataset(schedule.report, schedule.params))
+    if forbidden:
+        return forbidden
+    if not schedule.last_cache_key:
+        return Response({'error': 'Scheduled report has not been built yet'}, status=404)
+    blob = get_report_cache().get_blob(schedule.last_cache_key)
+    if blob is None:
+        return Response({'error': 'Report artifact has been evicted; it is rebuilt on the next run'}, status=410)
+    return HttpResponse(gzip.decompress(blob), content_type='application/json')
+
+@api_view(['GET'])
+def export_dataset(request, dataset, file_format):
+    """
+    Stream a read-model dataset as an Arrow IPC stream or a Parquet file.
+    Example: /api/exports/requisitions.parquet?columns=station_unit,quantity,created_at
+             &station_unit=UNIT-001&created_after=2025-01-01T00:00:00Z
+    """
+    if dataset not in adhoc.DATASETS:
+        return Response({'error': f"dataset must be one of: {', '.join(adhoc.DATASETS)}"}, status=404)
+    forbidden = _dataset_forbidden(request, dataset)
+    if forbidden:
+        return forbidden
+    if file_format not in export.FORMATS:
+        return Response({'error': f"format must be one of: {', '.join(export.FORMATS)}"}, status=404)
+
+    available = export.columns(dataset)
+    projected = _csv_param(request, 'columns') or available
+    unknown = [column for column in projected if column not in available]
+    if unknown:
+        return Response({'error': f"Unknown columns: {', '.join(unknown)}"}, status=400)
     try:
-        res = requests.get("http://inventory-service:8000/api/arms/")
-        data = res.json()
-        status_count = {}
-        for arm in data:
-            status = arm['status']
-            status_count[status] = status_count.get(status, 0) + 1
-        return Response(status_count)
-    except:
-        return Response({'error': 'Could not fetch inventory'}, status=500)
+        equals, ranges = _dataset_filters(request, dataset)
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=400)
+
+    content_type, extension = export.FORMATS[file_format]
+    response = StreamingHttpResponse(
+        export.stream(dataset, file_format, projected, equals, ranges),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{extension}"'
+    return response
+
+def _approximate(request):
+    return request.query_params.get('approximate', '').lower() in ('1', 'true', 'yes')
+
+def _sketch_unavailable(exc):
+    return Response({'error': f'Approximate metrics are unavailable: {exc}'}, status=503)
+
+@api_view(['GET'])
+def distinct_officers(request):
+    """
+    Distinct officers who have requested arms, per station unit.
+    Example: /api/metrics/distinct-officers/?station_unit=UNIT-001,UNIT-002&approximate=true
+    """
+    units = _csv_param(request, 'station_unit')
+    if _approximate(request):
+        try:
+            counts = sketches.distinct_officers_by_unit(units)
+        except redis.RedisError as exc:
+            return _sketch_unavailable(exc)
+    else:
+        queryset = RequisitionRecord.objects.all()
+        if units:
+            queryset = queryset.filter(station_unit__in=units)
+        counts = dict(
+            queryset.values_list('station_unit')
+            .annotate(officers=Count('service_number', distinct=True))
+            .order_by('station_unit')
+        )
+    return Response({
+        'approximate': _approximate(request),
+        'units': [{'station_unit': unit, 'officers': count} for unit, count in counts.items()],
+    })
+
+@api_view(['GET'])
+def top_firearm_types(request):
+    """
+    The K most requested firearm types by number of requisitions.
+    Example: /api/metrics/top-firearm-types/?k=5&approximate=true
+    """
+    try:
+        k = int(request.query_params.get('k', 10))
+    except ValueError:
+        return Response({'error': 'k must be an integer'}, status=400)
+    if not 1 <= k <= settings.REPORTING_SKETCH_TOP_K:
+        return Response({'error': f'k must be between 1 and {settings.REPORTING_SKETCH_TOP_K}'}, status=400)
+
+    if _approximate(request):
+        try:
+            types = sketches.top_firearm_types(k)
+        except redis.RedisError as exc:
+            return _sketch_unavailable(exc)
+    else:
+        types = list(
+            RequisitionRecord.objects.values('firearm_type')
+            .annotate(count=Count('id'))
+            .order_by('-count', 'firearm_type')[:k]
+        )
+    return Response({'approximate': _approximate(request), 'k': k, 'firearm_types': types})
+
+@api_view(['GET'])
+def distinct_serials_moved(request):
+    """
+    Distinct firearm serial numbers moved per UTC day, and over the whole range.
+    Exact figures only see each arm's latest change; the sketches see every
+    change synced within the retention window.
+    Example: /api/metrics/distinct-serials-moved/?start=2025-01-01T00:00:00Z&end=2025-01-08T00:00:00Z&approximate=true
+    """
+    bounds = {}
+    for param in ('start', 'end'):
+        value = parse_datetime(request.query_params.get(param, ''))
+        if value is None:
+            return Response({'error': f'{param} must be an ISO 8601 datetime'}, status=400)
+        bounds[param] = rollups.truncate(rollups.utc(value), 'day')
+    start, end = bounds['start'], bounds['end']
+    if start >= end:
+        return Response({'error': 'start must be before end'}, status=400)
+    if (end - start).days > settings.REPORTING_SKETCH_RETENTION_DAYS:
+        return Response(
+            {'error': f'Range is limited to {settings.REPORTING_SKETCH_RETENTION_DAYS} days'},
+            status=400,
+        )
+    days = [(start + timedelta(days=offset)).date().isoformat() for offset in range((end - start).days)]
+
+    if _approximate(request):
+        try:
+            per_day, total = sketches.distinct_serials_by_day(days)
+        except redis.RedisError as exc:
+            return _sketch_unavailable(exc)
+    else:
+        queryset = ArmRecord.objects.filter(updated_at__gte=start, updated_at__lt=end)
+        per_day = {day: 0 for day in days}
+        per_day.update(
+            (day.isoformat(), count)
+            for day, count in queryset.annotate(day=TruncDate('updated_at'))
+            .values_list('day')
+            .annotate(serials=Count('serial_number', distinct=True))
+            .order_by()
+        )
+        total = queryset.values('serial_number').distinct().count()
+    return Response({
+        'approximate': _approximate(request),
+        'start': start,
+        'end': end,
+        'total': total,
+        'series': [{'day': day, 'serials': per_day[day]} for day in days],
+    })
@@ -2,6 +2,8 @@ from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
 
+from amms_common import metrics, tracing
+
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'requisition_service.settings')
 
@@ -14,6 +16,8 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Autodiscover tasks from all registered Django apps.
 app.autodiscover_tasks()
+metrics.instrument_celery()
+tracing.instrument_celery()
 
 @app.task(bind=True)
 def debug_task(self):
@@ -1,5 +1,6 @@
 
 import os
+from celery.schedules import crontab
 from decouple import config
 from pathlib import Path
 
@@ -22,6 +23,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
+    'django_filters',
     'requisitions',
     'corsheaders',
 ]
@@ -31,10 +33,19 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": False,
     "BLACKLIST_AFTER_ROTATION": True,
-    "SIGNING_KEY": config("DJANGO_SECRET_KEY"),
     "AUTH_HEADER_TYPES": ("Bearer",),
+    # user-service signs with RS256; keys come from its JWKS, see below.
+    "ALGORITHM": "RS256",
+    "AUTH_TOKEN_CLASSES": ("amms_common.jwks.JWKSAccessToken",),
 }
 
+# Offline token verification against user-service's JWKS (amms_common.jwks)
+JWT_JWKS_URL = config('JWT_JWKS_URL', default='http://user-service:8000/.well-known/jwks.json')
+JWT_JWKS_REFRESH_INTERVAL = config('JWT_JWKS_REFRESH_INTERVAL', default=300, cast=int)
+JWT_JWKS_UNKNOWN_KID_WAIT = config('JWT_JWKS_UNKNOWN_KID_WAIT', default=2, cast=float)
+JWT_JWKS_REFRESH_COOLDOWN = config('JWT_JWKS_REFRESH_COOLDOWN', default=10, cast=float)
+JWT_JWKS_CACHE_FILE = config('JWT_JWKS_CACHE_FILE', default='')
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173", 
 ]
@@ -47,10 +58,15 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    "DEFAULT_PAGINATION_CLASS": "requisitions.pagination.StandardResultsSetPagination",
+    "PAGE_SIZE": 20,
 }
 
 
 MIDDLEWARE = [
+    'amms_common.metrics.MetricsMiddleware',  # first, so it times the whole stack
+    'amms_common.profiling.ProfilingMiddleware',  # off unless PROFILING_ENABLED
+    'amms_common.tracing.TracingMiddleware',
      'corsheaders.middleware.CorsMiddleware', 
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -59,6 +75,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'amms_common.tracing.ViewTracingMiddleware',  # last, so it spans just the view
 ]
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_ALL_ORIGINS = True
@@ -92,6 +109,8 @@ DATABASES = {
         'PASSWORD': config('DJANGO_DB_PASSWORD', default=''),
         'HOST': config('DJANGO_DB_HOST', default='localhost'),
         'PORT': config('DJANGO_DB_PORT', default='3306'),
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
         'OPTIONS': {
             'charset': 'utf8mb4',
             'init_command': "SET NAMES utf8mb4 COLLATE utf8mb4_unicode_ci",
@@ -100,6 +119,21 @@ DATABASES = {
     }
 }
 
+# Connection pool for ASGI/async workers (amms_common.dbpool). Replaces the
+# persistent per-thread connection above; MySQL only.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+if DB_POOL:
+    DATABASES['default'].update({
+        'ENGINE': 'amms_common.dbpool',
+        'CONN_MAX_AGE': 0,
+    })
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),  # seconds to wait for a free connection
+        'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=1800, cast=int),
+        'check_after': config('DB_POOL_CHECK_AFTER', default=30, cast=int),  # idle seconds before a ping
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -145,4 +179,61 @@ CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://redis:6379/0')  # Re
 CELERY_ACCEPT_CONTENT = ['json']  # Accept JSON-encoded tasks
 CELERY_TASK_SERIALIZER = 'json'  # Serialize tasks as JSON
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://redis:6379/0')  # Store task results in Redis
-CELERY_TIMEZONE = 'UTC'  # Set the timezone for Celery
\ No newline at end of file
+CELERY_TIMEZONE = 'UTC'  # Set the timezone for Celery
+CELERY_BEAT_SCHEDULE = {
+    'maintain-requisition-partitions': {
+        'task': 'requisitions.tasks.maintain_requisition_partitions',
+        'schedule': crontab(hour=2, minute=0),  # Daily, off-peak
+    },
+}
+
+# Prometheus metrics of Celery workers (amms_common.metrics)
+WORKER_METRICS_PORT = config('WORKER_METRICS_PORT', default=9808, cast=int)
+
+# Requisition partitioning and archive tier
+REQUISITION_PARTITION_MONTHS_AHEAD = config('REQUISITION_PARTITION_MONTHS_AHEAD', cast=int, default=3)
+REQUISITION_ARCHIVE_AFTER_MONTHS = config('REQUISITION_ARCHIVE_AFTER_MONTHS', cast=int, default=12)
+REQUISITION_ARCHIVE_DIR = config('REQUISITION_ARCHIVE_DIR', default='/data/archive/requisitions')
+
+# Officer enrichment via user-service's batch lookup (requisitions.user_directory).
+# The lookup is staff-only: USER_SERVICE_TOKEN is a staff account's access token.
+USER_SERVICE_URL = config('USER_SERVICE_URL', default='http://user-service:8000')
+USER_SERVICE_TOKEN = config('USER_SERVICE_TOKEN', default='')
+USER_LOOKUP_BATCH_SIZE = config('USER_LOOKUP_BATCH_SIZE', cast=int, default=1000)
+USER_LOOKUP_CACHE_TTL = config('USER_LOOKUP_CACHE_TTL', cast=float, default=300)  # evicted on change
+USER_LOOKUP_TIMEOUT = config('USER_LOOKUP_TIMEOUT', cast=float, default=3)
+
+# Domain events: transactional outbox relayed to Redis Streams (amms_common.outbox)
+EVENT_SOURCE = 'requisitions'
+EVENT_OUTBOX_MODEL = 'requisitions.OutboxEvent'
+EVENT_BUS_REDIS_URL = config('EVENT_BUS_REDIS_URL', default='redis://redis:6379/4')
+EVENT_STREAM_PREFIX = config('EVENT_STREAM_PREFIX', default='amms:events:')
+EVENT_STREAM_MAXLEN = config('EVENT_STREAM_MAXLEN', default=100_000, cast=int)
+EVENT_RELAY_BATCH_SIZE = config('EVENT_RELAY_BATCH_SIZE', default=500, cast=int)
+EVENT_RELAY_POLL_INTERVAL = config('EVENT_RELAY_POLL_INTERVAL', default=0.5, cast=float)
+EVENT_OUTBOX_RETENTION_HOURS = config('EVENT_OUTBOX_RETENTION_HOURS', default=72, cast=int)
+
+# Cross-service cache invalidation over Redis pub/sub (amms_common.invalidation)
+CACHE_INVALIDATION_REDIS_URL = config('CACHE_INVALIDATION_REDIS_URL', default='redis://redis:6379/0')
+CACHE_INVALIDATION_CHANNEL_PREFIX = config('CACHE_INVALIDATION_CHANNEL_PREFIX', default='amms:invalidate:')
+
+# Tracing (see amms_common.tracing)
+TRACE_SERVICE_NAME = config('TRACE_SERVICE_NAME', default='requisition-service')
+TRACE_SAMPLE_RATE = config('TRACE_SAMPLE_RATE', default=0.1, cast=float)  # share of new traces recorded
+TRACE_EXPORTER = config('TRACE_EXPORTER', default='otlp')  # otlp, file or none
+TRACE_OTLP_ENDPOINT = config('TRACE_OTLP_ENDPOINT', default='http://jaeger:4318/v1/traces')
+TRACE_FILE = config('TRACE_FILE', default=str(BASE_DIR / 'traces.jsonl'))
+TRACE_EXPORT_INTERVAL = config('TRACE_EXPORT_INTERVAL', default=1, cast=float)  # seconds
+TRACE_QUEUE_SIZE = config('TRACE_QUEUE_SIZE', default=10000, cast=int)  # spans buffered per process
+
+# Tests run without span export; --update-baselines records perf baselines (amms_common.testing)
+TEST_RUNNER = 'amms_common.testing.TestRunner'
+
+# Request profiling (see amms_common.profiling)
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.01, cast=float)  # share of requests kept
+PROFILING_SLOW_MS = config('PROFILING_SLOW_MS', default=1000, cast=float)  # always keep slower requests
+PROFILING_INTERVAL_MS = config('PROFILING_INTERVAL_MS', default=5, cast=float)  # between stack samples
+PROFILING_DIR = config('PROFILING_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILING_MAX_PROFILES = config('PROFILING_MAX_PROFILES', default=200, cast=int)  # kept on disk
+PROFILING_MAX_QUERIES = config('PROFILING_MAX_QUERIES', default=500, cast=int)  # listed per profile
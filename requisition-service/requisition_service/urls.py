@@ -3,8 +3,15 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from amms_common import dbpool, metrics, profiling
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('requisitions.urls')),
+    path('metrics/db/', dbpool.metrics_view),
+    path('metrics', metrics.metrics_view),
+    path('profiles/', profiling.profile_list),
+    path('profiles/<slug:profile_id>/', profiling.profile_detail),
+    path('profiles/<slug:profile_id>/collapsed/', profiling.profile_collapsed),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class RequisitionsConfig(AppConfig):
+    name = 'requisitions'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -1,8 +1,9 @@
 import requests
-from django.conf import settings
 from rest_framework.authentication import BaseAuthentication, get_authorization_header
 from rest_framework.exceptions import AuthenticationFailed
 from django.utils.translation import gettext_lazy as _
+from amms_common import tracing
+from amms_common.metrics import observe_upstream
 
 # This should be the internal or external URL of your user service
 USER_SERVICE_VALIDATE_URL = 'http://user-service:8001/api/auth/user/'
@@ -39,12 +40,14 @@ class UserServiceAuthentication(BaseAuthentication):
         
         try:
             # Make a request to the user service to validate the token
-            response = requests.get(USER_SERVICE_VALIDATE_URL, headers=headers, timeout=5)
+            with observe_upstream('user-service'), tracing.outbound('GET', USER_SERVICE_VALIDATE_URL, headers) as headers:
+                response = requests.get(USER_SERVICE_VALIDATE_URL, headers=headers, timeout=5)
+                tracing.annotate({'http.status_code': response.status_code})
             response.raise_for_status() # Raise an exception for 4xx or 5xx status codes
 
         except requests.exceptions.Timeout:
             raise AuthenticationFailed(_('The user service timed out. Please try again.'))
-        except requests.exceptions.RequestException as e:
+        except requests.exceptions.RequestException:
             # This will catch connection errors, 401, 403, 500, etc.
             raise AuthenticationFailed(_('Token validation failed. The user service is unreachable or the token is invalid.'))
 
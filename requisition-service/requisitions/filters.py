@@ -0,0 +1,18 @@
+import django_filters
+from .models import Requisition
+
+
+class RequisitionFilter(django_filters.FilterSet):
+    """
+    Query parameters for requisition audits. Every filter but ``status`` leads
+    one of the indexes on ``Requisition`` (the composites in its ``Meta``, or
+    ``updated_at``'s own), so audit queries stay index range scans instead of
+    full table scans; ``status`` narrows the ``firearm_type`` one.
+    """
+    created_after = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_before = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lt')
+    updated_after = django_filters.IsoDateTimeFilter(field_name='updated_at', lookup_expr='gte')
+
+    class Meta:
+        model = Requisition
+        fields = ['station_unit', 'service_number', 'firearm_type', 'status', 'rank']
@@ -0,0 +1,39 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requisitions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='requisition',
+            options={'ordering': ['-created_at']},
+        ),
+        migrations.AddField(
+            model_name='requisition',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='requisition',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')], default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='requisition',
+            index=models.Index(fields=['station_unit', 'created_at'], name='req_unit_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requisition',
+            index=models.Index(fields=['service_number', 'created_at'], name='req_officer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requisition',
+            index=models.Index(fields=['firearm_type', 'status'], name='req_type_status_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def partition_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    from requisitions import partitions
+    partitions.partition_table()
+    partitions.ensure_future_partitions()
+
+
+def unpartition_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    from requisitions import partitions
+    partitions.unpartition_table()
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('requisitions', '0002_requisition_status_created_at_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_table, unpartition_table),
+    ]
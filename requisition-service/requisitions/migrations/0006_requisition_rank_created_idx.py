@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requisitions', '0005_outboxevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='requisition',
+            index=models.Index(fields=['rank', 'created_at'], name='req_rank_created_idx'),
+        ),
+    ]
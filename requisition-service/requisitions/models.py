@@ -1,15 +1,50 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 class Requisition(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('approved', 'Approved'),
+        ('rejected', 'Rejected'),
+    ]
+
     service_number = models.CharField(max_length=100, default='')
     rank = models.CharField(max_length=100, default='')
     name = models.CharField(max_length=100, default='')
     station_unit = models.CharField(max_length=100, default='')
     firearm_type = models.CharField(max_length=100, default='')
     quantity = models.IntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         db_table = 'requisition_service_requisition'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['station_unit', 'created_at'], name='req_unit_created_idx'),
+            models.Index(fields=['service_number', 'created_at'], name='req_officer_created_idx'),
+            models.Index(fields=['firearm_type', 'status'], name='req_type_status_idx'),
+            models.Index(fields=['rank', 'created_at'], name='req_rank_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.service_number}"
+
+
+class OutboxEvent(models.Model):
+    """A domain event waiting to be relayed to Redis Streams (see ``outbox``)."""
+    aggregate = models.CharField(max_length=50)
+    event_type = models.CharField(max_length=100)
+    key = models.CharField(max_length=100)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['published_at', 'id'], name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.key} ({self.pk})"
@@ -0,0 +1,237 @@
+"""
+Monthly range partitioning and archiving for the requisition table.
+
+The table is partitioned with ``PARTITION BY RANGE (TO_DAYS(created_at))``:
+one partition per calendar month plus a ``p_future`` MAXVALUE catch-all.
+Upcoming months are split off ``p_future`` ahead of time, and partitions that
+fall entirely before the archive horizon are written to Parquet files and
+dropped, so the live table only ever holds recent months.
+
+Partitioning is a MySQL feature; on any other backend these helpers are no-ops.
+"""
+import logging
+import os
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Requisition
+
+logger = logging.getLogger(__name__)
+
+TABLE = Requisition._meta.db_table
+FUTURE_PARTITION = 'p_future'
+ARCHIVE_CHUNK_SIZE = 10000
+
+# MySQL TO_DAYS('0001-01-01') is 367, Python's date ordinal for it is 1.
+_TO_DAYS_OFFSET = 366
+
+ARCHIVE_COLUMNS = [
+    'id', 'service_number', 'rank', 'name', 'station_unit',
+    'firearm_type', 'quantity', 'status', 'created_at', 'updated_at',
+]
+
+
+def is_supported():
+    return connection.vendor == 'mysql'
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"p{month:%Y%m}"
+
+
+def _to_days(day):
+    return day.toordinal() + _TO_DAYS_OFFSET
+
+
+def _from_days(days):
+    return date.fromordinal(days - _TO_DAYS_OFFSET)
+
+
+def _as_datetime(day):
+    return datetime(day.year, day.month, day.day, tzinfo=dt_timezone.utc)
+
+
+def list_partitions():
+    """
+    Return the table's partitions in order as ``(name, lower, upper)`` tuples.
+    ``lower`` is None for the first partition and ``upper`` is None for
+    ``p_future``; both bounds are dates, lower inclusive and upper exclusive.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+              AND PARTITION_NAME IS NOT NULL
+            ORDER BY PARTITION_ORDINAL_POSITION
+            """,
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+
+    partitions = []
+    lower = None
+    for name, description in rows:
+        upper = None if description == 'MAXVALUE' else _from_days(int(description))
+        partitions.append((name, lower, upper))
+        lower = upper
+    return partitions
+
+
+def partition_table(today=None):
+    """
+    Convert an unpartitioned table to monthly range partitions.
+
+    MySQL requires the partitioning column in every unique key, so the
+    primary key is widened to ``(id, created_at)``. ``id`` stays
+    AUTO_INCREMENT and therefore unique on its own.
+    """
+    current = month_start(today or date.today())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"ALTER TABLE {TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)"
+        )
+        cursor.execute(
+            f"""
+            ALTER TABLE {TABLE} PARTITION BY RANGE (TO_DAYS(created_at)) (
+                PARTITION p_history VALUES LESS THAN ({_to_days(current)}),
+                PARTITION {partition_name(current)} VALUES LESS THAN ({_to_days(add_months(current, 1))}),
+                PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE
+            )
+            """
+        )
+
+
+def unpartition_table():
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {TABLE} REMOVE PARTITIONING")
+        cursor.execute(f"ALTER TABLE {TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (id)")
+
+
+def ensure_future_partitions(months_ahead=None, today=None):
+    """
+    Split monthly partitions off ``p_future`` until ``months_ahead`` months
+    past the current one exist. Returns the names of the partitions created.
+    """
+    if not is_supported():
+        return []
+    if months_ahead is None:
+        months_ahead = settings.REQUISITION_PARTITION_MONTHS_AHEAD
+
+    partitions = list_partitions()
+    if not partitions:
+        return []
+
+    bounded = [upper for _, _, upper in partitions if upper is not None]
+    next_month = max(bounded) if bounded else month_start(today or date.today())
+    target = add_months(month_start(today or date.today()), months_ahead + 1)
+
+    created = []
+    definitions = []
+    while next_month < target:
+        upper = add_months(next_month, 1)
+        name = partition_name(next_month)
+        definitions.append(f"PARTITION {name} VALUES LESS THAN ({_to_days(upper)})")
+        created.append(name)
+        next_month = upper
+
+    if definitions:
+        definitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"ALTER TABLE {TABLE} REORGANIZE PARTITION {FUTURE_PARTITION} "
+                f"INTO ({', '.join(definitions)})"
+            )
+        logger.info("Created requisition partitions: %s", ', '.join(created))
+    return created
+
+
+def archive_path(name):
+    return os.path.join(settings.REQUISITION_ARCHIVE_DIR, f"{TABLE}_{name}.parquet")
+
+
+def _to_table(rows, schema):
+    import pyarrow as pa
+
+    columns = list(zip(*rows))
+    return pa.table(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+def _write_parquet(queryset, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('service_number', pa.string()),
+        ('rank', pa.string()),
+        ('name', pa.string()),
+        ('station_unit', pa.string()),
+        ('firearm_type', pa.string()),
+        ('quantity', pa.int32()),
+        ('status', pa.string()),
+        ('created_at', pa.timestamp('us', tz='UTC')),
+        ('updated_at', pa.timestamp('us', tz='UTC')),
+    ])
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    rows = 0
+    with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+        batch = []
+        for row in queryset.values_list(*ARCHIVE_COLUMNS).iterator(chunk_size=ARCHIVE_CHUNK_SIZE):
+            batch.append(row)
+            if len(batch) >= ARCHIVE_CHUNK_SIZE:
+                writer.write_table(_to_table(batch, schema))
+                rows += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(_to_table(batch, schema))
+            rows += len(batch)
+    os.replace(tmp_path, path)
+    return rows
+
+
+def archive_old_partitions(horizon_months=None, today=None):
+    """
+    Write every partition that ends on or before the archive horizon to a
+    zstd-compressed Parquet file, then drop it from the live table.
+    Returns a ``{partition_name: row_count}`` mapping of what was archived.
+    """
+    if not is_supported():
+        return {}
+    if horizon_months is None:
+        horizon_months = settings.REQUISITION_ARCHIVE_AFTER_MONTHS
+
+    cutoff = add_months(month_start(today or date.today()), -horizon_months)
+    archived = {}
+    for name, lower, upper in list_partitions():
+        if upper is None or upper > cutoff:
+            continue
+
+        queryset = Requisition.objects.filter(created_at__lt=_as_datetime(upper)).order_by()
+        if lower is not None:
+            queryset = queryset.filter(created_at__gte=_as_datetime(lower))
+
+        path = archive_path(name)
+        rows = _write_parquet(queryset, path)
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {TABLE} DROP PARTITION {name}")
+        archived[name] = rows
+        logger.info("Archived %s rows from partition %s to %s", rows, name, path)
+    return archived
@@ -5,3 +5,5 @@ class RequisitionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Requisition
         fields = '__all__'
+        # Changed only through the admin ``transition`` action.
+        read_only_fields = ('status',)
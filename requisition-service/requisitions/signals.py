@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from amms_common.invalidation import publish_on_commit
+from amms_common.outbox import emit
+
+from .models import Requisition
+from .serializers import RequisitionSerializer
+
+
+@receiver(post_init, sender=Requisition)
+def remember_status(sender, instance, **kwargs):
+    instance._saved_status = instance.status
+
+
+@receiver(post_save, sender=Requisition)
+def requisition_saved(sender, instance, created, **kwargs):
+    if created:
+        emit('requisitions', 'requisition.submitted', instance.pk, RequisitionSerializer(instance).data)
+    elif instance.status != instance._saved_status:
+        payload = dict(RequisitionSerializer(instance).data, previous_status=instance._saved_status)
+        emit('requisitions', 'requisition.status_changed', instance.pk, payload)
+    instance._saved_status = instance.status
+    publish_on_commit([instance])
+
+
+@receiver(post_delete, sender=Requisition)
+def requisition_deleted(sender, instance, **kwargs):
+    publish_on_commit([instance])
@@ -1,7 +1,18 @@
 from celery import shared_task
+from . import partitions
 
 @shared_task
 def process_requisition(requisition_id):
     # Simulate requisition processing
     print(f"Processing requisition with ID: {requisition_id}")
-    return f"Requisition {requisition_id} processed successfully."
\ No newline at end of file
+    return f"Requisition {requisition_id} processed successfully."
+
+@shared_task
+def maintain_requisition_partitions():
+    """
+    Create upcoming monthly partitions, then archive and drop the ones that
+    have aged past REQUISITION_ARCHIVE_AFTER_MONTHS.
+    """
+    created = partitions.ensure_future_partitions()
+    archived = partitions.archive_old_partitions()
+    return {'created': created, 'archived': archived}
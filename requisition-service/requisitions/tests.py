@@ -0,0 +1,177 @@
+"""
+Tests for the requisition endpoints: behaviour, then performance (query
+budgets and p95 latency). Data volume and timing runs for the latter come
+from the PERF_* environment variables, see ``amms_common.perftest``.
+"""
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from amms_common.perftest import PerfTestCase, bulk_seed, scaled
+from requisitions.models import Requisition
+
+REQUISITIONS = scaled(5_000_000)
+OFFICERS = scaled(50_000)
+
+STATIONS = [f'Station {index:02d}' for index in range(40)]
+FIREARM_TYPES = ['pistol', 'rifle', 'shotgun', 'submachine_gun', 'sniper_rifle']
+RANKS = ['Constable', 'Corporal', 'Sergeant', 'Inspector']
+STATUSES = [choice for choice, _ in Requisition.STATUS_CHOICES]
+
+
+def synthetic_requisitions(count):
+    for index in range(count):
+        officer = index % OFFICERS
+        yield Requisition(
+            service_number=f'PERF-{officer:06d}',
+            rank=RANKS[officer % len(RANKS)],
+            name=f'Officer {officer}',
+            station_unit=STATIONS[index % len(STATIONS)],
+            firearm_type=FIREARM_TYPES[index % len(FIREARM_TYPES)],
+            quantity=1 + index % 5,
+            status=STATUSES[index % len(STATUSES)],
+        )
+
+
+class RequisitionStatusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.officer = User.objects.create_user('officer')
+        cls.admin = User.objects.create_user('admin', is_staff=True)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.officer)
+        self.requisition = Requisition.objects.create(
+            service_number='SN-1', station_unit=STATIONS[0], firearm_type='pistol', quantity=1,
+        )
+
+    def test_create_ignores_status(self):
+        response = self.api.post('/api/requisitions/', {
+            'service_number': 'SN-2', 'firearm_type': 'rifle', 'quantity': 2, 'status': 'approved',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['status'], 'pending')
+
+    def test_update_ignores_status(self):
+        response = self.api.patch(f'/api/requisitions/{self.requisition.pk}/', {'status': 'approved'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.requisition.refresh_from_db()
+        self.assertEqual(self.requisition.status, 'pending')
+
+    def test_transition_requires_admin(self):
+        response = self.api.post(f'/api/requisitions/{self.requisition.pk}/transition/', {'status': 'approved'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_admin_transition(self):
+        self.api.force_authenticate(self.admin)
+        url = f'/api/requisitions/{self.requisition.pk}/transition/'
+        response = self.api.post(url, {'status': 'approved'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'approved')
+        # Decided requisitions stay decided.
+        self.assertEqual(self.api.post(url, {'status': 'rejected'}).status_code, 400)
+        self.assertEqual(self.api.post(url, {'status': 'bogus'}).status_code, 400)
+
+    def test_summary_limit(self):
+        for station in STATIONS[1:3]:
+            Requisition.objects.create(station_unit=station, quantity=1)
+        response = self.api.get('/api/requisitions/summary/', {'group_by': 'station_unit', 'limit': 2})
+        self.assertEqual(len(response.data['groups']), 2)
+        self.assertTrue(response.data['truncated'])
+        response = self.api.get('/api/requisitions/summary/', {'group_by': 'station_unit'})
+        self.assertEqual(len(response.data['groups']), 3)
+        self.assertFalse(response.data['truncated'])
+        self.assertEqual(self.api.get('/api/requisitions/summary/', {'limit': 0}).status_code, 400)
+
+
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(get_user_model().objects.create_user('officer'))
+
+    def test_rows_sharing_a_timestamp_are_read_once(self):
+        requisitions = [Requisition.objects.create(station_unit=STATIONS[0], quantity=1) for _ in range(5)]
+        # A bulk update stamps them all alike; the id breaks the tie.
+        Requisition.objects.update(updated_at=datetime(2025, 1, 1, tzinfo=timezone.utc))
+        response = self.api.get('/api/requisitions/changes/', {'page_size': 2})
+        seen = [row['id'] for row in response.data['results']]
+        while response.data['next']:
+            response = self.api.get(response.data['next'])
+            seen += [row['id'] for row in response.data['results']]
+        self.assertEqual(seen, [requisition.pk for requisition in requisitions])
+
+
+class RequisitionEndpointPerformanceTests(PerfTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        bulk_seed(Requisition, synthetic_requisitions(REQUISITIONS))
+        cls.user = get_user_model().objects.create_user('perf-officer')
+
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        # ?expand=officer calls user-service; only its effect on our own
+        # queries is measured here.
+        directory = mock.Mock()
+        directory.by_service_numbers.side_effect = lambda service_numbers: {
+            service_number: {'service_number': service_number} for service_number in service_numbers
+        }
+        patcher = mock.patch('requisitions.views.get_user_directory', return_value=directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, path, params=None):
+        response = self.api.get(path, params or {})
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        return response
+
+    def list_page(self, page_size):
+        return self.get('/api/requisitions/', {'page_size': page_size})
+
+    def expanded_page(self, page_size):
+        return self.get('/api/requisitions/', {'page_size': page_size, 'expand': 'officer'})
+
+    def search(self, page_size=20):
+        return self.get('/api/requisitions/', {
+            'station_unit': STATIONS[3], 'status': 'pending', 'page_size': page_size,
+        })
+
+    def dashboard(self):
+        return self.get('/api/requisitions/summary/', {'group_by': 'station_unit,status'})
+
+    # Query budgets: the count and the page for lists, or the totals and the
+    # groups for the summary.
+
+    def test_list_queries(self):
+        self.assertNumQueries(2, self.list_page, 20)
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        self.assertQueriesIndependentOf('page_size', self.list_page, [10, 100])
+
+    def test_expanded_list_queries_do_not_grow_with_page_size(self):
+        self.assertNumQueries(2, self.expanded_page, 20)
+        self.assertQueriesIndependentOf('page_size', self.expanded_page, [10, 100])
+
+    def test_search_queries(self):
+        self.assertNumQueries(2, self.search)
+
+    def test_search_queries_do_not_grow_with_page_size(self):
+        self.assertQueriesIndependentOf('page_size', self.search, [10, 100])
+
+    def test_dashboard_queries(self):
+        self.assertNumQueries(2, self.dashboard)
+
+    def test_list_latency(self):
+        self.assertLatency('requisitions.list', self.list_page, 20)
+
+    def test_search_latency(self):
+        self.assertLatency('requisitions.search', self.search)
+
+    def test_dashboard_latency(self):
+        self.assertLatency('requisitions.summary', self.dashboard)
@@ -1,19 +1,11 @@
-from django.contrib import admin
 from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework.routers import DefaultRouter
+from .views import RequisitionViewSet
 
-urlpatterns = [
-    path('admin/', admin.site.urls),
-
-    # ✅ JWT Authentication endpoints
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+router = DefaultRouter()
+router.register(r'requisitions', RequisitionViewSet, basename='requisition')
 
+urlpatterns = [
     # ✅ App routes
-    path('api/', include('requisition_service.urls')),
-] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+    path('', include(router.urls)),
+]
@@ -0,0 +1,172 @@
+"""
+Client for user-service's batch lookup (``/api/v1/users/lookup/``).
+
+Enrichment asks for every officer on a page at once: the client dedupes the
+keys, answers what it can from a short-TTL in-process cache, and fetches the
+rest in batches of USER_LOOKUP_BATCH_SIZE, one request per batch. Unknown
+keys are cached too, so they are not asked for again within the TTL. When a
+batch is asked for again after its TTL, the request carries the ETag of the
+last answer and a 304 reuses it without a body.
+
+The lookup is staff-only in user-service, so every request carries
+USER_SERVICE_TOKEN (a staff account's token) rather than the caller's: the
+cache is shared by all callers anyway.
+
+Lookups are best effort: if user-service fails or times out, the keys it
+did not answer are simply missing from the result.
+
+Cached users are evicted as soon as user-service publishes a change to them
+(``amms_common.invalidation``), along with every cached miss, since a new
+user may now match it. The TTL only covers changes missed while the
+listener was disconnected, so it can be long.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from django.conf import settings
+from amms_common import tracing
+from amms_common.invalidation import subscriber
+from amms_common.metrics import CACHE_REQUESTS, observe_upstream
+
+logger = logging.getLogger(__name__)
+
+_ABSENT = object()
+
+
+class _TTLCache:
+    """Size-bounded LRU whose entries expire ``ttl`` seconds after being set."""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return _ABSENT
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def evict_where(self, predicate):
+        """Drop the entries for which ``predicate(key, value)`` is true."""
+        with self._lock:
+            for key in [key for key, (_, value) in self._entries.items() if predicate(key, value)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class UserDirectoryClient:
+    def __init__(self, base_url, token='', batch_size=1000, ttl=30, timeout=3,
+                 fields=None, max_entries=20000):
+        self.url = base_url.rstrip('/') + '/api/v1/users/lookup/'
+        self.token = token
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.fields = fields
+        self.session = requests.Session()
+        self._records = _TTLCache(ttl, max_entries)
+        # ETag and users of recent batches; kept for longer than the records
+        # so that refetching a batch after its TTL can be a 304.
+        self._batches = _TTLCache(ttl * 10, 256)
+
+    def by_ids(self, ids):
+        """``{id: user}`` for the ``ids`` user-service knows."""
+        found = self._resolve('ids', [str(user_id) for user_id in ids])
+        return {int(key): user for key, user in found.items()}
+
+    def by_service_numbers(self, service_numbers):
+        """``{service_number: user}`` for the service numbers user-service knows."""
+        return self._resolve('service_numbers', [str(number) for number in service_numbers])
+
+    def evict_user(self, pk, version=None):
+        """Forget the cached copies of user ``pk`` and every cached miss."""
+        self._records.evict_where(
+            lambda key, user: user is None or key == ('ids', str(pk)) or user.get('id') == pk
+        )
+
+    def clear(self):
+        self._records.clear()
+
+    def _resolve(self, param, keys):
+        found, misses = {}, []
+        for key in dict.fromkeys(keys):
+            user = self._records.get((param, key))
+            if user is _ABSENT:
+                misses.append(key)
+            elif user is not None:
+                found[key] = user
+        CACHE_REQUESTS.labels('user_directory', 'miss').inc(len(misses))
+        CACHE_REQUESTS.labels('user_directory', 'hit').inc(len(keys) - len(misses))
+
+        for start in range(0, len(misses), self.batch_size):
+            batch = misses[start:start + self.batch_size]
+            try:
+                users = self._fetch(param, batch)
+            except requests.RequestException as exc:
+                logger.warning("User lookup of %d %s failed: %s", len(batch), param, exc)
+                continue
+            for key in batch:
+                user = users.get(key)
+                self._records.set((param, key), user)
+                if user is not None:
+                    found[key] = user
+        return found
+
+    def _fetch(self, param, batch):
+        signature = (param, tuple(sorted(batch)))
+        previous = self._batches.get(signature)
+        headers = {}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        if previous is not _ABSENT:
+            headers['If-None-Match'] = previous[0]
+
+        body = {param: batch}
+        if self.fields:
+            body['fields'] = list(self.fields)
+        with observe_upstream('user-service'), tracing.outbound('POST', self.url, headers) as headers:
+            response = self.session.post(self.url, json=body, headers=headers, timeout=self.timeout)
+            tracing.annotate({'http.status_code': response.status_code, 'lookup.size': len(batch)})
+        if response.status_code == 304 and previous is not _ABSENT:
+            users = previous[1]
+        else:
+            response.raise_for_status()
+            users = response.json()['users']
+        etag = response.headers.get('ETag')
+        if etag:
+            self._batches.set(signature, (etag, users))
+        return users
+
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = UserDirectoryClient(
+            settings.USER_SERVICE_URL,
+            token=settings.USER_SERVICE_TOKEN,
+            batch_size=settings.USER_LOOKUP_BATCH_SIZE,
+            ttl=settings.USER_LOOKUP_CACHE_TTL,
+            timeout=settings.USER_LOOKUP_TIMEOUT,
+        )
+        subscriber.register('users.customuser', _client.evict_user, _client.clear)
+    subscriber.start()
+    return _client
@@ -1,9 +1,127 @@
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils.decorators import method_decorator
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.viewsets import ModelViewSet
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+from .filters import RequisitionFilter
 from .models import Requisition
+from .pagination import ChangeFeedPagination
 from .serializers import RequisitionSerializer
+from .user_directory import get_client as get_user_directory
 
+# Columns the summary endpoint is allowed to group on.
+SUMMARY_GROUP_FIELDS = ('station_unit', 'firearm_type', 'status', 'rank', 'service_number')
+# Largest number of groups the summary returns; ``?limit=`` asks for fewer.
+SUMMARY_MAX_GROUPS = 1000
+
+# Status changes an admin may make, by current status.
+STATUS_TRANSITIONS = {
+    'pending': ('approved', 'rejected'),
+}
+
+
+# Writes emit outbox events, which must commit with the change.
+@method_decorator(transaction.atomic, name='create')
+@method_decorator(transaction.atomic, name='update')
+@method_decorator(transaction.atomic, name='destroy')
 class RequisitionViewSet(ModelViewSet):
-    queryset = Requisition.objects.all()
+    queryset = Requisition.objects.all().order_by('-created_at')
     serializer_class = RequisitionSerializer
     permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_class = RequisitionFilter
+    ordering_fields = ['created_at', 'updated_at', 'quantity', 'id']
+
+    def list(self, request, *args, **kwargs):
+        """
+        ``?expand=officer`` adds each requester's user-service record as
+        ``officer`` (null if unknown), fetched in one batch per page.
+        """
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get('expand') == 'officer':
+            rows = response.data['results'] if isinstance(response.data, dict) else response.data
+            officers = get_user_directory().by_service_numbers(
+                [row['service_number'] for row in rows]
+            )
+            for row in rows:
+                row['officer'] = officers.get(row['service_number'])
+        return response
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        Grouped counts and quantity sums, computed in the database.
+        Example: /api/requisitions/summary/?group_by=station_unit,status&created_after=2025-01-01T00:00:00Z
+        The largest ``limit`` groups are returned (at most SUMMARY_MAX_GROUPS);
+        ``truncated`` says whether there were more.
+        """
+        group_by = [
+            field.strip()
+            for field in request.query_params.get('group_by', 'station_unit').split(',')
+            if field.strip()
+        ]
+        invalid = [field for field in group_by if field not in SUMMARY_GROUP_FIELDS]
+        if invalid or not group_by:
+            return Response(
+                {'error': f"group_by must be one or more of: {', '.join(SUMMARY_GROUP_FIELDS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            limit = int(request.query_params.get('limit', SUMMARY_MAX_GROUPS))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= SUMMARY_MAX_GROUPS:
+            return Response(
+                {'error': f'limit must be between 1 and {SUMMARY_MAX_GROUPS}'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        totals = queryset.aggregate(count=Count('id'), total_quantity=Sum('quantity'))
+        groups = list(
+            queryset.values(*group_by)
+            .annotate(count=Count('id'), total_quantity=Sum('quantity'))
+            .order_by('-count', *group_by)[:limit + 1]
+        )
+        return Response({
+            'group_by': group_by,
+            'total': {
+                'count': totals['count'],
+                'total_quantity': totals['total_quantity'] or 0,
+            },
+            'groups': groups[:limit],
+            'truncated': len(groups) > limit,
+        })
+
+    @action(detail=False, methods=['get'], pagination_class=ChangeFeedPagination)
+    def changes(self, request):
+        """
+        Every requisition changed since ``updated_after``, oldest change
+        first, for incremental copies; see ``ChangeFeedPagination``.
+        """
+        page = self.paginate_queryset(Requisition.objects.all())
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
+    @transaction.atomic
+    def transition(self, request, pk=None):
+        """
+        Move a requisition to a new status, e.g. ``{"status": "approved"}``.
+        Only the changes in STATUS_TRANSITIONS are allowed.
+        """
+        requisition = self.get_object()
+        new_status = request.data.get('status')
+        allowed = STATUS_TRANSITIONS.get(requisition.status, ())
+        if new_status not in allowed:
+            return Response(
+                {'error': f"Cannot change status from {requisition.status!r} to {new_status!r}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        requisition.status = new_status
+        requisition.save(update_fields=['status', 'updated_at'])
+        return Response(self.get_serializer(requisition).data)
@@ -0,0 +1,128 @@
+"""
+Benchmark for database connection reuse.
+
+Drives GET /api/v1/users/directory/ (one session and one directory query
+per request) through Django's test client against a throwaway test
+database, once per connection mode:
+
+    per-request  DB_CONN_MAX_AGE=0: a new MySQL connection for every request
+    persistent   DB_CONN_MAX_AGE=60 with health checks (the default)
+    pool         DB_POOL=1: connections checked out of amms_common.dbpool
+
+Each mode runs in its own process, since the settings are read at start-up.
+``--concurrency`` sets the number of client threads, each standing in for a
+worker thread. Reports requests/sec, the connections opened, and, for the
+pool, the time spent waiting for a free connection.
+
+Usage (from user-service/, with the usual DB/Redis environment):
+    python benchmarks/db_connections.py
+    python benchmarks/db_connections.py --requests 5000 --concurrency 8 --pool-size 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+MODES = {
+    'per-request': {'DB_CONN_MAX_AGE': '0', 'DB_POOL': 'False'},
+    'persistent': {'DB_CONN_MAX_AGE': '60', 'DB_POOL': 'False'},
+    'pool': {'DB_POOL': 'True'},
+}
+
+
+def child(requests, concurrency):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'user_service.settings')
+
+    import django
+
+    django.setup()
+
+    from django.contrib.auth import get_user_model
+    from django.db import close_old_connections, connection, connections
+    from django.test import Client
+    from django.test.utils import override_settings, setup_test_environment
+
+    from amms_common import dbpool
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, serialize=False)
+    try:
+        User = get_user_model()
+        admin = User.objects.create_user(
+            'bench-admin', 'bench-admin@example.com', 'x', service_number='BENCH-ADMIN',
+            rank='Inspector', is_staff=True,
+        )
+        User.objects.bulk_create([
+            User(username=f'bench-{index}', email=f'bench-{index}@example.com',
+                 service_number=f'BENCH-{index:05d}', rank='Constable', last_name=str(index))
+            for index in range(200)
+        ])
+        connection.close()
+        opened_before = sum(dbpool.stats()['connections_opened'].values())
+
+        def worker(count):
+            client = Client()
+            client.force_login(admin)
+            for _ in range(count):
+                # The test client leaves out the request_started/finished
+                # connection handling of a real server, so do it here.
+                close_old_connections()
+                response = client.get('/api/v1/users/directory/', {'page_size': 20})
+                close_old_connections()
+                assert response.status_code == 200, response.content
+            connections.close_all()
+
+        with override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_CLASSES': []}):
+            threads = [
+                threading.Thread(target=worker, args=(requests // concurrency,))
+                for _ in range(concurrency)
+            ]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            seconds = time.perf_counter() - started
+
+        stats = dbpool.stats()
+        pools = list(stats['pools'].values())
+        print(json.dumps({
+            'rate': requests // concurrency * concurrency / seconds,
+            'opened': sum(stats['connections_opened'].values()) - opened_before,
+            'wait_ms': pools[0]['wait_seconds'] * 1000 if pools else None,
+        }))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.requests, args.concurrency)
+        return
+
+    print(f"{'mode':<12} {'threads':>7} {'requests/s':>11} {'connections':>12} {'pool wait ms':>13}")
+    for mode in args.modes:
+        env = {**os.environ, **MODES[mode], 'DB_POOL_MAX_SIZE': str(args.pool_size)}
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child',
+             '--requests', str(args.requests), '--concurrency', str(args.concurrency)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        wait = '-' if result['wait_ms'] is None else f"{result['wait_ms']:.1f}"
+        print(f"{mode:<12} {args.concurrency:>7} {result['rate']:>11.1f} {result['opened']:>12} {wait:>13}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark for the login path.
+
+Creates a throwaway test database, seeds users whose passwords are hashed
+with the configured profile, then drives POST /api/v1/auth/login/ through
+Django's test client in a single process, i.e. one worker. Reports
+logins/sec and database queries per login for each hasher profile
+requested. Multiply by the gunicorn worker count for a rough service-wide
+ceiling at shift-start peaks.
+
+Usage (from user-service/, with the usual DB/Redis environment):
+    python benchmarks/login_throughput.py
+    python benchmarks/login_throughput.py --profiles strong balanced --logins 200 --users 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'user_service.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+
+from users.hashers import PROFILES  # noqa: E402
+from users.keys import generate_key, key_ring  # noqa: E402
+
+PASSWORD = 'Shift-start-2025!'
+
+
+def seed(users):
+    User = get_user_model()
+    User.objects.filter(username__startswith='bench-').delete()
+    for index in range(users):
+        User.objects.create_user(
+            f'bench-{index}', f'bench-{index}@example.com', PASSWORD,
+            service_number=f'BENCH-{index:05d}', rank='Constable',
+            first_name='Bench', last_name=str(index),
+        )
+
+
+def run(logins, users):
+    client = Client()
+    # Warm-up: first logins may rehash passwords seeded under another profile.
+    for index in range(users):
+        client.post('/api/v1/auth/login/', {'username': f'bench-{index}', 'password': PASSWORD},
+                    content_type='application/json')
+
+    queries = 0
+    started = time.perf_counter()
+    for attempt in range(logins):
+        with CaptureQueriesContext(connection) as captured:
+            response = client.post(
+                '/api/v1/auth/login/',
+                {'username': f'bench-{attempt % users}', 'password': PASSWORD},
+                content_type='application/json',
+            )
+        assert response.status_code == 200, response.content
+        queries += len(captured.captured_queries)
+    seconds = time.perf_counter() - started
+    return logins / seconds, queries / logins
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument('--logins', type=int, default=100)
+    parser.add_argument('--users', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, serialize=False)
+    keys_dir = tempfile.TemporaryDirectory()
+    generate_key(keys_dir.name)
+    try:
+        print(f"{'profile':<10} {'iterations':>10} {'logins/s':>10} {'queries/login':>14}")
+        for profile in args.profiles:
+            # No throttling here: the benchmark measures the login path itself.
+            with override_settings(PASSWORD_HASHER_PROFILE=profile, PASSWORD_HASHER_ITERATIONS=0,
+                                   REST_FRAMEWORK={'DEFAULT_THROTTLE_CLASSES': []},
+                                   JWT_KEYS_DIR=keys_dir.name):
+                key_ring.reload()
+                seed(args.users)
+                rate, queries = run(args.logins, args.users)
+            print(f"{profile:<10} {PROFILES[profile]:>10,} {rate:>10.1f} {queries:>14.1f}")
+    finally:
+        keys_dir.cleanup()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
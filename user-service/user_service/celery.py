@@ -1,8 +1,12 @@
 import os
 from celery import Celery
 
+from amms_common import metrics, tracing
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'user_service.settings')
 
 app = Celery('user_service')
 app.config_from_object('django.conf:settings', namespace='CELERY')
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+metrics.instrument_celery()
+tracing.instrument_celery()
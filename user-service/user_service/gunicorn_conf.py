@@ -0,0 +1,22 @@
+"""
+gunicorn settings: ``gunicorn --config python:user_service.gunicorn_conf ...``.
+
+Keeps PROMETHEUS_MULTIPROC_DIR (see ``amms_common.metrics``) to the files
+of live workers.
+"""
+import os
+import shutil
+
+
+def on_starting(server):
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
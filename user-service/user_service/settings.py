@@ -3,6 +3,7 @@ from pathlib import Path
 from decouple import config, Csv
 import os
 from datetime import timedelta
+from celery.schedules import crontab
 
 # ========================
 # PATHS
@@ -55,6 +56,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "amms_common.metrics.MetricsMiddleware",  # first, so it times the whole stack
+    "amms_common.profiling.ProfilingMiddleware",  # off unless PROFILING_ENABLED
+    "amms_common.tracing.TracingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -63,6 +67,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "amms_common.tracing.ViewTracingMiddleware",  # last, so it spans just the view
 ]
 
 ROOT_URLCONF = "user_service.urls"
@@ -97,9 +102,26 @@ DATABASES = {
         "PASSWORD": os.getenv("DJANGO_DB_PASSWORD"),
         "HOST": os.getenv("DJANGO_DB_HOST", "user-db"),
         "PORT": os.getenv("DJANGO_DB_PORT", "3306"),
+        "CONN_MAX_AGE": config("DB_CONN_MAX_AGE", default=60, cast=int),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Connection pool for ASGI/async workers (amms_common.dbpool). Replaces the
+# persistent per-thread connection above; MySQL only.
+DB_POOL = config("DB_POOL", default=False, cast=bool)
+if DB_POOL:
+    DATABASES["default"].update({
+        "ENGINE": "amms_common.dbpool",
+        "CONN_MAX_AGE": 0,
+    })
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = {
+        "max_size": config("DB_POOL_MAX_SIZE", default=10, cast=int),
+        "timeout": config("DB_POOL_TIMEOUT", default=10, cast=float),  # seconds to wait for a free connection
+        "max_lifetime": config("DB_POOL_MAX_LIFETIME", default=1800, cast=int),
+        "check_after": config("DB_POOL_CHECK_AFTER", default=30, cast=int),  # idle seconds before a ping
+    }
+
 # ========================
 # AUTHENTICATION
 # ========================
@@ -112,6 +134,18 @@ AUTH_PASSWORD_VALIDATORS = [
 
 AUTH_USER_MODEL = "users.CustomUser"
 
+# PBKDF2 work factor: a named profile from users.hashers.PROFILES, or an explicit
+# iteration count. Passwords are rehashed transparently at their next login.
+PASSWORD_HASHER_PROFILE = config("PASSWORD_HASHER_PROFILE", default="strong")
+PASSWORD_HASHER_ITERATIONS = config("PASSWORD_HASHER_ITERATIONS", default=0, cast=int)
+PASSWORD_HASHERS = [
+    "users.hashers.ProfiledPBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
 # ========================
 # I18N / L10N
 # ========================
@@ -145,6 +179,23 @@ CELERY_RESULT_EXPIRES = 3600
 CELERY_WORKER_PREFETCH_MULTIPLIER = 4
 CELERY_WORKER_MAX_TASKS_PER_CHILD = 1000
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+CELERY_BEAT_SCHEDULE = {
+    "prune-expired-tokens": {
+        "task": "users.tasks.prune_expired_tokens",
+        "schedule": crontab(minute=30, hour=3),  # Daily at 03:30
+    },
+    "rebuild-token-blacklist-filter": {
+        "task": "users.tasks.rebuild_token_blacklist_filter",
+        "schedule": crontab(minute="*/5"),  # Every 5 minutes
+    },
+    "rotate-jwt-keys": {
+        "task": "users.tasks.rotate_jwt_keys",
+        "schedule": crontab(minute=0, hour=4, day_of_month=1),  # Monthly
+    },
+}
+
+# Prometheus metrics of Celery workers (amms_common.metrics)
+WORKER_METRICS_PORT = config("WORKER_METRICS_PORT", default=9808, cast=int)
 
 # ========================
 # DRF
@@ -152,7 +203,7 @@ CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.SessionAuthentication",
-        "rest_framework_simplejwt.authentication.JWTAuthentication",  # ✅ JWT
+        "users.authentication.CachedJWTAuthentication",  # ✅ JWT, cached user principal
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
@@ -173,6 +224,7 @@ REST_FRAMEWORK = {
     "DEFAULT_THROTTLE_RATES": {
         "anon": "100/hour",
         "user": "1000/hour",
+        "user_lookup": "20000/hour",  # service-to-service enrichment batches
     },
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
@@ -188,8 +240,24 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": False,
     "BLACKLIST_AFTER_ROTATION": True,
     "AUTH_HEADER_TYPES": ("Bearer",),
+    "TOKEN_REFRESH_SERIALIZER": "users.serializers.FilteredTokenRefreshSerializer",
+    # Keys come from the key ring in users.keys, published at /.well-known/jwks.json.
+    "ALGORITHM": "RS256",
+    "AUTH_TOKEN_CLASSES": ("users.tokens.SignedAccessToken",),
 }
 
+# JWT signing keys (users.keys)
+JWT_KEYS_DIR = config("JWT_KEYS_DIR", default=str(BASE_DIR / "jwt-keys"))
+JWT_ACTIVE_KID = config("JWT_ACTIVE_KID", default="")
+JWT_KEY_ACTIVATION_DELAY = config("JWT_KEY_ACTIVATION_DELAY", default=900, cast=int)
+JWT_KEYS_RELOAD_INTERVAL = config("JWT_KEYS_RELOAD_INTERVAL", default=60, cast=int)
+
+# Bloom filter in front of the refresh-token blacklist (users.blacklist)
+JWT_BLACKLIST_BLOOM_REDIS_URL = config("JWT_BLACKLIST_BLOOM_REDIS_URL", default="redis://redis:6379/1")
+JWT_BLACKLIST_BLOOM_CAPACITY = config("JWT_BLACKLIST_BLOOM_CAPACITY", default=1_000_000, cast=int)
+JWT_BLACKLIST_BLOOM_ERROR_RATE = config("JWT_BLACKLIST_BLOOM_ERROR_RATE", default=0.001, cast=float)
+JWT_BLACKLIST_BLOOM_LOG_SIZE = config("JWT_BLACKLIST_BLOOM_LOG_SIZE", default=1000, cast=int)
+
 
 # ========================
 # CORS
@@ -226,7 +294,7 @@ CORS_ALLOW_METHODS = ["DELETE", "GET", "OPTIONS", "PATCH", "POST", "PUT"]
 # ========================
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "BACKEND": "amms_common.tracing.TracedRedisCache",
         "LOCATION": config("REDIS_URL", default="redis://redis:6379/1"),
         "OPTIONS": {},
         "KEY_PREFIX": "user_service",
@@ -234,6 +302,22 @@ CACHES = {
     }
 }
 
+# Cross-service cache invalidation over Redis pub/sub (amms_common.invalidation)
+CACHE_INVALIDATION_REDIS_URL = config("CACHE_INVALIDATION_REDIS_URL", default="redis://redis:6379/0")
+CACHE_INVALIDATION_CHANNEL_PREFIX = config("CACHE_INVALIDATION_CHANNEL_PREFIX", default="amms:invalidate:")
+
+# Cached JWT user principals (users.principal)
+# Evicted on change (amms_common.invalidation), so the timeout can be long.
+USER_PRINCIPAL_CACHE_TIMEOUT = config("USER_PRINCIPAL_CACHE_TIMEOUT", default=3600, cast=int)
+USER_PRINCIPAL_LOCAL_CACHE_SIZE = config("USER_PRINCIPAL_LOCAL_CACHE_SIZE", default=1024, cast=int)
+
+# Batch user lookup (users.views.UserLookupView)
+USER_LOOKUP_MAX_KEYS = config("USER_LOOKUP_MAX_KEYS", default=5000, cast=int)
+
+# Bulk registration approval (users.approvals). 0 hashing workers = one per CPU.
+REGISTRATION_APPROVAL_CHUNK_SIZE = config("REGISTRATION_APPROVAL_CHUNK_SIZE", default=200, cast=int)
+REGISTRATION_APPROVAL_HASH_WORKERS = config("REGISTRATION_APPROVAL_HASH_WORKERS", default=0, cast=int)
+
 # ========================
 # SESSION
 # ========================
@@ -253,3 +337,34 @@ if not DEBUG:
     EMAIL_HOST_USER = config("EMAIL_HOST_USER", default="")
     EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD", default="")
     DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL", default="noreply@userservice.com")
+
+# Domain events: transactional outbox relayed to Redis Streams (amms_common.outbox)
+EVENT_SOURCE = "users"
+EVENT_OUTBOX_MODEL = "users.OutboxEvent"
+EVENT_BUS_REDIS_URL = config("EVENT_BUS_REDIS_URL", default="redis://redis:6379/4")
+EVENT_STREAM_PREFIX = config("EVENT_STREAM_PREFIX", default="amms:events:")
+EVENT_STREAM_MAXLEN = config("EVENT_STREAM_MAXLEN", default=100_000, cast=int)
+EVENT_RELAY_BATCH_SIZE = config("EVENT_RELAY_BATCH_SIZE", default=500, cast=int)
+EVENT_RELAY_POLL_INTERVAL = config("EVENT_RELAY_POLL_INTERVAL", default=0.5, cast=float)
+EVENT_OUTBOX_RETENTION_HOURS = config("EVENT_OUTBOX_RETENTION_HOURS", default=72, cast=int)
+
+# Tracing (see amms_common.tracing)
+TRACE_SERVICE_NAME = config("TRACE_SERVICE_NAME", default="user-service")
+TRACE_SAMPLE_RATE = config("TRACE_SAMPLE_RATE", default=0.1, cast=float)  # share of new traces recorded
+TRACE_EXPORTER = config("TRACE_EXPORTER", default="otlp")  # otlp, file or none
+TRACE_OTLP_ENDPOINT = config("TRACE_OTLP_ENDPOINT", default="http://jaeger:4318/v1/traces")
+TRACE_FILE = config("TRACE_FILE", default=str(BASE_DIR / "traces.jsonl"))
+TRACE_EXPORT_INTERVAL = config("TRACE_EXPORT_INTERVAL", default=1, cast=float)  # seconds
+TRACE_QUEUE_SIZE = config("TRACE_QUEUE_SIZE", default=10000, cast=int)  # spans buffered per process
+
+# Tests run without span export; --update-baselines records perf baselines (amms_common.testing)
+TEST_RUNNER = "amms_common.testing.TestRunner"
+
+# Request profiling (see amms_common.profiling)
+PROFILING_ENABLED = config("PROFILING_ENABLED", default=False, cast=bool)
+PROFILING_SAMPLE_RATE = config("PROFILING_SAMPLE_RATE", default=0.01, cast=float)  # share of requests kept
+PROFILING_SLOW_MS = config("PROFILING_SLOW_MS", default=1000, cast=float)  # always keep slower requests
+PROFILING_INTERVAL_MS = config("PROFILING_INTERVAL_MS", default=5, cast=float)  # between stack samples
+PROFILING_DIR = config("PROFILING_DIR", default=str(BASE_DIR / "profiles"))
+PROFILING_MAX_PROFILES = config("PROFILING_MAX_PROFILES", default=200, cast=int)  # kept on disk
+PROFILING_MAX_QUERIES = config("PROFILING_MAX_QUERIES", default=500, cast=int)  # listed per profile
@@ -3,11 +3,15 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from users.views import ApiRoot
+from users.views import ApiRoot, JWKSView
+from amms_common import dbpool, metrics, profiling
 
 urlpatterns = [
     path('admin/', admin.site.urls),
 
+    # Token verification keys, at the conventional location
+    path('.well-known/jwks.json', JWKSView.as_view(), name='well-known-jwks'),
+
     # API root
     path('api/', ApiRoot.as_view(), name='api-root'),
 
@@ -16,6 +20,15 @@ urlpatterns = [
 
     # DRF browsable API login
     path('api-auth/', include('rest_framework.urls')),
+
+    # Connection reuse metrics for this worker
+    path('metrics/db/', dbpool.metrics_view),
+    path('metrics', metrics.metrics_view),
+
+    # Request profiles (admin only)
+    path('profiles/', profiling.profile_list),
+    path('profiles/<slug:profile_id>/', profiling.profile_detail),
+    path('profiles/<slug:profile_id>/collapsed/', profiling.profile_collapsed),
 ]
 
 if settings.DEBUG:
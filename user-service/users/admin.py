@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth import get_user_model
-from .models import Registration, CustomUser
+from django.db import transaction
+from . import approvals
+from .models import Registration, RegistrationApprovalJob, CustomUser
+from .tasks import run_registration_approval_job
 
 User = get_user_model()
 
@@ -86,44 +89,24 @@ class RegistrationAdmin(admin.ModelAdmin):
         """
         Mask the password field in the admin panel.
         """
-        return "********" if obj.password else "(no password set)"
+        return "********" if obj.password_raw else "(no password set)"
     display_password.short_description = "Password"
 
     def approve_registrations(self, request, queryset):
         """
-        Approve selected registrations and create corresponding users.
+        Queue a background job that approves the selected registrations
+        and creates the corresponding users.
         """
-        count = 0
-        for registration in queryset.filter(is_approved=False):
-            try:
-                user_data = {
-                    'username': registration.username,
-                    'email': registration.email,
-                    'first_name': registration.first_name,
-                    'last_name': registration.last_name,
-                    'service_number': registration.service_number,
-                    'rank': registration.rank,
-                }
-
-                # Create user with hashed password (already stored in registration.password)
-                user = User.objects.create_user(
-                    password=registration.password,
-                    **user_data
-                )
-
-                registration.is_approved = True
-                registration.save()
-                count += 1
-
-            except Exception as e:
-                self.message_user(
-                    request,
-                    f"Failed to approve {registration.username}: {str(e)}",
-                    level='ERROR'
-                )
-
-        if count > 0:
-            self.message_user(request, f"Successfully approved {count} registrations.")
+        ids = list(queryset.filter(is_approved=False).order_by('pk').values_list('pk', flat=True))
+        if not ids:
+            self.message_user(request, "No pending registrations selected.", level='WARNING')
+            return
+        job = approvals.submit(ids, requested_by=request.user)
+        transaction.on_commit(lambda: run_registration_approval_job.delay(str(job.id)))
+        self.message_user(
+            request,
+            f"Approving {len(ids)} registrations in the background (job {job.id}).",
+        )
 
     approve_registrations.short_description = "Approve selected registrations"
 
@@ -135,4 +118,23 @@ class RegistrationAdmin(admin.ModelAdmin):
         queryset.filter(is_approved=False).delete()
         self.message_user(request, f"Successfully rejected {count} registrations.")
 
-    reject_registrations.short_description = "Reject selected registrations"
\ No newline at end of file
+    reject_registrations.short_description = "Reject selected registrations"
+
+
+@admin.register(RegistrationApprovalJob)
+class RegistrationApprovalJobAdmin(admin.ModelAdmin):
+    """
+    Read-only view of bulk registration approval jobs
+    """
+    list_display = (
+        'id', 'status', 'total', 'processed', 'approved_count',
+        'skipped_count', 'failed_count', 'requested_by', 'created_at', 'finished_at'
+    )
+    list_filter = ('status', 'created_at')
+    ordering = ('-created_at',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
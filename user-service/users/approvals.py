@@ -0,0 +1,207 @@
+"""
+Bulk registration approval.
+
+Approving a registration means hashing its password and creating the user,
+and hashing dominates: each PBKDF2 hash takes a sizeable fraction of a
+second at the configured profile. Bulk approvals therefore run in a Celery
+job that works through the registrations in chunks. For each chunk it:
+
+* loads the registrations and the users that would clash with them, in one
+  query each;
+* hashes the passwords on a pool of hashing threads (``hashlib`` releases
+  the GIL while it runs PBKDF2, so the threads hash in parallel);
+* creates the users with one ``bulk_create`` and marks the registrations
+  approved with one ``bulk_update``, in the same transaction that records
+  the chunk's results and progress on the job.
+
+A redelivered job resumes after the last committed chunk. Rows that fail
+are reported per registration and do not stop the rest of the job.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from amms_common.invalidation import publish_on_commit
+from amms_common.outbox import emit_many
+
+from .models import Registration, RegistrationApprovalJob
+from .serializers import UserSerializer
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+_UNIQUE_FIELDS = ('username', 'email', 'service_number')
+
+
+def submit(registration_ids, requested_by=None):
+    """Create a pending job for ``registration_ids`` (duplicates dropped)."""
+    registration_ids = list(dict.fromkeys(registration_ids))
+    return RegistrationApprovalJob.objects.create(
+        registration_ids=registration_ids,
+        total=len(registration_ids),
+        requested_by=requested_by,
+    )
+
+
+def _hash_workers():
+    return settings.REGISTRATION_APPROVAL_HASH_WORKERS or os.cpu_count() or 1
+
+
+def _result(registration_id, status, **extra):
+    return {'registration_id': registration_id, 'status': status, **extra}
+
+
+def _user_value(registration, field):
+    """``registration``'s ``field`` as the new user would store it."""
+    value = getattr(registration, field)
+    return User.objects.normalize_email(value) if field == 'email' else value
+
+
+def _clashes(registrations):
+    """
+    ``{registration id: error}`` for registrations that clash with an
+    existing user or with an earlier registration in ``registrations``.
+    """
+    lookup = Q()
+    for field in _UNIQUE_FIELDS:
+        lookup |= Q(**{f'{field}__in': [_user_value(r, field) for r in registrations]})
+    taken = {field: set() for field in _UNIQUE_FIELDS}
+    for row in User.objects.filter(lookup).values_list(*_UNIQUE_FIELDS):
+        for field, value in zip(_UNIQUE_FIELDS, row):
+            taken[field].add(value)
+
+    clashes = {}
+    claimed = {field: set() for field in _UNIQUE_FIELDS}
+    for registration in registrations:
+        fields = [field for field in _UNIQUE_FIELDS if _user_value(registration, field) in taken[field]]
+        if fields:
+            clashes[registration.pk] = f"A user with this {', '.join(fields)} already exists"
+            continue
+        fields = [field for field in _UNIQUE_FIELDS if _user_value(registration, field) in claimed[field]]
+        if fields:
+            clashes[registration.pk] = f"An earlier registration in this job has this {', '.join(fields)}"
+            continue
+        for field in _UNIQUE_FIELDS:
+            claimed[field].add(_user_value(registration, field))
+    return clashes
+
+
+def _new_user(registration, password):
+    return User(
+        username=registration.username,
+        email=User.objects.normalize_email(registration.email),
+        first_name=registration.first_name,
+        last_name=registration.last_name,
+        service_number=registration.service_number,
+        rank=registration.rank,
+        password=password,
+    )
+
+
+def _create_users(registrations, users):
+    """
+    Insert ``users``, one per registration in ``registrations``;
+    ``{registration id: error}`` for any that could not be.
+    """
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+        return {}
+    except IntegrityError:
+        # Someone else created a clashing user since the clash check; find
+        # out which rows are affected, one savepoint each.
+        pass
+    errors = {}
+    for registration, user in zip(registrations, users):
+        try:
+            with transaction.atomic():
+                user.save(force_insert=True)
+        except IntegrityError as exc:
+            errors[registration.pk] = str(exc)
+    return errors
+
+
+def _approve_chunk(registration_ids, executor):
+    registrations = Registration.objects.in_bulk(registration_ids)
+    pending = [
+        registrations[registration_id] for registration_id in registration_ids
+        if registration_id in registrations and not registrations[registration_id].is_approved
+    ]
+    clashes = _clashes(pending) if pending else {}
+    approvable = [registration for registration in pending if registration.pk not in clashes]
+
+    passwords = executor.map(make_password, [registration.password_raw for registration in approvable])
+    users = [_new_user(registration, password) for registration, password in zip(approvable, passwords)]
+
+    errors = _create_users(approvable, users) if users else {}
+    created = [registration for registration in approvable if registration.pk not in errors]
+    created_users = User.objects.filter(username__in=[registration.username for registration in created])
+    user_ids = {user.username: user.pk for user in created_users}
+    # bulk_create and bulk_update send no signals, so the events and cache
+    # invalidations go out here.
+    emit_many(('users', 'user.changed', user.pk, UserSerializer(user).data) for user in created_users)
+    now = timezone.now()
+    for registration in created:
+        registration.is_approved = True
+        registration.updated_at = now  # bulk_update skips auto_now
+    Registration.objects.bulk_update(created, ['is_approved', 'updated_at'])
+    publish_on_commit([*created_users, *created])
+
+    results = []
+    for registration_id in registration_ids:
+        registration = registrations.get(registration_id)
+        if registration is None:
+            results.append(_result(registration_id, 'skipped', reason='Registration not found'))
+        elif registration.pk in clashes:
+            results.append(_result(registration_id, 'failed', username=registration.username,
+                                   error=clashes[registration.pk]))
+        elif registration.pk in errors:
+            results.append(_result(registration_id, 'failed', username=registration.username,
+                                   error=errors[registration.pk]))
+        elif registration.username in user_ids:
+            results.append(_result(registration_id, 'approved', username=registration.username,
+                                   user_id=user_ids[registration.username]))
+        else:
+            results.append(_result(registration_id, 'skipped', username=registration.username,
+                                   reason='Already approved'))
+    return results
+
+
+def run(job):
+    """Approve ``job``'s registrations, resuming after its last committed chunk."""
+    job.status = 'running'
+    job.save(update_fields=['status'])
+    chunk_size = settings.REGISTRATION_APPROVAL_CHUNK_SIZE
+    try:
+        with ThreadPoolExecutor(max_workers=_hash_workers()) as executor:
+            for start in range(job.processed, job.total, chunk_size):
+                chunk = job.registration_ids[start:start + chunk_size]
+                with transaction.atomic():
+                    results = _approve_chunk(chunk, executor)
+                    job.results.extend(results)
+                    job.processed = start + len(chunk)
+                    for status in ('approved', 'skipped', 'failed'):
+                        count = sum(1 for result in results if result['status'] == status)
+                        setattr(job, f'{status}_count', getattr(job, f'{status}_count') + count)
+                    job.save(update_fields=[
+                        'results', 'processed', 'approved_count', 'skipped_count', 'failed_count',
+                    ])
+    except Exception as exc:
+        logger.exception("Registration approval job %s failed", job.pk)
+        job.status = 'failed'
+        job.error = str(exc)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        raise
+
+    job.status = 'done'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at'])
+    return job
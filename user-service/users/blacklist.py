@@ -0,0 +1,179 @@
+"""
+Bloom filter in front of the refresh-token blacklist.
+
+Blacklisted JTIs are added to a Bloom filter kept in Redis as a bitmap, and
+every change is recorded in a short log under a sequence number. Each
+process mirrors the bitmap in memory. Before answering, it compares its
+sequence with Redis (one GET) and replays only the log entries it has
+missed, or reloads the whole bitmap if it fell too far behind. A negative
+answer is definite, so the DB is only consulted for tokens that may be
+blacklisted. False positives fall through to the normal table lookup.
+
+Bloom filters cannot forget, so ``rebuild()`` recomputes the bitmap from
+the table after expired tokens have been pruned, on a short beat interval
+to repair any add lost to a Redis error, and whenever Redis has lost the
+filter. If Redis is unavailable, every check goes to the database.
+"""
+import hashlib
+import logging
+import math
+import threading
+
+import redis
+from django.conf import settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+logger = logging.getLogger(__name__)
+
+_BITS = 'jwt-blacklist-bloom:bits'
+_SEQUENCE = 'jwt-blacklist-bloom:seq'
+_LOG = 'jwt-blacklist-bloom:log'
+
+
+def sizing(capacity, error_rate):
+    """Bit count and hash count for ``capacity`` items at ``error_rate``."""
+    bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+    bits = math.ceil(bits / 8) * 8
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+class BloomFilter:
+    def __init__(self, client, capacity, error_rate, log_size):
+        self.client = client
+        self.bits, self.hashes = sizing(capacity, error_rate)
+        self.log_size = log_size
+        self._local = None
+        self._sequence = None
+        self._lock = threading.Lock()
+
+    def positions(self, jti):
+        digest = hashlib.blake2b(jti.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:], 'big') | 1
+        return [(first + index * second) % self.bits for index in range(self.hashes)]
+
+    @staticmethod
+    def _set_local(bitmap, positions):
+        # Redis bit offsets count from the most significant bit of each byte.
+        for position in positions:
+            bitmap[position >> 3] |= 0x80 >> (position & 7)
+
+    @staticmethod
+    def _test_local(bitmap, positions):
+        return all(bitmap[position >> 3] & (0x80 >> (position & 7)) for position in positions)
+
+    def add(self, jti):
+        if not self.client.exists(_SEQUENCE):
+            # Without the rest of the filter a lone bit set would read as
+            # complete; rebuilding picks this (already committed) token up.
+            self.rebuild()
+            return
+        pipe = self.client.pipeline(transaction=True)
+        for position in self.positions(jti):
+            pipe.setbit(_BITS, position, 1)
+        pipe.rpush(_LOG, jti)
+        pipe.ltrim(_LOG, -self.log_size, -1)
+        pipe.incr(_SEQUENCE)
+        pipe.execute()
+
+    def _reload(self):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.get(_SEQUENCE)
+        pipe.get(_BITS)
+        sequence, raw = pipe.execute()
+        if sequence is None:
+            # First use, or Redis lost the filter: rebuild it from the table.
+            self.rebuild()
+            return self._reload()
+        bitmap = bytearray(self.bits // 8)
+        raw = raw or b''
+        bitmap[:len(raw)] = raw[:len(bitmap)]
+        self._local, self._sequence = bitmap, int(sequence or 0)
+
+    def _refresh(self):
+        sequence = self.client.get(_SEQUENCE)
+        if self._local is None or sequence is None or int(sequence) < self._sequence:
+            self._reload()
+            return
+        if int(sequence) == self._sequence:
+            return
+
+        pipe = self.client.pipeline(transaction=True)
+        pipe.get(_SEQUENCE)
+        pipe.lrange(_LOG, -self.log_size, -1)
+        sequence, log = pipe.execute()
+        missed = int(sequence or 0) - self._sequence
+        if missed < 0 or missed > len(log):
+            self._reload()
+            return
+        for jti in log[len(log) - missed:]:
+            self._set_local(self._local, self.positions(jti.decode()))
+        self._sequence = int(sequence)
+
+    def might_contain(self, jti):
+        with self._lock:
+            self._refresh()
+            return self._test_local(self._local, self.positions(jti))
+
+    def rebuild(self, attempts=3):
+        """
+        Recompute the bitmap from the non-expired blacklisted tokens. Retried
+        if a token is blacklisted while the table is being scanned.
+        """
+        for _ in range(attempts):
+            with self.client.pipeline(transaction=True) as pipe:
+                try:
+                    pipe.watch(_SEQUENCE)
+                    bitmap = bytearray(self.bits // 8)
+                    jtis = (
+                        BlacklistedToken.objects
+                        .filter(token__expires_at__gt=aware_utcnow())
+                        .values_list('token__jti', flat=True)
+                    )
+                    count = 0
+                    for jti in jtis.iterator(chunk_size=10000):
+                        self._set_local(bitmap, self.positions(jti))
+                        count += 1
+
+                    pipe.multi()
+                    pipe.set(_BITS, bytes(bitmap))
+                    pipe.delete(_LOG)  # processes that are behind reload the full bitmap
+                    pipe.incr(_SEQUENCE)
+                    pipe.execute()
+                    return count
+                except redis.WatchError:
+                    continue
+        raise redis.RedisError("Token blacklist filter kept changing during rebuild")
+
+
+_filter = None
+
+
+def get_filter():
+    global _filter
+    if _filter is None:
+        _filter = BloomFilter(
+            redis.Redis.from_url(settings.JWT_BLACKLIST_BLOOM_REDIS_URL),
+            capacity=settings.JWT_BLACKLIST_BLOOM_CAPACITY,
+            error_rate=settings.JWT_BLACKLIST_BLOOM_ERROR_RATE,
+            log_size=settings.JWT_BLACKLIST_BLOOM_LOG_SIZE,
+        )
+    return _filter
+
+
+def might_be_blacklisted(jti):
+    """False only when ``jti`` is certainly not blacklisted."""
+    try:
+        return get_filter().might_contain(jti)
+    except redis.RedisError as exc:
+        logger.warning("Token blacklist filter unavailable, checking the database: %s", exc)
+        return True
+
+
+def record(jti):
+    try:
+        get_filter().add(jti)
+    except redis.RedisError as exc:
+        logger.warning("Adding %s to the token blacklist filter failed: %s", jti, exc)
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.exceptions import ImproperlyConfigured
+
+# PBKDF2-SHA256 iteration counts per PASSWORD_HASHER_PROFILE.
+PROFILES = {
+    'strong': 1_000_000,   # Django 5.2's default
+    'balanced': 600_000,   # OWASP's minimum recommendation for PBKDF2-HMAC-SHA256
+}
+
+
+class ProfiledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 whose work factor comes from settings: a named
+    PASSWORD_HASHER_PROFILE, or PASSWORD_HASHER_ITERATIONS when set. It keeps
+    the ``pbkdf2_sha256`` algorithm name, so existing hashes still verify, and
+    Django rehashes a password at its next successful login whenever the
+    stored iteration count differs from the configured one.
+    """
+
+    @property
+    def iterations(self):
+        if settings.PASSWORD_HASHER_ITERATIONS:
+            return settings.PASSWORD_HASHER_ITERATIONS
+        try:
+            return PROFILES[settings.PASSWORD_HASHER_PROFILE]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f"PASSWORD_HASHER_PROFILE must be one of: {', '.join(PROFILES)}"
+            )
@@ -0,0 +1,198 @@
+"""
+Asymmetric signing keys for the tokens user-service issues.
+
+Private keys are PEM files in JWT_KEYS_DIR named ``<kid>.pem``. Every key in
+the directory is published as a JWK at ``/.well-known/jwks.json``, and
+tokens carry the ``kid`` of the key that signed them, so other services
+verify tokens offline against the published public keys and no secret is
+shared.
+
+Rotation is ``manage.py rotate_jwt_keys`` (also run on a monthly beat). It
+writes a new key, which is published at once but only used for signing
+JWT_KEY_ACTIVATION_DELAY later. By then verifiers have refreshed their
+copy of the JWKS. It also deletes keys that stopped signing longer ago than
+the refresh-token lifetime, since no valid token can still name them.
+JWT_ACTIVE_KID pins the signing key instead, e.g. to roll back.
+
+Each process rescans the directory at most every JWT_KEYS_RELOAD_INTERVAL
+seconds, so new keys are picked up without a restart.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+
+KID_FORMAT = '%Y%m%dT%H%M%SZ'
+
+
+class SigningKey:
+    def __init__(self, kid, private_key, created_at):
+        self.kid = kid
+        self.private_key = private_key
+        self.public_key = private_key.public_key()
+        self.created_at = created_at
+
+    def jwk(self):
+        jwk = RSAAlgorithm.to_jwk(self.public_key, as_dict=True)
+        return {**jwk, 'kid': self.kid, 'alg': api_settings.ALGORITHM, 'use': 'sig'}
+
+
+def _created_at(path):
+    try:
+        return datetime.strptime(path.stem, KID_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return path.stat().st_mtime
+
+
+def load_keys(directory):
+    """Keys in ``directory``, oldest first."""
+    keys = []
+    for path in Path(directory).glob('*.pem'):
+        private_key = serialization.load_pem_private_key(path.read_bytes(), password=None)
+        keys.append(SigningKey(path.stem, private_key, _created_at(path)))
+    return sorted(keys, key=lambda key: (key.created_at, key.kid))
+
+
+def generate_key(directory, now=None):
+    """Write a new 2048-bit RSA key to ``directory`` and return its kid."""
+    now = now or time.time()
+    kid = datetime.fromtimestamp(now, timezone.utc).strftime(KID_FORMAT)
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'{kid}.pem'
+    path.touch(mode=0o600, exist_ok=False)
+    path.write_bytes(pem)
+    return kid
+
+
+def activation_time(key):
+    return key.created_at + settings.JWT_KEY_ACTIVATION_DELAY
+
+
+def active_key(keys, now=None):
+    """The key to sign with: JWT_ACTIVE_KID, else the newest activated key."""
+    if not keys:
+        raise TokenBackendError(_("No JWT signing key is configured"))
+    if settings.JWT_ACTIVE_KID:
+        for key in keys:
+            if key.kid == settings.JWT_ACTIVE_KID:
+                return key
+        raise TokenBackendError(_("JWT_ACTIVE_KID names a key that does not exist"))
+    now = now or time.time()
+    activated = [key for key in keys if activation_time(key) <= now]
+    # Before any key has activated (first start), sign with the oldest.
+    return activated[-1] if activated else keys[0]
+
+
+def retired_keys(keys, now=None):
+    """Keys superseded longer ago than a refresh token lives."""
+    now = now or time.time()
+    lifetime = api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()
+    signing = active_key(keys, now)
+    return [
+        key for key, successor in zip(keys, keys[1:])
+        if key is not signing and activation_time(successor) + lifetime < now
+    ]
+
+
+def rotate(directory=None):
+    """Add a new key and delete retired ones; returns (new kid, deleted kids)."""
+    directory = Path(directory or settings.JWT_KEYS_DIR)
+    kid = generate_key(directory)
+    retired = retired_keys(load_keys(directory))
+    for key in retired:
+        (directory / f'{key.kid}.pem').unlink(missing_ok=True)
+    key_ring.reload()
+    return kid, [key.kid for key in retired]
+
+
+class _KeyRing:
+    def __init__(self):
+        self._keys = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def keys(self):
+        with self._lock:
+            if self._keys is None or time.monotonic() - self._loaded_at > settings.JWT_KEYS_RELOAD_INTERVAL:
+                self._keys = load_keys(settings.JWT_KEYS_DIR)
+                self._loaded_at = time.monotonic()
+            return self._keys
+
+    def reload(self):
+        with self._lock:
+            self._keys = None
+
+    def find(self, kid):
+        for key in self.keys():
+            if key.kid == kid:
+                return key
+        return None
+
+
+key_ring = _KeyRing()
+
+
+def jwks():
+    return {'keys': [key.jwk() for key in key_ring.keys()]}
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """
+    Signs with the active key and names it in the ``kid`` header; verifies
+    with whichever key in the ring the token names.
+    """
+
+    def encode(self, payload):
+        key = active_key(key_ring.keys())
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+        return jwt.encode(
+            jwt_payload, key.private_key, algorithm=self.algorithm,
+            headers={'kid': key.kid}, json_encoder=self.json_encoder,
+        )
+
+    def get_verifying_key(self, token):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as e:
+            raise TokenBackendError(_("Token is invalid")) from e
+        key = key_ring.find(kid)
+        if key is None:
+            raise TokenBackendError(_("Token is invalid"))
+        return key.public_key
+
+
+_backend = None
+
+
+def get_token_backend():
+    global _backend
+    if _backend is None:
+        _backend = KeyRingTokenBackend(
+            api_settings.ALGORITHM,
+            audience=api_settings.AUDIENCE,
+            issuer=api_settings.ISSUER,
+            leeway=api_settings.LEEWAY,
+            json_encoder=api_settings.JSON_ENCODER,
+        )
+    return _backend
@@ -0,0 +1,37 @@
+import logging
+import time
+
+import redis
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from amms_common.outbox import prune, relay
+
+logger = logging.getLogger(__name__)
+
+PRUNE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = "Publish outbox events to Redis Streams until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Publish one batch and exit.")
+
+    def handle(self, *args, **options):
+        last_prune = float('-inf')
+        while True:
+            try:
+                published = relay()
+                if time.monotonic() - last_prune > PRUNE_INTERVAL:
+                    prune()
+                    last_prune = time.monotonic()
+            except (redis.RedisError, DatabaseError) as exc:
+                logger.warning("Relaying outbox events failed: %s", exc)
+                close_old_connections()
+                published = 0
+            if options['once']:
+                return
+            if published < settings.EVENT_RELAY_BATCH_SIZE:
+                time.sleep(settings.EVENT_RELAY_POLL_INTERVAL)
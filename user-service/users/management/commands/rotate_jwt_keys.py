@@ -0,0 +1,28 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.keys import generate_key, rotate
+
+
+class Command(BaseCommand):
+    help = "Add a JWT signing key and delete keys no valid token can still name."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--if-missing', action='store_true',
+            help="Only create a key if there is none yet (container start-up).",
+        )
+
+    def handle(self, *args, **options):
+        directory = Path(settings.JWT_KEYS_DIR)
+        if options['if_missing']:
+            if any(directory.glob('*.pem')):
+                return
+            self.stdout.write(f"Created JWT signing key {generate_key(directory)}")
+            return
+        kid, deleted = rotate(directory)
+        self.stdout.write(f"Created JWT signing key {kid}")
+        for old in deleted:
+            self.stdout.write(f"Deleted retired JWT signing key {old}")
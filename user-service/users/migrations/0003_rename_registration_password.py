@@ -0,0 +1,16 @@
+from django.db import migrations
+
+
+# 0001 created the column as ``password``; the model names it ``password_raw``.
+class Migration(migrations.Migration):
+    dependencies = [
+        ('users', '0002_customuser_updated_at'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='registration',
+            old_name='password',
+            new_name='password_raw',
+        ),
+    ]
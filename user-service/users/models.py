@@ -1,4 +1,8 @@
-from django.db import models
+import uuid
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
 
@@ -17,7 +21,9 @@ class CustomUserManager(BaseUserManager):
         user = self.model(username=username, email=email, **extra_fields)
         if password:
             user.set_password(password)
-        user.save(using=self._db)
+        # Commits with its outbox event (amms_common.outbox).
+        with transaction.atomic(using=self._db, savepoint=False):
+            user.save(using=self._db)
         return user
 
     def create_superuser(self, username, email, password=None, **extra_fields):
@@ -51,6 +57,7 @@ class CustomUser(AbstractUser):
     service_number = models.CharField(max_length=100, unique=True)
     rank = models.CharField(max_length=100)
     email = models.EmailField(_('email address'), unique=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     # Required fields when using a custom user model
     USERNAME_FIELD = 'username'
@@ -65,6 +72,16 @@ class CustomUser(AbstractUser):
     class Meta:
         verbose_name = _('user')
         verbose_name_plural = _('users')
+        # Directory listing (users.views.UserDirectoryView): each filter
+        # combination reads one index in keyset order. Prefix search on
+        # last_name uses the first; username, email and service_number
+        # already have unique indexes.
+        indexes = [
+            models.Index(fields=['last_name', 'first_name', 'id'], name='user_dir_name_idx'),
+            models.Index(fields=['is_active', 'last_name', 'first_name', 'id'], name='user_dir_active_idx'),
+            models.Index(fields=['is_staff', 'last_name', 'first_name', 'id'], name='user_dir_staff_idx'),
+            models.Index(fields=['rank', 'is_active', 'last_name', 'first_name', 'id'], name='user_dir_rank_idx'),
+        ]
 
 
 class Registration(models.Model):
@@ -91,3 +108,58 @@ class Registration(models.Model):
 
     class Meta:
         verbose_name_plural = "Registrations"
+
+
+class RegistrationApprovalJob(models.Model):
+    """
+    A bulk registration approval run by a Celery worker. ``results`` holds
+    one entry per registration id, in request order, as each chunk commits.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    registration_ids = models.JSONField(default=list)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL,
+        related_name='registration_approval_jobs',
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    approved_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    results = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def progress(self):
+        return self.processed / self.total if self.total else 1.0
+
+    def __str__(self):
+        return f"Approval of {self.total} registrations [{self.status}] {self.id}"
+
+
+class OutboxEvent(models.Model):
+    """A domain event waiting to be relayed to Redis Streams (see ``outbox``)."""
+    aggregate = models.CharField(max_length=50)
+    event_type = models.CharField(max_length=100)
+    key = models.CharField(max_length=100)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['published_at', 'id'], name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.key} ({self.pk})"
@@ -0,0 +1,174 @@
+import binascii
+import json
+from base64 import b64decode, b64encode
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    """
+    Default page size for the UI, with a client-selectable ``page_size`` so
+    bulk consumers can walk the table in fewer round trips.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination over ``ordering``, which must end in a unique
+    field. The cursor carries the ordering values of the row at the page
+    edge, and the next page is read with a range condition on them. With an
+    index on ``ordering``, every page costs one index range scan however
+    deep into the list it is, and rows inserted meanwhile never shift pages.
+    """
+    ordering = ('id',)
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(b64decode(encoded.encode(), altchars=b'-_'))
+            values, reverse = cursor['k'], bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def encode_cursor(self, row, reverse):
+        values = [getattr(row, field) for field in self.ordering]
+        encoded = b64encode(json.dumps({'k': values, 'r': int(reverse)}).encode(), altchars=b'-_').decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def seek(self, values, reverse):
+        """Rows strictly after ``values`` in ``ordering`` (before, if ``reverse``)."""
+        lookup = 'lt' if reverse else 'gt'
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            equal = {name: value for name, value in zip(self.ordering[:index], values)}
+            condition |= Q(**equal, **{f'{field}__{lookup}': values[index]})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        size = self.get_page_size(request)
+        values, reverse = self.decode_cursor(request)
+
+        ordering = [f'-{field}' for field in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.seek(values, reverse))
+        rows = list(queryset[:size + 1])
+        more = len(rows) > size
+        rows = rows[:size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, more
+        else:
+            self.has_next, self.has_previous = more, values is not None
+        self.first, self.last = (rows[0], rows[-1]) if rows else (None, None)
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return self.encode_cursor(self.last, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first is None:
+            return None
+        return self.encode_cursor(self.first, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class DirectoryPagination(KeysetPagination):
+    """Alphabetical keyset pages for the user directory."""
+    ordering = ('last_name', 'first_name', 'id')
+
+
+class ChangeFeedPagination(BasePagination):
+    """
+    Forward-only keyset pages over ``(updated_at, id)``, for consumers that
+    copy a table incrementally (the reporting sync). ``updated_after``
+    starts the feed (inclusive); each ``next`` link carries the last row's
+    ``updated_at`` and ``id`` as ``after`` and ``after_id``. A row updated
+    while the feed is read moves past the cursor and is read again, instead
+    of shifting unread rows onto pages already read as page numbers would.
+    No count is taken.
+    """
+    page_size = 1000
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def _datetime(self, request, name):
+        value = request.query_params.get(name)
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValidationError({name: 'Must be an ISO 8601 datetime.'})
+        return parsed
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        after = self._datetime(request, 'after')
+        if after is not None:
+            try:
+                after_id = int(request.query_params.get('after_id', ''))
+            except ValueError:
+                raise ValidationError({'after_id': 'Must be an integer.'})
+            queryset = queryset.filter(Q(updated_at__gt=after) | Q(updated_at=after, id__gt=after_id))
+        else:
+            since = self._datetime(request, 'updated_after')
+            if since is not None:
+                queryset = queryset.filter(updated_at__gte=since)
+
+        size = self.get_page_size(request)
+        rows = list(queryset.order_by('updated_at', 'id')[:size + 1])
+        self.has_next = len(rows) > size
+        rows = rows[:size]
+        self.last = rows[-1] if rows else None
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = replace_query_param(self.base_url, 'after', self.last.updated_at.isoformat())
+        return replace_query_param(url, 'after_id', self.last.pk)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
@@ -0,0 +1,176 @@
+"""
+Cached user principals for JWT-authenticated requests.
+
+A principal is the user's concrete field values, cached under the user id
+plus a per-user version stamp. The stamp lives in Redis (the default Django
+cache) and is bumped by ``users.signals`` whenever the user is saved, which
+covers profile edits, password changes and deactivation, or deleted. A bump
+makes every older cached principal unreachable, so nothing has to be
+deleted.
+
+Lookups read the stamp from Redis, then try a small in-process LRU keyed by
+(id, stamp), then the Redis copy, and only then MySQL. A hit costs one Redis
+round trip and no database query. If Redis is unavailable, lookups fall
+back to the database.
+
+Both copies are also evicted when the user changes: the Redis copy is
+tagged under the user (``amms_common.invalidation``), and every process drops its
+local entries for the user when the invalidation is published. Old
+versions therefore do not linger until they expire.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework_simplejwt.settings import api_settings
+from amms_common.invalidation import subscriber, tag
+from amms_common.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+_VERSION_PREFIX = 'user-principal-version:'
+_PRINCIPAL_PREFIX = 'user-principal:'
+
+
+class LocalLRU:
+    """Thread-safe, size-bounded LRU for principals within one process."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def evict_where(self, predicate):
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_local = LocalLRU(settings.USER_PRINCIPAL_LOCAL_CACHE_SIZE)
+
+
+def _evict_local(pk, version):
+    _local.evict_where(lambda key: str(key[0]) == str(pk))
+
+
+subscriber.register(User._meta.label_lower, _evict_local, _local.clear)
+
+
+def _new_stamp():
+    # Stamps start from the clock rather than 1 so that, if Redis loses the
+    # key, a fresh stamp never collides with one still held in a local LRU.
+    return time.time_ns()
+
+
+def current_version(user_id):
+    key = f'{_VERSION_PREFIX}{user_id}'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_stamp(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(user_id):
+    """
+    Invalidate every cached principal of ``user_id``. This fails closed: if
+    the stamp cannot be bumped it is deleted, so the next lookup starts a
+    fresh one, and if that fails too the error propagates rather than
+    leaving a revoked user's principal reachable.
+    """
+    key = f'{_VERSION_PREFIX}{user_id}'
+    _evict_local(user_id, None)
+    try:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_stamp(), timeout=None)
+    except Exception as exc:
+        logger.warning("Bumping principal version for user %s failed, deleting it: %s", user_id, exc)
+        cache.delete(key)
+
+
+def _fields():
+    return [field.attname for field in User._meta.concrete_fields]
+
+
+def _to_values(user):
+    return [getattr(user, name) for name in _fields()]
+
+
+def _from_values(values):
+    # ``from_db`` builds a fresh, saved-state instance per request, so callers
+    # may modify and save it like a user loaded from MySQL.
+    return User.from_db('default', _fields(), values)
+
+
+def _load(user_id):
+    try:
+        return User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+    except User.DoesNotExist:
+        return None
+
+
+def get_principal(user_id):
+    """Return the user for ``user_id``, or None if there is no such user."""
+    subscriber.start()
+    try:
+        version = current_version(user_id)
+    except Exception as exc:
+        logger.warning("Principal cache unavailable, loading user %s from the database: %s", user_id, exc)
+        return _load(user_id)
+
+    key = (user_id, version)
+    values = _local.get(key)
+    if values is not None:
+        CACHE_REQUESTS.labels('principal', 'local_hit').inc()
+        return _from_values(values)
+
+    redis_key = f'{_PRINCIPAL_PREFIX}{user_id}:{version}'
+    try:
+        values = cache.get(redis_key)
+    except Exception as exc:
+        logger.warning("Principal cache read failed: %s", exc)
+        values = None
+    if values is not None:
+        CACHE_REQUESTS.labels('principal', 'redis_hit').inc()
+        _local.set(key, values)
+        return _from_values(values)
+
+    CACHE_REQUESTS.labels('principal', 'miss').inc()
+    user = _load(user_id)
+    if user is None:
+        return None
+    values = _to_values(user)
+    try:
+        cache.set(redis_key, values, settings.USER_PRINCIPAL_CACHE_TIMEOUT)
+    except Exception as exc:
+        logger.warning("Principal cache write failed: %s", exc)
+    else:
+        tag(User._meta.label_lower, user.pk, redis_key, settings.USER_PRINCIPAL_CACHE_TIMEOUT)
+    _local.set(key, values)
+    return user
@@ -1,8 +1,10 @@
 from rest_framework import serializers
-from django.contrib.auth import get_user_model, authenticate
+from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import make_password
-from .models import Registration
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.db import transaction
+from .models import Registration, RegistrationApprovalJob
+from .tokens import FilteredRefreshToken, LoginRefreshToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 
 
 User = get_user_model()
@@ -34,7 +36,9 @@ class CustomUserSerializer(serializers.ModelSerializer):
         Create and return a new user with an encrypted password.
         """
         validated_data['password'] = make_password(validated_data.get('password'))
-        return super().create(validated_data)
+        # Hash first: the transaction (for the outbox event) only spans the INSERT.
+        with transaction.atomic(savepoint=False):
+            return super().create(validated_data)
 
     def update(self, instance, validated_data):
         """
@@ -54,7 +58,19 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = [
             'id', 'username', 'email', 'first_name', 'last_name',
-            'service_number', 'rank'
+            'service_number', 'rank', 'is_active', 'date_joined', 'updated_at'
+        ]
+
+
+class DirectoryUserSerializer(serializers.ModelSerializer):
+    """
+    Directory entry: the fields the admin user directory displays.
+    """
+    class Meta:
+        model = User
+        fields = [
+            'id', 'username', 'email', 'first_name', 'last_name',
+            'service_number', 'rank', 'is_active', 'is_staff'
         ]
 
 
@@ -74,25 +90,25 @@ class UserProfileSerializer(serializers.ModelSerializer):
 class LoginSerializer(TokenObtainPairSerializer):
     """
     Custom login serializer that returns JWT tokens + user info.
+    ``authenticate()`` loads the user once; everything below reuses it.
     """
+    token_class = LoginRefreshToken
+
     def validate(self, attrs):
         data = super().validate(attrs)
 
         # Add user info to response
-        data.update({
-            "user": {
-                "id": self.user.id,
-                "username": self.user.username,
-                "email": self.user.email,
-                "first_name": self.user.first_name,
-                "last_name": self.user.last_name,
-                "service_number": self.user.service_number,
-                "rank": self.user.rank,
-            }
-        })
+        data["user"] = UserSerializer(self.user).data
         return data
 
 
+class FilteredTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Token refresh whose blacklist check is fronted by the Bloom filter.
+    """
+    token_class = FilteredRefreshToken
+
+
 class RegistrationSerializer(serializers.ModelSerializer):
     """
     Serializer for creating registration requests.
@@ -117,6 +133,28 @@ class RegistrationSerializer(serializers.ModelSerializer):
         return Registration.objects.create(**validated_data)
 
 
+class BulkApproveSerializer(serializers.Serializer):
+    """
+    Registration ids to approve in one background job.
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+
+
+class RegistrationApprovalJobSerializer(serializers.ModelSerializer):
+    """
+    Progress and per-registration results of a bulk approval job.
+    """
+    progress = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = RegistrationApprovalJob
+        fields = [
+            'id', 'status', 'total', 'processed', 'progress', 'approved_count',
+            'skipped_count', 'failed_count', 'results', 'error', 'created_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+
 class ChangePasswordSerializer(serializers.Serializer):
     """
     Serializer for the password change endpoint.
@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from amms_common.invalidation import publish_on_commit
+from amms_common.outbox import emit
+
+from .blacklist import record
+from .models import Registration
+from .principal import bump_version
+from .serializers import UserSerializer
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_principal(sender, instance, update_fields=None, **kwargs):
+    """
+    Invalidate the cached principal once the change is committed, so no
+    request can re-cache the old row under the new version.
+    A last_login-only save at login changes nothing a principal is used for.
+    """
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    transaction.on_commit(lambda: bump_version(instance.pk))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Registration)
+@receiver(post_delete, sender=Registration)
+def invalidate_caches(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    publish_on_commit([instance])
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    """
+    Emit ``user.changed``. Login's own saves (last_login, or the password
+    rehashed to a new work factor) change nothing in the event and run
+    outside a transaction, so they emit nothing.
+    """
+    if update_fields is not None and set(update_fields) <= {'last_login', 'password'}:
+        return
+    emit('users', 'user.changed', instance.pk, UserSerializer(instance).data)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    emit('users', 'user.deleted', instance.pk, {'id': instance.pk, 'service_number': instance.service_number})
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def add_to_blacklist_filter(sender, instance, created, **kwargs):
+    """
+    Add the JTI to the Bloom filter once the row is committed, so a
+    concurrent rebuild either sees the row or is retried.
+    """
+    if created:
+        jti = instance.token.jti
+        transaction.on_commit(lambda: record(jti))
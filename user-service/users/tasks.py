@@ -1,7 +1,49 @@
 from celery import shared_task
+from django.core.management import call_command
+
+from . import approvals, keys
+from .blacklist import get_filter
+from .models import RegistrationApprovalJob
+
 
 @shared_task
 def send_welcome_email(user_id):
     # Simulate sending a welcome email
     print(f"Sending welcome email to user with ID: {user_id}")
-    return f"Welcome email sent to user {user_id}."
\ No newline at end of file
+    return f"Welcome email sent to user {user_id}."
+
+
+@shared_task
+def prune_expired_tokens():
+    """
+    Delete expired outstanding tokens (and, by cascade, their blacklist
+    entries), then rebuild the blacklist Bloom filter without them.
+    """
+    call_command('flushexpiredtokens')
+    return get_filter().rebuild()
+
+
+@shared_task
+def rebuild_token_blacklist_filter():
+    """Re-derive the blacklist Bloom filter from the table."""
+    return get_filter().rebuild()
+
+
+@shared_task
+def rotate_jwt_keys():
+    """Add a JWT signing key (activated after a delay) and drop retired ones."""
+    kid, deleted = keys.rotate()
+    return {'created': kid, 'deleted': deleted}
+
+
+@shared_task(acks_late=True)
+def run_registration_approval_job(job_id):
+    """
+    Run a bulk registration approval job. ``acks_late`` means a job whose
+    worker dies is redelivered, and resumes after its last committed chunk.
+    """
+    job = RegistrationApprovalJob.objects.get(pk=job_id)
+    if job.status == 'done':
+        return str(job.id)
+    approvals.run(job)
+    return str(job.id)
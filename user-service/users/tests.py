@@ -0,0 +1,328 @@
+"""
+Tests for login, the user directory and registration approval: behaviour,
+then performance (query budgets and p95 latency). Data volume and timing
+runs for the latter come from the PERF_* environment variables, see
+``amms_common.perftest``.
+"""
+import itertools
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+import fakeredis
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from amms_common.perftest import RUNS, PerfTestCase, bulk_seed, scaled
+
+from . import approvals, blacklist, keys, principal
+from .models import Registration
+from .tokens import FilteredRefreshToken, LoginRefreshToken
+
+User = get_user_model()
+
+USERS = scaled(50_000)
+PASSWORD = 'perf-password-1'
+
+RANKS = ['Constable', 'Corporal', 'Sergeant', 'Inspector', 'Superintendent']
+LAST_NAMES = ['Achieng', 'Banda', 'Chege', 'Kamau', 'Mwangi', 'Njoroge', 'Odhiambo', 'Wanjiku']
+
+
+def synthetic_users(count, password):
+    for index in range(count):
+        yield User(
+            username=f'perf{index:06d}',
+            email=f'perf{index:06d}@example.com',
+            first_name=f'First{index}',
+            last_name=LAST_NAMES[index % len(LAST_NAMES)],
+            service_number=f'PERF-{index:06d}',
+            rank=RANKS[index % len(RANKS)],
+            password=password,
+        )
+
+
+class UserChangesTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', service_number='SN-ADMIN')
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def test_includes_deactivated_users(self):
+        user = User.objects.create_user('leaver', 'leaver@example.com', service_number='SN-1')
+        user.is_active = False
+        user.save()
+        response = self.api.get('/api/v1/users/changes/')
+        self.assertEqual(response.status_code, 200)
+        rows = {row['username']: row for row in response.data['results']}
+        self.assertFalse(rows['leaver']['is_active'])
+        self.assertTrue(rows['admin']['is_active'])
+
+    def test_admin_only(self):
+        self.api.force_authenticate(User.objects.create_user('clerk', 'clerk@example.com', service_number='SN-2'))
+        self.assertEqual(self.api.get('/api/v1/users/changes/').status_code, 403)
+
+
+class UserLookupTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', service_number='SN-ADMIN')
+        self.clerk = User.objects.create_user('clerk', 'clerk@example.com', service_number='SN-2')
+        self.api = APIClient()
+
+    def test_staff_only(self):
+        self.api.force_authenticate(self.clerk)
+        self.assertEqual(self.api.get('/api/v1/users/lookup/', {'ids': self.admin.pk}).status_code, 403)
+        self.api.force_authenticate(self.admin)
+        response = self.api.post('/api/v1/users/lookup/', {'service_numbers': ['SN-2', 'SN-9']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['users']['SN-2']['id'], self.clerk.pk)
+        self.assertEqual(response.data['missing'], ['SN-9'])
+
+
+def use_temporary_signing_key(cls):
+    """Sign tokens issued in ``cls`` with a throwaway key, removed afterwards."""
+    keys_dir = tempfile.TemporaryDirectory()
+    cls.addClassCleanup(keys_dir.cleanup)
+    keys.generate_key(keys_dir.name)
+    keys_override = override_settings(JWT_KEYS_DIR=keys_dir.name)
+    keys_override.enable()
+    cls.addClassCleanup(keys_override.disable)
+    keys.key_ring.reload()
+    cls.addClassCleanup(keys.key_ring.reload)
+
+
+class TokenClaimTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        use_temporary_signing_key(cls)
+        super().setUpClass()
+
+    def test_tokens_carry_staff_flag(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', service_number='SN-ADMIN')
+        clerk = User.objects.create_user('clerk', 'clerk@example.com', service_number='SN-2')
+        for token_class in (LoginRefreshToken, FilteredRefreshToken):
+            self.assertIs(token_class.for_user(admin).access_token['is_staff'], True)
+            self.assertIs(token_class.for_user(clerk).access_token['is_staff'], False)
+
+
+class PrincipalVersionTests(TestCase):
+    def test_failed_bump_deletes_the_stamp(self):
+        before = principal.current_version(42)
+        with mock.patch.object(principal.cache, 'incr', side_effect=ConnectionError('down')):
+            principal.bump_version(42)
+        self.assertNotEqual(principal.current_version(42), before)
+
+    def test_bump_fails_closed(self):
+        principal.current_version(42)
+        with mock.patch.object(principal.cache, 'incr', side_effect=ConnectionError('down')), \
+                mock.patch.object(principal.cache, 'delete', side_effect=ConnectionError('down')):
+            with self.assertRaises(ConnectionError):
+                principal.bump_version(42)
+
+
+def registration(name, email=None, **fields):
+    return Registration.objects.create(
+        username=name, email=email or f'{name}@example.com', first_name=name.title(), last_name='Recruit',
+        service_number=f'SN-{name}', rank='Constable', password_raw=PASSWORD, **fields,
+    )
+
+
+@override_settings(PASSWORD_HASHER_ITERATIONS=1000)
+class ApprovalTests(TestCase):
+    def test_clash_within_a_chunk_fails_only_the_later_registration(self):
+        first = registration('alpha', 'recruit@example.com')
+        second = registration('bravo', 'recruit@EXAMPLE.com')  # same address once normalised
+        job = approvals.run(approvals.submit([first.pk, second.pk]))
+        results = {result['registration_id']: result for result in job.results}
+        self.assertEqual(results[first.pk]['status'], 'approved')
+        self.assertEqual(results[second.pk]['status'], 'failed')
+        self.assertIn('earlier registration', results[second.pk]['error'])
+        second.refresh_from_db()
+        self.assertFalse(second.is_approved)
+
+    def test_insert_errors_are_keyed_by_registration(self):
+        # Two rows for one username can reach the insert if a user is
+        # created between the clash check and the insert.
+        first, second = registration('alpha'), registration('bravo')
+        users = [User(username='same', email=f'{name}@example.com', service_number=f'SN-{name}')
+                 for name in ('alpha', 'bravo')]
+        errors = approvals._create_users([first, second], users)
+        self.assertEqual(list(errors), [second.pk])
+
+    @override_settings(REGISTRATION_APPROVAL_CHUNK_SIZE=2)
+    def test_redelivered_job_resumes_after_last_committed_chunk(self):
+        registrations = [registration(f'recruit{index}') for index in range(5)]
+        job = approvals.submit([r.pk for r in registrations])
+        approve_chunk = approvals._approve_chunk
+        calls = []
+
+        def crash_on_second_chunk(chunk, executor):
+            calls.append(chunk)
+            if len(calls) == 2:
+                raise RuntimeError('worker lost')
+            return approve_chunk(chunk, executor)
+
+        with mock.patch.object(approvals, '_approve_chunk', crash_on_second_chunk):
+            with self.assertRaises(RuntimeError), self.assertLogs('users.approvals', 'ERROR'):
+                approvals.run(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed, job.approved_count), ('failed', 2, 2))
+
+        job = approvals.run(job)
+        self.assertEqual((job.status, job.processed, job.approved_count), ('done', 5, 5))
+        self.assertEqual([result['registration_id'] for result in job.results], [r.pk for r in registrations])
+        self.assertEqual(User.objects.filter(username__startswith='recruit').count(), 5)
+
+
+class BlacklistFilterTests(TestCase):
+    def setUp(self):
+        server = fakeredis.FakeServer()
+        # Two processes sharing one Redis.
+        self.filters = [
+            blacklist.BloomFilter(fakeredis.FakeRedis(server=server), capacity=1000, error_rate=0.001, log_size=10)
+            for _ in range(2)
+        ]
+        self.client = self.filters[0].client
+
+    def blacklist_token(self, jti, expires_in=timedelta(days=1)):
+        token = OutstandingToken.objects.create(jti=jti, token=jti, expires_at=aware_utcnow() + expires_in)
+        BlacklistedToken.objects.create(token=token)
+
+    def test_add_reaches_other_processes(self):
+        first, second = self.filters
+        self.assertFalse(first.might_contain('jti-1'))
+        second.add('jti-1')
+        self.assertTrue(first.might_contain('jti-1'))
+        self.assertFalse(first.might_contain('jti-2'))
+
+    def test_process_far_behind_reloads_the_bitmap(self):
+        first, second = self.filters
+        first.might_contain('jti-0')
+        for index in range(15):  # more than the log keeps
+            second.add(f'jti-{index}')
+        self.assertTrue(all(first.might_contain(f'jti-{index}') for index in range(15)))
+
+    def test_rebuild_forgets_expired_tokens(self):
+        first, second = self.filters
+        self.blacklist_token('live')
+        self.blacklist_token('expired', expires_in=timedelta(days=-1))
+        first.might_contain('live')  # the first use builds the filter from the table
+        self.assertTrue(second.might_contain('live'))
+        self.assertFalse(second.might_contain('expired'))
+        self.assertEqual(first.rebuild(), 1)
+
+    def test_lost_filter_is_rebuilt_from_the_table(self):
+        first, _ = self.filters
+        self.blacklist_token('live')
+        first.might_contain('live')
+        self.client.flushall()
+        self.assertTrue(first.might_contain('live'))
+
+
+# Hashing dominates login and approval; at the production work factor it
+# would drown out everything these tests are meant to catch.
+@override_settings(PASSWORD_HASHER_ITERATIONS=1000)
+class UserEndpointPerformanceTests(PerfTestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Login signs tokens, so it needs a key of its own.
+        use_temporary_signing_key(cls)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        # One hash shared by every row: hashing 50k passwords is not the point.
+        bulk_seed(User, synthetic_users(USERS, make_password(PASSWORD)))
+        cls.admin = User.objects.create_superuser('perf-admin', 'perf-admin@example.com')
+        cls.registration_ids = itertools.count()
+
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def get(self, path, params=None):
+        response = self.api.get(path, params or {})
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        return response
+
+    def registrations(self, count):
+        """``count`` new pending registrations, with names no user has."""
+        registrations = []
+        for _ in range(count):
+            index = next(self.registration_ids)
+            registrations.append(Registration(
+                username=f'recruit{index:06d}',
+                email=f'recruit{index:06d}@example.com',
+                first_name=f'Recruit{index}',
+                last_name='Recruit',
+                service_number=f'RECRUIT-{index:06d}',
+                rank='Constable',
+                password_raw=PASSWORD,
+            ))
+        return Registration.objects.bulk_create(registrations)
+
+    def login(self):
+        response = APIClient().post(
+            '/api/v1/auth/login/', {'username': 'perf000001', 'password': PASSWORD}, format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        return response
+
+    def user_page(self, page_size):
+        return self.get('/api/v1/users/', {'page_size': page_size})
+
+    def directory_page(self, page_size):
+        return self.get('/api/v1/users/directory/', {'page_size': page_size})
+
+    def directory_search(self, page_size=50):
+        return self.get('/api/v1/users/directory/', {'q': 'Kam', 'page_size': page_size})
+
+    def approve(self, registration):
+        response = self.api.post(f'/api/v1/registrations/{registration.pk}/approve/')
+        self.assertEqual(response.status_code, 201, response.content[:500])
+        return response
+
+    # Query budgets. Writes run in a transaction, a savepoint pair under TestCase.
+
+    def test_login_queries(self):
+        self.assertNumQueries(1, self.login)
+
+    def test_user_list_queries(self):
+        self.assertNumQueries(2, self.user_page, 20)
+
+    def test_user_list_queries_do_not_grow_with_page_size(self):
+        self.assertQueriesIndependentOf('page_size', self.user_page, [10, 100])
+
+    def test_directory_queries(self):
+        self.assertNumQueries(1, self.directory_page, 50)
+
+    def test_directory_queries_do_not_grow_with_page_size(self):
+        self.assertQueriesIndependentOf('page_size', self.directory_page, [10, 100])
+        self.assertQueriesIndependentOf('page_size', self.directory_search, [10, 100])
+
+    def test_approve_queries(self):
+        registration, = self.registrations(1)
+        self.assertNumQueries(9, self.approve, registration)
+
+    def test_bulk_approval_queries_do_not_grow_with_registrations(self):
+        # Both jobs fit in one chunk, so each runs the same statements.
+        jobs = {count: approvals.submit([r.pk for r in self.registrations(count)]) for count in (5, 50)}
+        self.assertQueriesIndependentOf('registrations', lambda count: approvals.run(jobs[count]), jobs)
+
+    def test_login_latency(self):
+        self.assertLatency('users.login', self.login)
+
+    def test_user_list_latency(self):
+        self.assertLatency('users.list', self.user_page, 20)
+
+    def test_directory_search_latency(self):
+        self.assertLatency('users.directory_search', self.directory_search)
+
+    def test_approve_latency(self):
+        pending = iter(self.registrations(RUNS + 1))
+        self.assertLatency('registrations.approve', lambda: self.approve(next(pending)))
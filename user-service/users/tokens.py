@@ -0,0 +1,56 @@
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, BlacklistMixin, RefreshToken
+
+from .blacklist import might_be_blacklisted
+from .keys import get_token_backend
+
+
+def add_claims(token, user):
+    """
+    Claims other services authorise on without looking the user up, e.g.
+    reporting-service's admin-only datasets. Access tokens copy them from
+    their refresh token.
+    """
+    token['is_staff'] = user.is_staff
+    return token
+
+
+class KeyRingTokenMixin:
+    """Sign and verify with the key ring in ``users.keys``."""
+
+    @property
+    def token_backend(self):
+        return get_token_backend()
+
+
+class SignedAccessToken(KeyRingTokenMixin, AccessToken):
+    pass
+
+
+class FilteredRefreshToken(KeyRingTokenMixin, RefreshToken):
+    """
+    Refresh token whose blacklist check consults the Bloom filter first and
+    only queries ``BlacklistedToken`` when the JTI may be blacklisted.
+    """
+    access_token_class = SignedAccessToken
+
+    @classmethod
+    def for_user(cls, user):
+        return add_claims(super().for_user(user), user)
+
+    def check_blacklist(self):
+        if might_be_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+
+class LoginRefreshToken(FilteredRefreshToken):
+    """
+    Refresh token issued at login without writing an ``OutstandingToken``
+    row. ``blacklist()`` creates that row on demand at logout, and blacklist
+    checks only consult ``BlacklistedToken``, so login needs no INSERT.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        # Skip BlacklistMixin.for_user, which records the outstanding token.
+        return add_claims(super(BlacklistMixin, cls).for_user(user), user)
@@ -9,9 +9,13 @@ urlpatterns = [
     path('auth/change-password/', views.ChangePasswordView.as_view(), name='change-password'),
     path('auth/user/', views.UserDetailView.as_view(), name='auth-user-detail'),
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('auth/jwks/', views.JWKSView.as_view(), name='jwks'),
 
     # User Management
     path('users/', views.UserListView.as_view(), name='user-list-admin'),
+    path('users/changes/', views.UserChangesView.as_view(), name='user-changes'),
+    path('users/directory/', views.UserDirectoryView.as_view(), name='user-directory'),
+    path('users/lookup/', views.UserLookupView.as_view(), name='user-lookup'),
     path('profile/', views.UserProfileView.as_view(), name='user-profile'),
     path('users/profile/update/', views.UpdateProfileView.as_view(), name='update-profile'),
     path('users/<int:pk>/', views.UserRetrieveDeleteView.as_view(), name='user-detail-admin'),
@@ -22,4 +26,7 @@ urlpatterns = [
     path('registrations/list/', views.RegistrationListView.as_view(), name='registration-list'),
     path('registrations/<int:pk>/approve/', views.RegistrationApproveView.as_view(), name='registration-approve'),
     path('registrations/<int:pk>/reject/', views.RegistrationRejectView.as_view(), name='registration-reject'),
+    path('registrations/bulk-approve/', views.RegistrationBulkApproveView.as_view(), name='registration-bulk-approve'),
+    path('registrations/approval-jobs/<uuid:pk>/', views.RegistrationApprovalJobView.as_view(),
+         name='registration-approval-job'),
 ]
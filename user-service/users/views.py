@@ -1,19 +1,35 @@
+import hashlib
+import json
+
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags
 from rest_framework import status, generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.throttling import ScopedRateThrottle
 from rest_framework_simplejwt.views import TokenObtainPairView
 
 # Import models and serializers
-from .models import Registration
+from . import approvals
+from .keys import jwks
+from .models import Registration, RegistrationApprovalJob
+from .pagination import ChangeFeedPagination, DirectoryPagination, StandardResultsSetPagination
+from .tokens import FilteredRefreshToken
 from .serializers import (
-    CustomUserSerializer, UserSerializer, UserProfileSerializer,
+    CustomUserSerializer, UserSerializer, UserProfileSerializer, DirectoryUserSerializer,
     LoginSerializer, RegistrationSerializer, ChangePasswordSerializer,
-    UpdateProfileSerializer
+    UpdateProfileSerializer, BulkApproveSerializer, RegistrationApprovalJobSerializer
 )
+from .tasks import run_registration_approval_job
 
 User = get_user_model()
 
@@ -28,19 +44,25 @@ class ApiRoot(APIView):
 
 # --- Authentication Views ---
 
+class JWKSView(APIView):
+    """
+    Public keys that verify user-service tokens, as a JSON Web Key Set.
+    Other services cache this and verify tokens offline.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    throttle_classes = []
+
+    def get(self, request):
+        return Response(jwks(), headers={'Cache-Control': 'public, max-age=300'})
+
+
 class LoginView(TokenObtainPairView):
     """
     Login endpoint returning access & refresh tokens plus user details.
     """
     serializer_class = LoginSerializer
 
-    def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        if response.status_code == 200:
-            user = User.objects.get(username=request.data["username"])
-            response.data["user"] = UserSerializer(user).data
-        return response
-
 
 class LogoutView(APIView):
     """Blacklists the refresh token (requires JWT blacklist enabled)."""
@@ -52,7 +74,7 @@ class LogoutView(APIView):
             return Response({"error": "Refresh token is required"},
                             status=status.HTTP_400_BAD_REQUEST)
         try:
-            token = RefreshToken(refresh_token)
+            token = FilteredRefreshToken(refresh_token)
             token.blacklist()
             return Response({"message": "Successfully logged out"},
                             status=status.HTTP_205_RESET_CONTENT)
@@ -69,7 +91,8 @@ class ChangePasswordView(generics.GenericAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         request.user.set_password(serializer.validated_data['new_password'])
-        request.user.save()
+        with transaction.atomic():
+            request.user.save()
         return Response({'message': 'Password changed successfully'}, status=status.HTTP_200_OK)
 
 
@@ -92,10 +115,169 @@ class RegisterView(generics.CreateAPIView):
 
 
 class UserListView(generics.ListAPIView):
-    """List all active users (Admin only)."""
+    """
+    List all active users (Admin only).
+    ``updated_after`` and ``ordering=updated_at,id`` support incremental sync.
+    """
     queryset = User.objects.filter(is_active=True).order_by('id')
     serializer_class = UserSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = StandardResultsSetPagination
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['id', 'updated_at', 'date_joined']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        updated_after = self.request.query_params.get('updated_after')
+        if updated_after:
+            since = parse_datetime(updated_after)
+            if since is None:
+                raise ValidationError({'updated_after': 'Must be an ISO 8601 datetime.'})
+            queryset = queryset.filter(updated_at__gte=since)
+        return queryset
+
+
+def _boolean_param(params, name):
+    value = params.get(name)
+    if value is None or value == '':
+        return None
+    if value.lower() in ('true', '1'):
+        return True
+    if value.lower() in ('false', '0'):
+        return False
+    raise ValidationError({name: 'Must be true or false.'})
+
+
+class UserChangesView(generics.ListAPIView):
+    """
+    Every user changed since ``updated_after``, deactivated ones included,
+    oldest change first, for incremental copies (Admin only); see
+    ``ChangeFeedPagination``.
+    """
+    queryset = User.objects.all()
+    serializer_class = UserSerializer
+    permission_classes = [IsAdminUser]
+    pagination_class = ChangeFeedPagination
+
+
+class UserDirectoryView(generics.ListAPIView):
+    """
+    Admin: Search the user directory, alphabetically by name.
+    ``q`` matches the start of the username, service number, last name or
+    email (case-insensitive); ``rank``, ``is_active`` and ``is_staff``
+    filter. Pages are keyset-paginated: follow ``next``/``previous``.
+    """
+    queryset = User.objects.all()
+    serializer_class = DirectoryUserSerializer
+    permission_classes = [IsAdminUser]
+    pagination_class = DirectoryPagination
+
+    def get_queryset(self):
+        params = self.request.query_params
+        queryset = super().get_queryset().only(*DirectoryUserSerializer.Meta.fields)
+
+        rank = params.get('rank')
+        if rank:
+            queryset = queryset.filter(rank=rank)
+        for name in ('is_active', 'is_staff'):
+            value = _boolean_param(params, name)
+            if value is not None:
+                queryset = queryset.filter(**{name: value})
+
+        term = params.get('q', '').strip()
+        if term:
+            # Prefix LIKEs can range-scan each column's index; MySQL's
+            # default collation makes them case-insensitive.
+            queryset = queryset.filter(
+                Q(username__istartswith=term)
+                | Q(service_number__istartswith=term)
+                | Q(last_name__istartswith=term)
+                | Q(email__istartswith=term)
+            )
+        return queryset
+
+
+# Fields a lookup may project; contact details and flags stay out.
+LOOKUP_FIELDS = ('id', 'username', 'service_number', 'rank', 'first_name', 'last_name', 'is_active')
+LOOKUP_DEFAULT_FIELDS = ('id', 'service_number', 'rank', 'first_name', 'last_name')
+LOOKUP_KEYS = {'ids': 'id', 'service_numbers': 'service_number'}
+
+
+def _list_param(request, name):
+    """A list from a JSON body (POST) or a comma-separated query parameter (GET)."""
+    if request.method == 'POST':
+        value = request.data.get(name)
+        if value is None or isinstance(value, list):
+            return value
+        raise ValidationError({name: 'Must be a list.'})
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class UserLookupView(APIView):
+    """
+    Batch lookup of users for cross-service enrichment (staff only: other
+    services call it with a staff account's token). Pass either ``ids`` or ``service_numbers`` (up to USER_LOOKUP_MAX_KEYS),
+    and optionally ``fields``. GET takes comma-separated query parameters;
+    POST takes the same names as JSON lists, for batches too long for a URL.
+    Answers with one IN query as {"by", "users": {key: {...}}, "missing"}.
+    Responses carry an ETag, and a matching If-None-Match gets a 304: the
+    lookup is read-only whichever method carries it.
+    """
+    permission_classes = [IsAdminUser]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'user_lookup'
+
+    def get(self, request):
+        return self.lookup(request)
+
+    def post(self, request):
+        return self.lookup(request)
+
+    def lookup(self, request):
+        given = {param: _list_param(request, param) for param in LOOKUP_KEYS}
+        given = {param: keys for param, keys in given.items() if keys is not None}
+        if len(given) != 1:
+            return Response({'error': 'Pass exactly one of: ids, service_numbers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        (param, keys), = given.items()
+        field = LOOKUP_KEYS[param]
+        if len(keys) > settings.USER_LOOKUP_MAX_KEYS:
+            return Response({'error': f'At most {settings.USER_LOOKUP_MAX_KEYS} {param} per request'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if field == 'id':
+            try:
+                keys = [int(key) for key in keys]
+            except (TypeError, ValueError):
+                return Response({'error': 'ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            keys = [str(key) for key in keys]
+
+        fields = _list_param(request, 'fields') or list(LOOKUP_DEFAULT_FIELDS)
+        invalid = [name for name in fields if name not in LOOKUP_FIELDS]
+        if invalid:
+            return Response({'error': f"fields must be one or more of: {', '.join(LOOKUP_FIELDS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        columns = list(dict.fromkeys([field, *fields]))
+
+        rows = User.objects.filter(**{f'{field}__in': set(keys)}).values(*columns)
+        users = {}
+        for row in rows:
+            key = str(row[field])
+            users[key] = {name: row[name] for name in fields}
+        users = dict(sorted(users.items()))
+        missing = sorted({str(key) for key in keys} - users.keys())
+        payload = {'by': field, 'users': users, 'missing': missing}
+
+        digest = hashlib.blake2b(
+            json.dumps(payload, sort_keys=True, default=str).encode(), digest_size=16,
+        ).hexdigest()
+        etag = f'"{digest}"'
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return Response(payload, headers={'ETag': etag})
 
 
 class UserProfileView(generics.RetrieveAPIView):
@@ -107,6 +289,7 @@ class UserProfileView(generics.RetrieveAPIView):
         return self.request.user
 
 
+@method_decorator(transaction.atomic, name='update')
 class UpdateProfileView(generics.UpdateAPIView):
     """Update profile of the logged-in user."""
     serializer_class = UpdateProfileSerializer
@@ -123,6 +306,7 @@ class UserUpdateView(generics.UpdateAPIView):
     permission_classes = [IsAdminUser]
     lookup_field = "pk"
 
+    @transaction.atomic
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', True)
         instance = self.get_object()
@@ -135,6 +319,7 @@ class UserUpdateView(generics.UpdateAPIView):
         }, status=status.HTTP_200_OK)
 
 
+@method_decorator(transaction.atomic, name='destroy')
 class UserRetrieveDeleteView(generics.RetrieveDestroyAPIView):
     """Admin: Retrieve or delete a user by ID."""
     queryset = User.objects.all()
@@ -162,6 +347,7 @@ class RegistrationApproveView(APIView):
     """Admin: Approve a registration and create a user."""
     permission_classes = [IsAdminUser]
 
+    @transaction.atomic
     def post(self, request, pk):
         registration = get_object_or_404(Registration, pk=pk)
         if registration.is_approved:
@@ -188,6 +374,28 @@ class RegistrationApproveView(APIView):
         return Response(user_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class RegistrationBulkApproveView(APIView):
+    """
+    Admin: Approve many registrations in a background job.
+    Body: {"ids": [...]}. Returns 202 with the job to poll.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = BulkApproveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = approvals.submit(serializer.validated_data['ids'], requested_by=request.user)
+        transaction.on_commit(lambda: run_registration_approval_job.delay(str(job.id)))
+        return Response(RegistrationApprovalJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class RegistrationApprovalJobView(generics.RetrieveAPIView):
+    """Admin: Progress and per-registration results of a bulk approval job."""
+    queryset = RegistrationApprovalJob.objects.all()
+    serializer_class = RegistrationApprovalJobSerializer
+    permission_classes = [IsAdminUser]
+
+
 class RegistrationRejectView(APIView):
     """Admin: Reject and delete a registration request."""
     permission_classes = [IsAdminUser]